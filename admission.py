@@ -0,0 +1,237 @@
+# admission.py
+# 请求准入控制 - API Key 校验 + 令牌桶限流 + 并发请求上限
+"""
+请求准入控制
+
+在请求进入业务逻辑之前快速判断是否接收：
+1. API Key 校验: 401（与内存中的 key 摘要做常量时间比较）
+2. 令牌桶限流: 按 API Key 和按端点各一个桶，超限返回 429 + Retry-After
+3. 并发上限: 同时处理中的请求超过 max_inflight 时直接返回 503 + Retry-After
+   （不排队等待，避免线程堆积）
+
+使用方法：
+    admission = AdmissionController(api_keys=["my-secret"], max_inflight=32)
+    admission.init_app(app)
+"""
+
+import hashlib
+import hmac
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+
+# 默认限流配置: (每秒补充令牌数, 桶容量)
+DEFAULT_KEY_RATE = (2.0, 20)
+DEFAULT_ENDPOINT_RATE = (50.0, 100)
+DEFAULT_MAX_INFLIGHT = 32
+DEFAULT_MAX_TRACKED_KEYS = 1024
+
+# 不需要 API Key 的端点（Pi 的健康 / 存活检查不带 key）
+PUBLIC_ENDPOINTS = {"health", "health_live", "static"}
+
+
+class TokenBucket:
+    """令牌桶（调用方负责加锁）"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def try_acquire(self, now: float, cost: float = 1.0) -> float:
+        """
+        尝试取出 cost 个令牌
+
+        Returns:
+            0 表示成功，否则返回需要等待的秒数
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    按名称分组的令牌桶集合
+
+    只保留最近使用的 max_keys 个桶，防止大量不同 key 撑爆内存
+    """
+
+    def __init__(self, default_rate, overrides=None, max_keys: int = DEFAULT_MAX_TRACKED_KEYS):
+        self.default_rate = default_rate
+        self.overrides = dict(overrides or {})
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, overrides):
+        """替换各名称的速率配置；配置有变化的桶重新创建"""
+        overrides = {name: tuple(value) for name, value in overrides.items()}
+        with self._lock:
+            changed = {name for name in set(overrides) | set(self.overrides)
+                       if overrides.get(name) != self.overrides.get(name)}
+            self.overrides = overrides
+            for name in changed:
+                self._buckets.pop(name, None)
+
+    def acquire(self, name) -> float:
+        """返回 0 表示放行，否则返回建议的重试等待秒数"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                rate, capacity = self.overrides.get(name, self.default_rate)
+                bucket = TokenBucket(rate, capacity)
+                self._buckets[name] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(name)
+            return bucket.try_acquire(now)
+
+
+class InflightLimiter:
+    """非阻塞的并发请求计数器"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.current = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def try_enter(self) -> bool:
+        with self._lock:
+            if self.current >= self.limit:
+                return False
+            self.current += 1
+            self.peak = max(self.peak, self.current)
+            return True
+
+    def leave(self):
+        with self._lock:
+            self.current -= 1
+
+
+class ApiKeyCache:
+    """
+    内存中的 API Key 摘要集合
+
+    只保存 SHA-256 摘要；校验时与每个摘要都做一次 hmac.compare_digest，
+    耗时与匹配位置无关
+    """
+
+    def __init__(self, keys=()):
+        self._digests = [self._digest(k) for k in keys if k]
+
+    @staticmethod
+    def _digest(key: str) -> bytes:
+        return hashlib.sha256(key.encode("utf-8")).digest()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self._digests)
+
+    def verify(self, key) -> bool:
+        if not key:
+            return False
+        digest = self._digest(key)
+        matched = False
+        for candidate in self._digests:
+            # 不提前退出，保证比较次数固定
+            matched |= hmac.compare_digest(digest, candidate)
+        return matched
+
+
+def _retry_after(seconds: float) -> str:
+    return str(max(1, math.ceil(seconds)))
+
+
+class AdmissionController:
+    """
+    Flask 准入控制
+
+    Args:
+        api_keys: 允许的 API Key 列表，为空时不校验（本地测试）
+        key_rate: 每个 API Key 的 (rate, burst)
+        endpoint_rates: {endpoint_name: (rate, burst)}，未配置的端点用 default_endpoint_rate
+        max_inflight: 同时处理的请求上限
+    """
+
+    def __init__(self, api_keys=(), key_rate=DEFAULT_KEY_RATE, endpoint_rates=None,
+                 default_endpoint_rate=DEFAULT_ENDPOINT_RATE, max_inflight: int = DEFAULT_MAX_INFLIGHT):
+        self.keys = ApiKeyCache(api_keys)
+        self.key_limiter = RateLimiter(key_rate)
+        self.endpoint_limiter = RateLimiter(default_endpoint_rate, overrides=endpoint_rates)
+        self.inflight = InflightLimiter(max_inflight)
+        self.counters = {"admitted": 0, "unauthorized": 0, "rate_limited": 0, "overloaded": 0}
+        self._counter_lock = threading.Lock()
+        self.enabled = True
+
+    def init_app(self, app):
+        app.before_request(self._before_request)
+        app.teardown_request(self._teardown_request)
+
+    def _count(self, name):
+        with self._counter_lock:
+            self.counters[name] += 1
+
+    def _reject(self, status: int, error: str, counter: str, retry_after: float = None):
+        self._count(counter)
+        response = jsonify({"success": False, "error": error})
+        response.status_code = status
+        if retry_after is not None:
+            response.headers["Retry-After"] = _retry_after(retry_after)
+        return response
+
+    def _before_request(self):
+        if not self.enabled:
+            return None
+
+        endpoint = request.endpoint or "unknown"
+        api_key = request.headers.get("X-API-Key")
+
+        if self.keys.enabled and endpoint not in PUBLIC_ENDPOINTS:
+            if not self.keys.verify(api_key):
+                return self._reject(401, "Invalid or missing API key", "unauthorized")
+
+        wait = self.endpoint_limiter.acquire(endpoint)
+        if wait:
+            return self._reject(429, f"Rate limit exceeded for {endpoint}", "rate_limited", wait)
+
+        if endpoint not in PUBLIC_ENDPOINTS:
+            client = api_key or request.remote_addr or "anonymous"
+            wait = self.key_limiter.acquire(client)
+            if wait:
+                return self._reject(429, "Rate limit exceeded for client", "rate_limited", wait)
+
+        if not self.inflight.try_enter():
+            return self._reject(503, "Server busy, too many in-flight requests", "overloaded", 1)
+
+        g.admission_slot = True
+        self._count("admitted")
+        return None
+
+    def _teardown_request(self, exc=None):
+        if g.pop("admission_slot", False):
+            self.inflight.leave()
+
+    def stats(self) -> dict:
+        with self._counter_lock:
+            counters = dict(self.counters)
+        return {
+            **counters,
+            "inflight": self.inflight.current,
+            "inflight_peak": self.inflight.peak,
+            "max_inflight": self.inflight.limit,
+            "enabled": self.enabled,
+            "auth_enabled": self.keys.enabled,
+        }
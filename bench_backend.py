@@ -0,0 +1,374 @@
+# bench_backend.py
+# 后端压测工具 - 按并发数和请求配比压测 /health、/execute/ai、/status/<id>
+"""
+后端 API 压测
+
+使用 asyncio 实现的轻量 HTTP/1.1 客户端（无第三方依赖），按指定并发和请求配比
+压测后端，输出 JSON 格式的吞吐量、延迟分布和错误率，方便对比不同运行模式 / 队列改动。
+
+使用方法：
+    python bench_backend.py --local                          # 在本进程内启动 minimal_backend 并压测
+    python bench_backend.py --url http://192.168.0.147:5000  # 压测已运行的后端
+    python bench_backend.py --local --concurrency 32 --duration 20 --mix health=2,execute=1,status=4
+    python bench_backend.py --local --label queue-v2 --output bench_results.json
+    python bench_backend.py --local --admission             # 保留限流（默认关闭，只测处理路径）
+
+所有请求来自同一地址，--local 开启准入控制时大部分请求会被限流（429）。
+延迟分布只统计成功（< 400）的响应，429 / 404 / 其他错误分别计数。
+status 请求只查询 execute 返回过的任务 id（最近 TASK_ID_POOL 个），还没有任务时改发 execute。
+
+结果示例（节选）：
+    {"label": "...", "throughput_rps": 812.4, "error_rate": 0.0,
+     "latency_ms": {"p50": 3.1, "p95": 9.8, "p99": 15.2, ...},
+     "endpoints": {"health": {...}, "execute": {"throttled": 0, "not_found": 0, ...}, "status": {...}}}
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import platform
+import random
+import socket
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = "health=1,execute=1,status=2"
+DEFAULT_INSTRUCTIONS = ["/1mu3", "/iyf"]
+LATENCY_PERCENTILES = (50, 90, 95, 99)
+TASK_ID_POOL = 1000                      # status 请求从最近返回的这么多个任务 id 中随机选取
+
+
+# ============================================================================
+# 轻量异步 HTTP 客户端
+# ============================================================================
+
+async def http_request(host: str, port: int, method: str, path: str, headers=None,
+                       body: bytes = None, timeout: float = 10.0):
+    """
+    发送一次 HTTP/1.1 请求（Connection: close）
+
+    Returns:
+        (status_code, body_bytes)
+    """
+    reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    try:
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {host}:{port}", "Connection: close"]
+        for name, value in (headers or {}).items():
+            lines.append(f"{name}: {value}")
+        if body is not None:
+            lines.append(f"Content-Length: {len(body)}")
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + (body or b"")
+
+        writer.write(request)
+        await writer.drain()
+
+        raw = await asyncio.wait_for(reader.read(), timeout)
+    finally:
+        writer.close()
+
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status_line = head.split(b"\r\n", 1)[0]
+    try:
+        status = int(status_line.split()[1])
+    except (IndexError, ValueError):
+        raise ConnectionError(f"无效的响应: {status_line[:80]!r}")
+
+    if b"transfer-encoding: chunked" in head.lower():
+        payload = _dechunk(payload)
+    return status, payload
+
+
+def _dechunk(data: bytes) -> bytes:
+    """解码 chunked 响应体"""
+    out = bytearray()
+    while data:
+        size_line, _, rest = data.partition(b"\r\n")
+        size = int(size_line.split(b";")[0] or b"0", 16)
+        if size == 0:
+            break
+        out += rest[:size]
+        data = rest[size + 2:]
+    return bytes(out)
+
+
+# ============================================================================
+# 压测
+# ============================================================================
+
+def parse_mix(text: str) -> dict:
+    """解析请求配比，例如 health=1,execute=1,status=2"""
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("health", "execute", "status"):
+            raise ValueError(f"未知的请求类型: {name}")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("请求配比权重不能全部为 0")
+    return mix
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """最近秩百分位数"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies) -> dict:
+    values = sorted(latencies)
+    summary = {f"p{p}": round(percentile(values, p) * 1000, 3) for p in LATENCY_PERCENTILES}
+    summary["min"] = round(values[0] * 1000, 3) if values else 0.0
+    summary["max"] = round(values[-1] * 1000, 3) if values else 0.0
+    summary["mean"] = round(sum(values) / len(values) * 1000, 3) if values else 0.0
+    return summary
+
+
+class LoadGenerator:
+    """按配比和并发数发送请求并记录结果"""
+
+    def __init__(self, host, port, mix, concurrency=8, duration=10.0, total_requests=0,
+                 api_key=None, priority=None, timeout=10.0, seed=None):
+        self.host = host
+        self.port = port
+        self.kinds = list(mix)
+        self.weights = [mix[k] for k in self.kinds]
+        self.concurrency = concurrency
+        self.duration = duration
+        self.total_requests = total_requests
+        self.timeout = timeout
+        self.random = random.Random(seed)
+
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["X-API-Key"] = api_key
+        self.priority = priority
+
+        self.task_ids = deque(maxlen=TASK_ID_POOL)
+        self.issued = 0
+        self.records = {k: {"latencies": [], "status_codes": {}, "errors": 0, "throttled": 0,
+                            "not_found": 0, "exceptions": {}}
+                        for k in set(self.kinds) | {"execute"}}
+
+    def _next_request(self):
+        kind = self.random.choices(self.kinds, self.weights)[0]
+        if kind == "status" and not self.task_ids:
+            kind = "execute"                 # 还没有可查询的任务，先提交一个
+        if kind == "health":
+            return kind, "GET", "/health", None
+        if kind == "execute":
+            payload = {"instruction": self.random.choice(DEFAULT_INSTRUCTIONS)}
+            if self.priority:
+                payload["priority"] = self.priority
+            return kind, "POST", "/execute/ai", json.dumps(payload).encode("utf-8")
+        task_id = self.random.choice(self.task_ids)
+        return kind, "GET", f"/status/{task_id}", None
+
+    def _record(self, kind, latency, status=None, body=None, exc=None):
+        rec = self.records[kind]
+        if exc is not None:
+            rec["errors"] += 1
+            name = type(exc).__name__
+            rec["exceptions"][name] = rec["exceptions"].get(name, 0) + 1
+            return
+
+        rec["status_codes"][str(status)] = rec["status_codes"].get(str(status), 0) + 1
+        if status == 429:
+            rec["throttled"] += 1
+        elif status == 404:
+            rec["not_found"] += 1
+        elif status >= 400:
+            rec["errors"] += 1
+        else:
+            rec["latencies"].append(latency)
+        if status < 400 and kind == "execute":
+            try:
+                task_id = json.loads(body).get("task_id")
+            except (ValueError, AttributeError):
+                task_id = None
+            if task_id:
+                self.task_ids.append(task_id)
+
+    async def _worker(self, stop_at):
+        while True:
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                return
+            if self.total_requests and self.issued >= self.total_requests:
+                return
+            self.issued += 1
+
+            kind, method, path, body = self._next_request()
+            start = time.perf_counter()
+            try:
+                status, payload = await http_request(self.host, self.port, method, path,
+                                                     headers=self.headers, body=body, timeout=self.timeout)
+            except (OSError, asyncio.TimeoutError, ConnectionError) as e:
+                self._record(kind, time.perf_counter() - start, exc=e)
+            else:
+                self._record(kind, time.perf_counter() - start, status, payload)
+
+    async def run(self) -> dict:
+        start = time.perf_counter()
+        stop_at = None if self.total_requests else start + self.duration
+        await asyncio.gather(*(self._worker(stop_at) for _ in range(self.concurrency)))
+        elapsed = time.perf_counter() - start
+        return self._report(elapsed)
+
+    def _report(self, elapsed: float) -> dict:
+        endpoints = {}
+        all_latencies = []
+        total = errors = throttled = not_found = 0
+
+        for kind, rec in self.records.items():
+            count = sum(rec["status_codes"].values()) + sum(rec["exceptions"].values())
+            if not count and kind not in self.kinds:
+                continue
+            failed = rec["errors"] + rec["throttled"] + rec["not_found"]
+            total += count
+            errors += failed
+            throttled += rec["throttled"]
+            not_found += rec["not_found"]
+            all_latencies.extend(rec["latencies"])
+            endpoints[kind] = {
+                "requests": count,
+                "throughput_rps": round(count / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(failed / count, 4) if count else 0.0,
+                "throttled": rec["throttled"],
+                "not_found": rec["not_found"],
+                "status_codes": rec["status_codes"],
+                "exceptions": rec["exceptions"],
+                "latency_ms": summarize_latencies(rec["latencies"]),
+            }
+
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "throttled": throttled,
+            "not_found": not_found,
+            "latency_ms": summarize_latencies(all_latencies),
+            "endpoints": endpoints,
+        }
+
+
+# ============================================================================
+# 本地后端
+# ============================================================================
+
+def start_local_backend(port: int = 0, admission: bool = False):
+    """
+    在后台线程中启动 minimal_backend（werkzeug 多线程服务器）
+
+    Args:
+        admission: 是否保留准入控制（默认关闭，压测的是纯处理路径；
+            压测流量都来自同一地址，开启后大部分请求会被限流）
+
+    Returns:
+        (server, port)
+    """
+    from werkzeug.serving import make_server
+    import minimal_backend
+
+    # 压测时关闭逐请求的访问日志
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    minimal_backend.admission.enabled = admission
+
+    server = make_server("127.0.0.1", port, minimal_backend.app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="bench-backend", daemon=True)
+    thread.start()
+    return server, server.server_port
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="后端 API 压测")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:5000", help="后端地址")
+    target.add_argument("--local", action="store_true", help="在本进程内启动 minimal_backend")
+    parser.add_argument("--concurrency", "-c", type=int, default=8, help="并发连接数")
+    parser.add_argument("--duration", "-d", type=float, default=10.0, help="压测时长（秒）")
+    parser.add_argument("--requests", "-n", type=int, default=0, help="总请求数（设置后忽略 --duration）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"请求配比（默认 {DEFAULT_MIX}）")
+    parser.add_argument("--api-key", default=os.environ.get("COMET_API_KEY"), help="X-API-Key")
+    parser.add_argument("--priority", help="execute 请求的 priority 字段")
+    parser.add_argument("--timeout", type=float, default=10.0, help="单个请求超时（秒）")
+    parser.add_argument("--label", default="", help="本次压测标签（用于对比）")
+    parser.add_argument("--seed", type=int, help="随机种子")
+    parser.add_argument("--output", "-o", help="追加 JSON 结果到文件（每行一个结果）")
+    parser.add_argument("--admission", action="store_true",
+                        help="--local 时保留准入控制（限流 / 并发上限 / API Key，默认关闭）")
+    parser.add_argument("--verbose", "-v", action="store_true", help="--local 时保留后端的 print 输出")
+    args = parser.parse_args(argv)
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    server = None
+    if args.local:
+        server, port = start_local_backend(admission=args.admission)
+        host = "127.0.0.1"
+        target_url = f"http://{host}:{port}"
+    else:
+        parts = urlsplit(args.url)
+        host, port = parts.hostname, parts.port or 80
+        target_url = args.url
+
+    print(f"🚀 压测 {target_url}  并发={args.concurrency}  配比={args.mix}", file=sys.stderr)
+
+    generator = LoadGenerator(
+        host, port, mix,
+        concurrency=args.concurrency,
+        duration=args.duration,
+        total_requests=args.requests,
+        api_key=args.api_key,
+        priority=args.priority,
+        timeout=args.timeout,
+        seed=args.seed,
+    )
+
+    # 本地后端每个请求都会 print，压测期间丢弃以免影响结果
+    quiet = args.local and not args.verbose
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext()):
+        try:
+            report = asyncio.run(generator.run())
+        finally:
+            if server is not None:
+                server.shutdown()
+
+    result = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "target": "local" if args.local else target_url,
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "concurrency": args.concurrency,
+        "admission": args.admission or not args.local,
+        "mix": mix,
+        **report,
+    }
+
+    text = json.dumps(result, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
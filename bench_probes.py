@@ -0,0 +1,472 @@
+# bench_probes.py
+# 探测函数压测 - 在 Linux 上用模拟的 Windows 接口（大量进程 / 窗口、4K 截图）重复运行各个探测，输出可对比的 JSON
+"""
+探测函数压测
+
+test_lockscreen.py 的 6 个测试和 test_auto_unlock.py 的 is_screen_locked / unlock_screen 依赖
+mss / pywin32 / pyautogui / psutil / ctypes.windll，只能在 Windows 上运行。本脚本在导入探测脚本之前
+把这些模块替换为内存中的模拟实现，规模接近一台实际使用中的机器：
+
+    窗口   - 默认 5000 个顶层窗口（约 40% 可见，约一半有标题，其中一部分匹配查找关键词）
+    进程   - 默认 3000 个进程（svchost / chrome 等常见进程名），--state locked 时包含 LogonUI.exe
+    截图   - 默认 1 台 3840x2160 显示器（--monitors 2 为两台并排），BGRA 帧，锁屏 / 桌面两种内容
+
+模拟接口本身不引入延迟，测得的是探测函数在 Python 侧的开销（枚举、过滤、截图复制、分析、保存）。
+unlock_screen 中脚本化的 time.sleep（按键间隔、等待唤醒）默认不真正等待，累计时长单独记录为
+scripted_sleep_ms；--real-sleep 时真正等待。
+
+每个探测先预热一次，再运行 --runs 次，耗时由 probe_profiler.py 记录（与探测脚本直接运行时相同）。
+--cprofile / --tracemalloc 时每个探测额外运行一次剖析（不计入耗时统计），记录耗时最多的函数和内存峰值。
+探测脚本在临时目录中运行，截图和结果不会写入仓库目录。
+
+使用方法：
+    python bench_probes.py                                   # 所有探测，默认规模
+    python bench_probes.py --probes screenshot,process_check --runs 50
+    python bench_probes.py --windows 20000 --processes 8000 --monitors 2 --capture-mode all
+    python bench_probes.py --cprofile --tracemalloc --label baseline --output probe_results.json
+    python bench_probes.py --label after --compare probe_results.json   # 与文件中最后一次结果对比
+
+结果示例（节选）：
+    {"label": "...", "scale": {"windows": 5000, "processes": 3000, "monitors": 1, ...},
+     "probes": {"screenshot": {"duration_ms": {"median": 36.8, "p95": 52.1, "max": 52.1},
+     "cpu_ms": {...}, "success": true, "profile": {"cprofile": [...], "tracemalloc": {...}}}, ...}}
+
+参考结果（Linux，默认规模，roi 模式）：screenshot 约 37ms（all 模式两台 4K 约 400ms），
+window_enumeration / find_specific_window 约 6-7ms，process_check 约 9ms，is_screen_locked 约 5ms；
+unlock_screen 自身不到 1ms，脚本化等待约 4.1s。
+"""
+
+import argparse
+import ctypes
+import io
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import time
+import types
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+DEFAULT_WINDOWS = 5000
+DEFAULT_PROCESSES = 3000
+DEFAULT_MONITORS = 1
+DEFAULT_RUNS = 20
+FRAME_WIDTH = 3840
+FRAME_HEIGHT = 2160
+BENCH_PASSWORD = "bench-password-123"
+
+# 探测名 -> (模块, 函数名, 参数)
+PROBES = {
+    "screenshot": ("test_lockscreen", "test_1_screenshot", ()),
+    "window_enumeration": ("test_lockscreen", "test_2_window_enumeration", ()),
+    "find_specific_window": ("test_lockscreen", "test_3_find_specific_window", ()),
+    "mouse_position": ("test_lockscreen", "test_4_mouse_position", ()),
+    "keyboard": ("test_lockscreen", "test_5_keyboard", ()),
+    "process_check": ("test_lockscreen", "test_6_process_check", ()),
+    "is_screen_locked": ("test_auto_unlock", "is_screen_locked", ()),
+    "unlock_screen": ("test_auto_unlock", "unlock_screen", (BENCH_PASSWORD, False)),
+}
+
+# 模拟窗口标题 / 进程名（按出现频率重复）
+WINDOW_TITLES = [
+    "", "", "", "", "", "Default IME", "MSCTFIME UI", "Program Manager", "Task Switching",
+    "Comet - 新标签页", "新标签页 - Google Chrome", "Microsoft Edge", "Mozilla Firefox", "无标题 - 记事本",
+    "README.md - Notepad", "设置", "任务管理器", "Windows 输入体验", "Visual Studio Code", "文件资源管理器",
+]
+PROCESS_NAMES = (
+    ["svchost.exe"] * 30 + ["chrome.exe"] * 12 + ["RuntimeBroker.exe"] * 4 + ["conhost.exe"] * 4
+    + ["comet.exe"] * 3 + ["msedgewebview2.exe"] * 3
+    + ["explorer.exe", "dwm.exe", "csrss.exe", "winlogon.exe", "lsass.exe", "services.exe",
+       "SearchHost.exe", "StartMenuExperienceHost.exe", "python.exe", "Code.exe", "OneDrive.exe"]
+)
+
+
+def summarize(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"median": None, "p95": None, "max": None}
+    return {
+        "median": round(statistics.median(values), 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+# ============================================================================
+# 模拟的 Windows 接口
+# ============================================================================
+
+class FakeShot:
+    """mss 截图结果（bgra / raw 为新分配的字节串，与 mss 相同）"""
+
+    def __init__(self, data: bytes, width: int, height: int):
+        self.bgra = self.raw = data
+        self.width = width
+        self.height = height
+
+
+class FakeScreen:
+    """mss.mss() 实例：多台显示器并排组成的虚拟桌面"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.monitors = backend.monitors
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def grab(self, bbox):
+        left = bbox["left"] - self.monitors[0]["left"]
+        top = bbox["top"] - self.monitors[0]["top"]
+        frame = self.backend.canvas[top:top + bbox["height"], left:left + bbox["width"]]
+        return FakeShot(frame.tobytes(), bbox["width"], bbox["height"])
+
+
+class FakeProcess:
+    __slots__ = ("info",)
+
+    def __init__(self, info):
+        self.info = info
+
+
+class FakeUser32:
+    VK_CAPITAL = 0x14
+    VK_NUMLOCK = 0x90
+
+    def __init__(self):
+        self.inputs_sent = 0
+
+    def GetKeyState(self, vk):
+        return 1 if vk == self.VK_NUMLOCK else 0
+
+    def SendInput(self, count, inputs, size):
+        self.inputs_sent += count
+        return count
+
+
+class SleepRecorder:
+    """替换探测模块中的 time：sleep() 只累计时长，其他属性使用真实的 time 模块"""
+
+    def __init__(self, real_sleep: bool = False):
+        self.real_sleep = real_sleep
+        self.slept = 0.0
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        if self.real_sleep:
+            time.sleep(seconds)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+
+class FakeWindows:
+    """
+    模拟的 Windows 接口（窗口、进程、显示器、鼠标、键盘）
+
+    install() 把 mss / win32gui / win32process / pyautogui / psutil 注册到 sys.modules，
+    并设置 ctypes.windll；必须在导入探测脚本之前调用。
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS, processes=DEFAULT_PROCESSES, monitors=DEFAULT_MONITORS,
+                 state="unlocked", seed=0):
+        import numpy as np
+
+        self.state = state
+        rng = random.Random(seed)
+
+        self.processes = []
+        for i in range(processes):
+            self.processes.append({"pid": 4 * (i + 1), "name": rng.choice(PROCESS_NAMES),
+                                   "status": "running" if rng.random() < 0.1 else "sleeping"})
+        if state == "locked" and self.processes:
+            # LogonUI.exe 位置随机，is_screen_locked 平均扫描一半进程
+            self.processes[rng.randrange(len(self.processes))]["name"] = "LogonUI.exe"
+
+        self.windows = {}
+        pids = [p["pid"] for p in self.processes] or [4]
+        for i in range(windows):
+            hwnd = 0x10000 + 2 * i
+            title = rng.choice(WINDOW_TITLES)
+            x, y = rng.randrange(-8, FRAME_WIDTH), rng.randrange(-8, FRAME_HEIGHT)
+            self.windows[hwnd] = {
+                "title": f"{title} ({i})" if title and rng.random() < 0.5 else title,
+                "visible": rng.random() < 0.4,
+                "pid": rng.choice(pids),
+                "rect": (x, y, x + rng.randrange(200, 1600), y + rng.randrange(120, 1000)),
+            }
+
+        # 显示器并排排列，monitors[0] 为外接矩形（与 mss 相同）
+        monitor_list = [{"left": FRAME_WIDTH * i, "top": 0, "width": FRAME_WIDTH, "height": FRAME_HEIGHT}
+                        for i in range(monitors)]
+        self.monitors = [{"left": 0, "top": 0, "width": FRAME_WIDTH * monitors, "height": FRAME_HEIGHT}]
+        self.monitors += monitor_list
+        self.canvas = self._frames(np, monitors, seed)
+        self.frame_variant = 0
+        self.cursor = (FRAME_WIDTH // 3, FRAME_HEIGHT // 3)
+        self.user32 = FakeUser32()
+
+    def _frames(self, np, monitors, seed):
+        """锁屏：深色 + 左下角亮色时钟块；桌面：随机噪声"""
+        shape = (FRAME_HEIGHT, FRAME_WIDTH * monitors, 4)
+        if self.state == "locked":
+            canvas = np.full(shape, 18, dtype=np.uint8)
+            for i in range(monitors):
+                left = FRAME_WIDTH * i
+                canvas[int(FRAME_HEIGHT * 0.7):int(FRAME_HEIGHT * 0.8),
+                       left + int(FRAME_WIDTH * 0.05):left + int(FRAME_WIDTH * 0.25), :3] = 235
+            return canvas
+        return np.random.default_rng(seed).integers(0, 256, size=shape, dtype=np.uint8)
+
+    def vary_frame(self):
+        """修改一小块像素（模拟时钟变化），让截图内容每次不同"""
+        self.frame_variant += 1
+        self.canvas[int(FRAME_HEIGHT * 0.72):int(FRAME_HEIGHT * 0.72) + 64,
+                    int(FRAME_WIDTH * 0.1):int(FRAME_WIDTH * 0.1) + 64, :3] = self.frame_variant % 256
+
+    # ---- win32gui / win32process ----
+
+    def enum_windows(self, callback, extra):
+        for hwnd in self.windows:
+            if callback(hwnd, extra) is False:
+                break
+
+    def window_thread_process_id(self, hwnd):
+        return hwnd // 2, self.windows[hwnd]["pid"]
+
+    # ---- psutil ----
+
+    def process_iter(self, attrs=None):
+        for proc in self.processes:
+            yield FakeProcess({key: proc[key] for key in attrs} if attrs else dict(proc))
+
+    # ---- pyautogui ----
+
+    def move_to(self, x, y, duration=0.0, **kwargs):
+        self.cursor = (int(x), int(y))
+
+    def move(self, dx, dy, duration=0.0, **kwargs):
+        self.cursor = (self.cursor[0] + int(dx), self.cursor[1] + int(dy))
+
+    def install(self):
+        windows = self.windows
+
+        mss = types.ModuleType("mss")
+        mss.mss = lambda **kwargs: FakeScreen(self)
+
+        win32gui = types.ModuleType("win32gui")
+        win32gui.EnumWindows = self.enum_windows
+        win32gui.IsWindowVisible = lambda hwnd: windows[hwnd]["visible"]
+        win32gui.GetWindowText = lambda hwnd: windows[hwnd]["title"]
+        win32gui.GetWindowRect = lambda hwnd: windows[hwnd]["rect"]
+
+        win32process = types.ModuleType("win32process")
+        win32process.GetWindowThreadProcessId = self.window_thread_process_id
+
+        psutil = types.ModuleType("psutil")
+        psutil.NoSuchProcess = type("NoSuchProcess", (Exception,), {})
+        psutil.AccessDenied = type("AccessDenied", (Exception,), {})
+        psutil.process_iter = self.process_iter
+
+        pyautogui = types.ModuleType("pyautogui")
+        pyautogui.FAILSAFE = True
+        pyautogui.position = lambda: self.cursor
+        pyautogui.size = lambda: (FRAME_WIDTH, FRAME_HEIGHT)
+        pyautogui.moveTo = self.move_to
+        pyautogui.move = self.move
+
+        for module in (mss, win32gui, win32process, psutil, pyautogui):
+            sys.modules[module.__name__] = module
+        ctypes.windll = types.SimpleNamespace(user32=self.user32)
+
+    def describe(self) -> dict:
+        visible = [w for w in self.windows.values() if w["visible"]]
+        return {
+            "windows": len(self.windows),
+            "visible_windows": len(visible),
+            "titled_visible_windows": sum(1 for w in visible if w["title"]),
+            "processes": len(self.processes),
+            "monitors": len(self.monitors) - 1,
+            "frame": f"{FRAME_WIDTH}x{FRAME_HEIGHT}",
+            "frame_mb": round(self.canvas.nbytes / 1024 / 1024, 1),
+            "state": self.state,
+        }
+
+
+# ============================================================================
+# 压测
+# ============================================================================
+
+def succeeded(name, result) -> bool:
+    if isinstance(result, dict):
+        return bool(result.get("success"))
+    if name == "is_screen_locked":
+        return result is not None                    # None 表示无法检测
+    return result is True
+
+
+def run_probe(name, func, args, backend, sleeper, runs, vary_frames, profile_opts):
+    import probe_profiler
+
+    samples, cpu, sleeps = [], [], []
+    result = None
+    inputs_before = backend.user32.inputs_sent
+    probe_profiler.configure(cprofile=False, tracemalloc=False, output=None)
+    for i in range(runs + 1):                        # 第一次为预热
+        if vary_frames:
+            backend.vary_frame()
+        sleeper.slept = 0.0
+        with redirect_stdout(io.StringIO()):
+            result = func(*args)
+        if i == 0:
+            continue
+        record = probe_profiler.last(name)
+        samples.append(record["duration_ms"])
+        cpu.append(record["cpu_ms"])
+        sleeps.append(sleeper.slept * 1000)
+
+    report = {
+        "runs": runs,
+        "duration_ms": summarize(samples),
+        "cpu_ms": summarize(cpu),
+        "success": succeeded(name, result),
+    }
+    if isinstance(result, dict) and result.get("error"):
+        report["error"] = result["error"]
+    if any(sleeps):
+        report["scripted_sleep_ms"] = round(statistics.median(sleeps), 3)
+    inputs = backend.user32.inputs_sent - inputs_before
+    if inputs:
+        report["inputs_per_run"] = inputs // (runs + 1)
+
+    if profile_opts["cprofile"] or profile_opts["tracemalloc"]:
+        probe_profiler.configure(cprofile=profile_opts["cprofile"], tracemalloc=profile_opts["tracemalloc"],
+                                 top=profile_opts["top"])
+        with redirect_stdout(io.StringIO()):
+            func(*args)
+        record = probe_profiler.last(name)
+        report["profile"] = {key: record[key] for key in ("duration_ms", "cprofile", "tracemalloc") if key in record}
+        probe_profiler.configure(cprofile=False, tracemalloc=False)
+    return report
+
+
+def load_baseline(path) -> dict:
+    """读取结果文件中的最后一次结果"""
+    lines = [line for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+    return json.loads(lines[-1]) if lines else {}
+
+
+def compare(probes: dict, baseline: dict) -> dict:
+    comparison = {}
+    for name, report in probes.items():
+        before = baseline.get("probes", {}).get(name, {}).get("duration_ms", {}).get("median")
+        after = report["duration_ms"]["median"]
+        if before and after is not None:
+            comparison[name] = {"baseline_median_ms": before, "median_ms": after,
+                                "ratio": round(after / before, 3)}
+    return comparison
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="探测函数压测（模拟 Windows 接口）")
+    parser.add_argument("--probes", default=",".join(PROBES), help="逗号分隔的探测名")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS, help="每个探测的运行次数（另有 1 次预热）")
+    parser.add_argument("--windows", type=int, default=DEFAULT_WINDOWS, help="模拟的顶层窗口数")
+    parser.add_argument("--processes", type=int, default=DEFAULT_PROCESSES, help="模拟的进程数")
+    parser.add_argument("--monitors", type=int, default=DEFAULT_MONITORS, help="4K 显示器数量")
+    parser.add_argument("--state", choices=["unlocked", "locked"], default="unlocked",
+                        help="locked: 进程中有 LogonUI.exe，截图为锁屏画面")
+    parser.add_argument("--capture-mode", choices=["primary", "all", "roi"], help="覆盖 test_lockscreen.CAPTURE_MODE")
+    parser.add_argument("--vary-frames", action="store_true", help="每次运行修改一小块像素（截图内容不重复）")
+    parser.add_argument("--real-sleep", action="store_true", help="unlock_screen 中的 sleep 真正等待")
+    parser.add_argument("--cprofile", action="store_true", help="每个探测额外运行一次 cProfile")
+    parser.add_argument("--tracemalloc", action="store_true", help="每个探测额外运行一次内存剖析")
+    parser.add_argument("--top", type=int, default=10, help="剖析结果保留的条数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="本次压测标签（用于对比）")
+    parser.add_argument("--compare", help="与该结果文件中最后一次结果对比")
+    parser.add_argument("--output", "-o", help="追加 JSON 结果到文件（每行一个结果）")
+    args = parser.parse_args(argv)
+
+    names = [n.strip() for n in args.probes.split(",") if n.strip()]
+    unknown = [n for n in names if n not in PROBES]
+    if unknown:
+        print(f"❌ 未知的探测: {', '.join(unknown)}（可选: {', '.join(PROBES)}）", file=sys.stderr)
+        return 2
+    baseline = load_baseline(args.compare) if args.compare else None
+    output = Path(args.output).resolve() if args.output else None
+
+    backend = FakeWindows(args.windows, args.processes, args.monitors, args.state, args.seed)
+    backend.install()
+    sleeper = SleepRecorder(args.real_sleep)
+
+    # 探测脚本在临时目录中导入和运行（截图目录、结果存储、参考指纹都使用相对路径）
+    workdir = tempfile.TemporaryDirectory(prefix="bench_probes_")
+    cwd = os.getcwd()
+    os.chdir(workdir.name)
+    sys.path.insert(0, str(BASE_DIR))
+    try:
+        import test_auto_unlock
+        import test_lockscreen
+
+        test_auto_unlock.time = sleeper
+        if args.capture_mode:
+            test_lockscreen.CAPTURE_MODE = args.capture_mode
+        modules = {"test_lockscreen": test_lockscreen, "test_auto_unlock": test_auto_unlock}
+
+        profile_opts = {"cprofile": args.cprofile, "tracemalloc": args.tracemalloc, "top": args.top}
+        probes = {}
+        for name in names:
+            module, func_name, probe_args = PROBES[name]
+            report = run_probe(name, getattr(modules[module], func_name), probe_args, backend, sleeper,
+                               args.runs, args.vary_frames, profile_opts)
+            probes[name] = report
+            status = "📊" if report["success"] else "⚠️ "
+            sleep = f" (+{report['scripted_sleep_ms']}ms sleep)" if "scripted_sleep_ms" in report else ""
+            print(f"{status} {name}: 中位数 {report['duration_ms']['median']}ms / p95 {report['duration_ms']['p95']}ms"
+                  f" / cpu {report['cpu_ms']['median']}ms{sleep}", file=sys.stderr)
+        capture_mode = test_lockscreen.CAPTURE_MODE
+    finally:
+        os.chdir(cwd)
+        workdir.cleanup()
+
+    result = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "scale": {**backend.describe(), "capture_mode": capture_mode, "vary_frames": args.vary_frames,
+                  "real_sleep": args.real_sleep},
+        "probes": probes,
+    }
+    if baseline is not None:
+        result["compare"] = {"baseline_label": baseline.get("label"), "probes": compare(probes, baseline)}
+        for name, row in result["compare"]["probes"].items():
+            print(f"🔁 {name}: {row['baseline_median_ms']}ms → {row['median_ms']}ms (x{row['ratio']})",
+                  file=sys.stderr)
+
+    text = json.dumps(result, ensure_ascii=False)
+    print(text)
+    if output:
+        with open(output, "a", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+# bench_startup.py
+# 启动时间压测 - 对比 minimal_backend.py 与 fast_start.py 的冷启动耗时，并给出导入耗时分解
+"""
+后端启动时间压测
+
+每次启动一个新的后端进程，每 5ms 探测一次，记录从进程启动到以下时间点的耗时：
+    listen  - TCP 端口可以连接
+    live    - GET /health/live 返回 200
+    ready   - GET /health 返回 200（Flask 应用可以处理业务请求）
+
+导入耗时分解使用 `python -X importtime -c "import minimal_backend"`，按顶层包汇总
+自身耗时（self），并列出累计耗时（cumulative）最多的模块。
+
+使用方法：
+    python bench_startup.py                              # fast + standard 各 5 次
+    python bench_startup.py --modes fast --runs 10
+    python bench_startup.py --label lazy-v2 --output startup_results.json
+
+结果示例（节选）：
+    {"label": "...", "modes": {"fast": {"listen_ms": {"median": 45.2, ...},
+     "live_ms": {...}, "ready_ms": {...}}, "standard": {...}},
+     "imports": {"total_ms": 180.3, "packages": {"flask": 35.1, ...}, "top_modules": [...]}}
+"""
+
+import argparse
+import json
+import os
+import platform
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+MODES = {
+    "fast": "fast_start.py",
+    "standard": "minimal_backend.py",
+}
+PROBE_INTERVAL = 0.005
+PROBE_TIMEOUT = 0.5
+STARTUP_TIMEOUT = 30.0
+MILESTONES = ("listen", "live", "ready")
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def http_status(url: str):
+    """返回 HTTP 状态码，连接失败返回 None"""
+    try:
+        with urllib.request.urlopen(url, timeout=PROBE_TIMEOUT) as resp:
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (OSError, urllib.error.URLError):
+        return None
+
+
+def port_open(port: int) -> bool:
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout=PROBE_TIMEOUT):
+            return True
+    except OSError:
+        return False
+
+
+def start_process(script: str, port: int) -> subprocess.Popen:
+    """启动后端进程（独立进程组，方便连同 reloader 子进程一起结束）"""
+    kwargs = {}
+    if os.name == "nt":
+        kwargs["creationflags"] = subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    return subprocess.Popen(
+        [sys.executable, str(BASE_DIR / script), "--host", "127.0.0.1", "--port", str(port)],
+        cwd=str(BASE_DIR),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        **kwargs,
+    )
+
+
+def stop_process(proc: subprocess.Popen):
+    if proc.poll() is not None:
+        return
+    if os.name == "nt":
+        subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    else:
+        os.killpg(proc.pid, signal.SIGTERM)
+    try:
+        proc.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
+
+
+def measure_startup(mode: str, timeout: float = STARTUP_TIMEOUT) -> dict:
+    """启动一次后端并记录各时间点（毫秒），超时的时间点为 None"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    result = dict.fromkeys(MILESTONES)
+
+    start = time.perf_counter()
+    proc = start_process(MODES[mode], port)
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline and result["ready"] is None:
+            if proc.poll() is not None:
+                result["error"] = f"process exited with code {proc.returncode}"
+                break
+
+            if result["listen"] is None and port_open(port):
+                result["listen"] = time.perf_counter() - start
+            if result["listen"] is not None:
+                if result["live"] is None and http_status(base + "/health/live") == 200:
+                    result["live"] = time.perf_counter() - start
+                if http_status(base + "/health") == 200:
+                    result["ready"] = time.perf_counter() - start
+                    # 就绪后 live 一定可用；探测顺序导致的遗漏按就绪时间计
+                    if result["live"] is None:
+                        result["live"] = result["ready"]
+                    continue
+            time.sleep(PROBE_INTERVAL)
+    finally:
+        stop_process(proc)
+
+    for name in MILESTONES:
+        if result[name] is not None:
+            result[name] = round(result[name] * 1000, 3)
+    return result
+
+
+def summarize(values) -> dict:
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {"median": None, "min": None, "max": None, "mean": None}
+    return {
+        "median": round(statistics.median(values), 3),
+        "min": values[0],
+        "max": values[-1],
+        "mean": round(statistics.mean(values), 3),
+    }
+
+
+def import_breakdown(module: str = "minimal_backend", top: int = 15) -> dict:
+    """
+    使用 -X importtime 分解导入耗时
+
+    Returns:
+        {"total_ms", "packages": {顶层包: 自身耗时 ms}, "top_modules": [{"module", "self_ms", "cumulative_ms"}]}
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(BASE_DIR), capture_output=True, text=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        # import time:       479 |     162010 |   flask
+        try:
+            self_us, cumulative_us, name = line.partition(":")[2].split("|")
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+
+    packages = {}
+    for name, self_us, _ in rows:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+
+    total_us = sum(self_us for _, self_us, _ in rows)
+    top_modules = sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+    return {
+        "module": module,
+        "total_ms": round(total_us / 1000, 3),
+        "packages": {k: round(v / 1000, 3)
+                     for k, v in sorted(packages.items(), key=lambda kv: kv[1], reverse=True)[:top]},
+        "top_modules": [
+            {"module": name, "self_ms": round(s / 1000, 3), "cumulative_ms": round(c / 1000, 3)}
+            for name, s, c in top_modules
+        ],
+        "error": proc.stderr.strip().splitlines()[-1] if proc.returncode else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="后端启动时间压测")
+    parser.add_argument("--modes", default="fast,standard", help="逗号分隔: fast / standard")
+    parser.add_argument("--runs", "-n", type=int, default=5, help="每种模式启动次数")
+    parser.add_argument("--timeout", type=float, default=STARTUP_TIMEOUT, help="单次启动最长等待（秒）")
+    parser.add_argument("--top", type=int, default=15, help="导入分解中列出的模块 / 包数量")
+    parser.add_argument("--no-imports", action="store_true", help="跳过导入耗时分解")
+    parser.add_argument("--label", default="", help="本次压测标签（用于对比）")
+    parser.add_argument("--output", "-o", help="追加 JSON 结果到文件（每行一个结果）")
+    args = parser.parse_args(argv)
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        print(f"❌ 未知的启动模式: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    results = {}
+    for mode in modes:
+        runs = []
+        for i in range(args.runs):
+            run = measure_startup(mode, timeout=args.timeout)
+            runs.append(run)
+            print(f"⏱️  {mode} #{i + 1}: listen={run['listen']}ms live={run['live']}ms ready={run['ready']}ms",
+                  file=sys.stderr)
+        results[mode] = {
+            **{f"{name}_ms": summarize(r[name] for r in runs) for name in MILESTONES},
+            "failures": sum(1 for r in runs if r["ready"] is None),
+            "runs": runs,
+        }
+
+    result = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "runs": args.runs,
+        "modes": results,
+    }
+    if not args.no_imports:
+        result["imports"] = import_breakdown(top=args.top)
+
+    text = json.dumps(result, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# bench_task_cache.py
+# 任务记录内存压测 - 对比原来的 dict-per-task 记录与 task_cache.py 环形缓存的内存占用和查询耗时
+"""
+任务记录内存压测
+
+每个场景在单独的子进程中运行（避免前一个场景的内存影响 RSS），依次：
+    1. 写入 N 个任务（add + running + done，与后端一个任务的生命周期相同）
+    2. 记录 RSS 增量（/proc/self/statm，不可用时使用 ru_maxrss 峰值）
+    3. 随机查询最近 capacity 个任务（内存命中）和已淘汰的任务（spill 文件），记录单次耗时
+
+场景：
+    dict   - 原来的全局 dict，每个任务一个 dict（内存随任务数增长）
+    ring   - RecentTaskCache(capacity)，被淘汰的记录写入临时目录中的 spill 文件（不轮换）
+
+使用方法：
+    python bench_task_cache.py                                 # 100k 任务（约 10 秒）
+    python bench_task_cache.py --tasks 100000,1000000          # 加上 1M 任务（几分钟）
+    python bench_task_cache.py --tasks 100000 --capacity 50000
+    python bench_task_cache.py --tracemalloc --output task_cache_results.json
+
+结果示例（节选）：
+    {"label": "...", "capacity": 10000, "scenarios": [{"kind": "ring", "tasks": 1000000,
+     "rss_mb": 6.9, "bytes_per_task": 7.2, "add_us": 43.1, "hit_us": {"median": 3.6, ...},
+     "spill_us": {"median": 129961.9, ...}}, ...]}
+
+参考结果（Linux，capacity=10000）：dict 100k / 1M 任务 +105MB / +1042MB，ring 均为 +7MB；
+已淘汰任务的查询需要从 spill 文件末尾向前扫描，耗时随文件大小增长（1M 任务约 130ms）。
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent
+
+KINDS = ("dict", "ring")
+DEFAULT_TASKS = "100000"
+DEFAULT_CAPACITY = 10000
+LOOKUPS = 2000
+SPILL_LOOKUPS = 50
+SCENARIO_TIMEOUT = 900.0
+
+
+def rss_bytes():
+    """当前 RSS（Linux 读取 /proc/self/statm；其他平台返回 ru_maxrss 峰值）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:                  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def summarize(values) -> dict:
+    values = sorted(values)
+    if not values:
+        return {"median": None, "p99": None, "max": None}
+    return {
+        "median": round(statistics.median(values), 3),
+        "p99": round(values[min(len(values) - 1, int(len(values) * 0.99))], 3),
+        "max": round(values[-1], 3),
+    }
+
+
+def timed_lookups(lookup, task_ids) -> dict:
+    """逐个查询，返回单次耗时（微秒）统计"""
+    samples = []
+    for task_id in task_ids:
+        start = time.perf_counter()
+        found = lookup(task_id)
+        samples.append((time.perf_counter() - start) * 1e6)
+        if found is None:
+            raise RuntimeError(f"任务 {task_id} 查询失败")
+    return summarize(samples)
+
+
+class DictTasks:
+    """原来 minimal_backend.py 中的任务记录方式（每个任务一个 dict，只增不减）"""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def add(self, task_id, instruction, priority, trace_id, parent_span_id, created_at):
+        self.tasks[task_id] = {
+            "instruction": instruction,
+            "status": "queued",
+            "priority": priority,
+            "handler": "ai",
+            "created_at": datetime.fromtimestamp(created_at).isoformat(),
+            "started_at": None,
+            "finished_at": None,
+            "queued_at": created_at,
+            "trace": {"trace_id": trace_id, "parent_span_id": parent_span_id},
+        }
+
+    def update(self, task_id, state, at, result=None):
+        task = self.tasks[task_id]
+        task["status"] = state
+        task["started_at" if state == "running" else "finished_at"] = datetime.fromtimestamp(at).isoformat()
+
+    def get(self, task_id):
+        return self.tasks.get(task_id)
+
+
+class RingTasks:
+    """RecentTaskCache 包装成与 DictTasks 相同的接口"""
+
+    def __init__(self, capacity, spill_path):
+        from task_cache import RecentTaskCache
+        self.cache = RecentTaskCache(capacity, spill_path, spill_max_bytes=0)   # 不轮换，保证所有任务可查
+
+    def add(self, task_id, instruction, priority, trace_id, parent_span_id, created_at):
+        self.cache.add(task_id, instruction, priority=priority, handler="ai", trace_id=trace_id,
+                       parent_span_id=parent_span_id, created_at=created_at)
+
+    def update(self, task_id, state, at, result=None):
+        if state == "running":
+            self.cache.update(task_id, state=state, started_at=at)
+        else:
+            self.cache.update(task_id, state=state, finished_at=at, result=result)
+
+    def get(self, task_id):
+        return self.cache.get(task_id)
+
+
+def run_scenario(kind: str, tasks: int, capacity: int, use_tracemalloc: bool = False) -> dict:
+    """在当前进程中运行一个场景（由子进程调用）"""
+    if use_tracemalloc:
+        import tracemalloc
+        tracemalloc.start()
+    rng = random.Random(tasks)
+    workdir = tempfile.TemporaryDirectory(prefix="bench_task_cache_")
+    spill_path = Path(workdir.name) / "tasks.ndjson"
+
+    baseline = rss_bytes()
+    store = DictTasks() if kind == "dict" else RingTasks(capacity, spill_path)
+    offset = 0
+    start = time.perf_counter()
+    for i in range(1, tasks + 1):
+        task_id = f"test-{i}"
+        now = time.time()
+        store.add(task_id, f"/1mu3 task {i}", "normal", os.urandom(16).hex(), os.urandom(8).hex(), now)
+        store.update(task_id, "running", now)
+        size = 40 + i % 200
+        store.update(task_id, "done", now, {"offset": offset, "size": size, "truncated": False, "spooled": False})
+        offset += size
+    add_seconds = time.perf_counter() - start
+    rss = rss_bytes()
+
+    recent = [f"test-{rng.randint(max(1, tasks - capacity + 1), tasks)}" for _ in range(LOOKUPS)]
+    result = {
+        "kind": kind,
+        "tasks": tasks,
+        "capacity": capacity if kind == "ring" else None,
+        "rss_mb": round((rss - baseline) / 1024 / 1024, 1) if rss and baseline else None,
+        "bytes_per_task": round((rss - baseline) / tasks, 1) if rss and baseline else None,
+        "add_us": round(add_seconds / tasks * 1e6, 3),
+        "hit_us": timed_lookups(store.get, recent),
+    }
+    if kind == "ring":
+        result["array_bytes"] = store.cache.array_bytes()
+        if tasks > capacity:
+            evicted = [f"test-{rng.randint(1, tasks - capacity)}" for _ in range(SPILL_LOOKUPS)]
+            result["spill_us"] = timed_lookups(store.get, evicted)
+            result["spill_file_mb"] = round(spill_path.stat().st_size / 1024 / 1024, 1)
+        store.cache.spill.close()
+    if use_tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        result["traced_mb"] = round(current / 1024 / 1024, 1)
+        result["traced_peak_mb"] = round(peak / 1024 / 1024, 1)
+        tracemalloc.stop()
+    workdir.cleanup()
+    return result
+
+
+def measure(kind: str, tasks: int, capacity: int, use_tracemalloc: bool = False) -> dict:
+    """在新的子进程中运行场景"""
+    cmd = [sys.executable, str(Path(__file__).resolve()), "--scenario", kind,
+           "--tasks", str(tasks), "--capacity", str(capacity)]
+    if use_tracemalloc:
+        cmd.append("--tracemalloc")
+    proc = subprocess.run(cmd, cwd=str(BASE_DIR), capture_output=True, text=True, timeout=SCENARIO_TIMEOUT)
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+        return {"kind": kind, "tasks": tasks, "error": error}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="任务记录内存压测")
+    parser.add_argument("--kinds", default=",".join(KINDS), help="逗号分隔: dict / ring")
+    parser.add_argument("--tasks", default=DEFAULT_TASKS, help="逗号分隔的任务数")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="环形缓存容量")
+    parser.add_argument("--tracemalloc", action="store_true", help="同时用 tracemalloc 统计（明显变慢）")
+    parser.add_argument("--label", default="", help="本次压测标签（用于对比）")
+    parser.add_argument("--output", "-o", help="追加 JSON 结果到文件（每行一个结果）")
+    parser.add_argument("--scenario", choices=KINDS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.scenario:
+        print(json.dumps(run_scenario(args.scenario, int(args.tasks), args.capacity, args.tracemalloc)))
+        return 0
+
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        print(f"❌ 未知的场景: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    scenarios = []
+    for tasks in (int(n) for n in args.tasks.split(",") if n.strip()):
+        for kind in kinds:
+            print(f"⏳ {kind} {tasks}...", file=sys.stderr, flush=True)
+            run = measure(kind, tasks, args.capacity, args.tracemalloc)
+            scenarios.append(run)
+            if "error" in run:
+                print(f"❌ {kind} {tasks}: {run['error']}", file=sys.stderr)
+                continue
+            spill = f" spill={run['spill_us']['median']}us" if "spill_us" in run else ""
+            print(f"📊 {kind} {tasks}: rss=+{run['rss_mb']}MB ({run['bytes_per_task']}B/task) "
+                  f"add={run['add_us']}us hit={run['hit_us']['median']}us{spill}", file=sys.stderr)
+
+    result = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "capacity": args.capacity,
+        "scenarios": scenarios,
+    }
+
+    text = json.dumps(result, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(text + "\n")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+# capture_planner.py
+# 截图规划 - 多显示器一次截取 / 只截取关注区域（ROI），降采样分析锁屏特征
+"""
+截图规划与区域分析
+
+test_1_screenshot 原来截取整个主显示器并逐像素分析。锁屏界面的特征只出现在固定区域
+（左下角的时钟、中间的密码框），多台 4K 显示器上全屏截取 + 全量分析的开销没有必要：
+
+    primary - 只截取主显示器（原行为）
+    all     - 一次截取所有显示器的外接矩形（一次 grab），按显示器拆分分析
+    roi     - 只截取配置的关注区域（相对显示器的比例坐标），每个区域一次 grab
+
+分析阶段按 step 跳行跳列采样（scale=0.25 → 每 4 行取一行、每行每 4 个像素取一个），
+直接读取 mss 的 BGRA 字节，不转换为 PIL 图像。颜色多样性阈值是按整个显示器定的，
+关注区域的阈值按区域占显示器的面积比例缩小（小区域即使在桌面上也很少有 500 种颜色）。
+
+使用方法：
+    import mss
+    planner = CapturePlanner(mode="roi", scale=0.25)
+    with mss.mss() as sct:
+        captures = planner.capture(sct)
+    report = planner.analyze(captures)
+    print(report["likely_locked"], report["analysis"])
+"""
+
+import time
+
+CAPTURE_MODES = ("primary", "all", "roi")
+
+# 关注区域：名称 -> (x, y, 宽, 高)，均为相对显示器的比例
+DEFAULT_ROIS = {
+    "clock": (0.03, 0.62, 0.40, 0.30),      # 锁屏左下角的时间和日期
+    "password": (0.35, 0.45, 0.30, 0.25),   # 登录界面中间的头像和密码框
+}
+
+# 颜色多样性最多统计的采样像素数（与原来的"前 10000 个像素"保持可比）
+MAX_DIVERSITY_SAMPLES = 10000
+
+# 整个显示器的锁屏阈值（与原 test_1_screenshot 一致）
+DARK_BRIGHTNESS = 30
+DARK_DIVERSITY = 100
+LOCKED_DIVERSITY = 500
+MIN_DIVERSITY_THRESHOLD = 8     # 按面积缩小后的阈值下限
+
+
+class CaptureRegion:
+    """一个截取区域（屏幕绝对坐标），area_ratio 为区域占所在显示器的面积比例"""
+
+    __slots__ = ("name", "monitor", "left", "top", "width", "height", "area_ratio")
+
+    def __init__(self, name, monitor, left, top, width, height, area_ratio=1.0):
+        self.name = name
+        self.monitor = monitor
+        self.left = left
+        self.top = top
+        self.width = width
+        self.height = height
+        self.area_ratio = area_ratio
+
+    def as_mss(self) -> dict:
+        return {"left": self.left, "top": self.top, "width": self.width, "height": self.height}
+
+    def to_dict(self) -> dict:
+        return {"name": self.name, "monitor": self.monitor, **self.as_mss(), "area_ratio": self.area_ratio}
+
+
+class Capture:
+    """
+    区域截图
+
+    多个区域可以共用同一块缓冲区（all 模式），(offset_x, offset_y) 是区域在缓冲区中的位置
+    """
+
+    __slots__ = ("region", "buffer", "buffer_width", "buffer_height", "offset_x", "offset_y", "grab_ms")
+
+    def __init__(self, region, buffer, buffer_width, buffer_height, offset_x=0, offset_y=0, grab_ms=0.0):
+        self.region = region
+        self.buffer = buffer
+        self.buffer_width = buffer_width
+        self.buffer_height = buffer_height
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.grab_ms = grab_ms
+
+    def to_image(self):
+        """转换为 PIL 图像（只在保存截图时使用）"""
+        from PIL import Image
+
+        img = Image.frombytes("RGB", (self.buffer_width, self.buffer_height), self.buffer, "raw", "BGRX")
+        if (self.offset_x, self.offset_y, self.region.width, self.region.height) != \
+                (0, 0, self.buffer_width, self.buffer_height):
+            img = img.crop((self.offset_x, self.offset_y,
+                            self.offset_x + self.region.width, self.offset_y + self.region.height))
+        return img
+
+
+def plan_regions(monitors, mode="roi", rois=None, monitor_indexes=None):
+    """
+    根据显示器列表（mss 的 sct.monitors，0 为所有显示器的外接矩形）规划截取区域
+
+    Args:
+        mode: primary / all / roi
+        rois: 关注区域（见 DEFAULT_ROIS），roi 模式使用
+        monitor_indexes: roi 模式下应用关注区域的显示器，默认只有主显示器 [1]
+    """
+    if mode not in CAPTURE_MODES:
+        raise ValueError(f"未知的截图模式: {mode}（可选: {', '.join(CAPTURE_MODES)}）")
+
+    if mode == "primary":
+        indexes = [1]
+    elif mode == "all":
+        indexes = list(range(1, len(monitors)))
+    else:
+        indexes = monitor_indexes or [1]
+
+    regions = []
+    for index in indexes:
+        mon = monitors[index]
+        if mode != "roi":
+            regions.append(CaptureRegion(f"monitor{index}", index, mon["left"], mon["top"],
+                                         mon["width"], mon["height"]))
+            continue
+        for name, (rx, ry, rw, rh) in (rois or DEFAULT_ROIS).items():
+            left = mon["left"] + int(mon["width"] * rx)
+            top = mon["top"] + int(mon["height"] * ry)
+            width = max(1, min(int(mon["width"] * rw), mon["left"] + mon["width"] - left))
+            height = max(1, min(int(mon["height"] * rh), mon["top"] + mon["height"] - top))
+            regions.append(CaptureRegion(name if len(indexes) == 1 else f"{name}@{index}",
+                                         index, left, top, width, height,
+                                         round(width * height / (mon["width"] * mon["height"]), 4)))
+    return regions
+
+
+def sample_stats(capture: Capture, step: int = 1, max_diversity_samples: int = MAX_DIVERSITY_SAMPLES) -> dict:
+    """
+    降采样统计区域的平均亮度和颜色多样性
+
+    每 step 行取一行，每行每 step 个像素取一个；直接在 BGRA 字节上切片，不逐像素解码
+    """
+    step = max(1, int(step))
+    region = capture.region
+    row_bytes = capture.buffer_width * 4
+    pixel_stride = 4 * step
+
+    total = 0
+    sampled = 0
+    colors = set()
+    diversity_samples = 0
+
+    for row in range(capture.offset_y, capture.offset_y + region.height, step):
+        start = row * row_bytes + capture.offset_x * 4
+        line = capture.buffer[start:start + region.width * 4]
+        blue, green, red = line[0::pixel_stride], line[1::pixel_stride], line[2::pixel_stride]
+        total += sum(blue) + sum(green) + sum(red)
+        sampled += len(blue)
+        if diversity_samples < max_diversity_samples:
+            take = max_diversity_samples - diversity_samples
+            colors.update(zip(red[:take], green[:take], blue[:take]))
+            diversity_samples += min(take, len(blue))
+
+    return {
+        "width": region.width,
+        "height": region.height,
+        "sampled_pixels": sampled,
+        "avg_brightness": round(total / (sampled * 3), 2) if sampled else 0.0,
+        "color_diversity": len(colors),
+    }
+
+
+def diversity_thresholds(area_ratio: float = 1.0):
+    """按区域面积比例缩放的颜色多样性阈值 (暗屏阈值, 锁屏阈值)"""
+    ratio = min(1.0, max(0.0, area_ratio))
+    return (max(MIN_DIVERSITY_THRESHOLD, round(DARK_DIVERSITY * ratio)),
+            max(MIN_DIVERSITY_THRESHOLD, round(LOCKED_DIVERSITY * ratio)))
+
+
+def classify(stats: dict, area_ratio: float = 1.0):
+    """
+    单个区域的锁屏判断（整个显示器的阈值与原 test_1_screenshot 一致，关注区域按面积缩放）
+
+    Returns:
+        (likely_locked, analysis)
+    """
+    dark, locked = diversity_thresholds(area_ratio)
+    if stats["avg_brightness"] < DARK_BRIGHTNESS and stats["color_diversity"] < dark:
+        return True, "可能是黑屏或锁屏界面（亮度低，颜色单一）"
+    if stats["color_diversity"] < locked:
+        return True, "可能是锁屏界面（颜色较少）"
+    return False, "可能捕获到了桌面内容（颜色丰富）"
+
+
+class CapturePlanner:
+    """
+    截图规划器
+
+    Args:
+        mode: primary / all / roi
+        rois: 关注区域配置（roi 模式）
+        monitors: roi 模式下应用关注区域的显示器序号列表
+        scale: 分析时的采样比例（1.0 = 全部像素，0.25 = 每 4 行 / 4 列取一个）
+    """
+
+    def __init__(self, mode="roi", rois=None, monitors=None, scale=1.0):
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"未知的截图模式: {mode}（可选: {', '.join(CAPTURE_MODES)}）")
+        if not 0 < scale <= 1:
+            raise ValueError(f"scale 必须在 (0, 1] 之间: {scale}")
+        self.mode = mode
+        self.rois = rois or DEFAULT_ROIS
+        self.monitors = monitors
+        self.scale = scale
+
+    @property
+    def step(self) -> int:
+        return max(1, round(1 / self.scale))
+
+    def plan(self, monitors):
+        return plan_regions(monitors, self.mode, self.rois, self.monitors)
+
+    def capture(self, sct):
+        """截取规划的区域（sct 为 mss.mss() 实例）"""
+        regions = self.plan(sct.monitors)
+
+        if self.mode == "all" and len(regions) > 1:
+            # 一次截取所有显示器，按显示器拆分（共用缓冲区，不复制）
+            bbox = sct.monitors[0]
+            start = time.perf_counter()
+            shot = sct.grab(bbox)
+            grab_ms = round((time.perf_counter() - start) * 1000, 3)
+            buffer = shot.bgra
+            return [
+                Capture(r, buffer, shot.width, shot.height,
+                        r.left - bbox["left"], r.top - bbox["top"], grab_ms)
+                for r in regions
+            ]
+
+        captures = []
+        for region in regions:
+            start = time.perf_counter()
+            shot = sct.grab(region.as_mss())
+            grab_ms = round((time.perf_counter() - start) * 1000, 3)
+            captures.append(Capture(region, shot.bgra, shot.width, shot.height, grab_ms=grab_ms))
+        return captures
+
+    def analyze(self, captures) -> dict:
+        """
+        分析各区域并汇总
+
+        多数区域判断为锁屏（平票算锁屏）时 likely_locked 为 True
+        """
+        start = time.perf_counter()
+        regions = {}
+        votes = 0
+        for cap in captures:
+            stats = sample_stats(cap, self.step)
+            locked, analysis = classify(stats, cap.region.area_ratio)
+            votes += locked
+            regions[cap.region.name] = {**stats, "area_ratio": cap.region.area_ratio,
+                                        "diversity_threshold": diversity_thresholds(cap.region.area_ratio)[1],
+                                        "likely_locked": locked, "analysis": analysis, "grab_ms": cap.grab_ms}
+
+        likely_locked = bool(captures) and votes * 2 >= len(captures)
+        buffers = {id(cap.buffer): len(cap.buffer) for cap in captures}
+        return {
+            "mode": self.mode,
+            "scale": self.scale,
+            "likely_locked": likely_locked,
+            "analysis": f"{votes}/{len(captures)} 个区域判断为锁屏",
+            "regions": regions,
+            "bytes_captured": sum(buffers.values()),
+            "pixels_analyzed": sum(r["sampled_pixels"] for r in regions.values()),
+            "analyze_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    def estimate_cost(self, monitors) -> dict:
+        """对比本规划与全屏截取所有显示器的像素量（不截图）"""
+        regions = self.plan(monitors)
+        if self.mode == "all" and len(regions) > 1:
+            captured = monitors[0]["width"] * monitors[0]["height"]
+        else:
+            captured = sum(r.width * r.height for r in regions)
+        analyzed = sum(-(-r.width // self.step) * -(-r.height // self.step) for r in regions)
+        full = sum(m["width"] * m["height"] for m in monitors[1:])
+        return {
+            "regions": [r.to_dict() for r in regions],
+            "pixels_captured": captured,
+            "pixels_analyzed": analyzed,
+            "full_pixels": full,
+            "capture_ratio": round(captured / full, 4) if full else 0.0,
+            "analysis_ratio": round(analyzed / full, 4) if full else 0.0,
+        }
@@ -0,0 +1,393 @@
+# context_pool.py
+# 执行上下文池 - 预热浏览器会话，任务之间复用，按使用次数 / 错误回收
+"""
+执行上下文池
+
+每条 /execute/ai 指令都需要一个浏览器会话（Comet / Chrome / Edge 窗口）。冷启动一个会话
+要几秒，连续的签到任务（/1mu3、/iyf）应该复用同一个已经就绪的会话：
+
+1. 启动时预热 size 个上下文（后台线程，不阻塞启动）
+2. worker 通过 lease() 租用上下文，没有空闲上下文时等待（记录等待时间）
+3. 租用前做健康检查，不健康的上下文关闭并替换
+4. 使用 max_uses 次或连续出错 max_errors 次后回收，后台补充新的上下文
+
+上下文类型：
+    DummyContext          - 不依赖任何外部程序，用于 Linux 测试（可模拟冷启动耗时）
+    BrowserWindowContext  - Windows 上绑定一个已打开的浏览器窗口（pywin32）
+
+使用方法：
+    pool = ContextPool(lambda cid: DummyContext(cid, warmup=2.0), size=1, max_uses=20)
+    pool.start()
+    with pool.lease(timeout=30) as ctx:
+        result = ctx.execute("/1mu3")
+"""
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+DEFAULT_POOL_SIZE = 1
+DEFAULT_MAX_USES = 20
+DEFAULT_MAX_ERRORS = 2
+DEFAULT_LEASE_TIMEOUT = 60.0
+CREATE_RETRY_INTERVAL = 5.0    # 创建失败后至少间隔多久再重试
+WAIT_SAMPLE_SIZE = 200
+
+BROWSER_KEYWORDS = ("Comet", "Chrome", "Edge")
+
+
+class ContextError(Exception):
+    """上下文创建或执行失败"""
+
+
+class PoolTimeoutError(Exception):
+    """等待空闲上下文超时"""
+
+
+# ============================================================================
+# 上下文类型
+# ============================================================================
+
+class ExecutionContext:
+    """
+    执行上下文基类
+
+    子类实现 open / healthy / execute / close；uses / errors 由池维护
+    """
+
+    kind = "base"
+
+    def __init__(self, context_id: str):
+        self.context_id = context_id
+        self.uses = 0
+        self.errors = 0
+        self.created_at = datetime.now().isoformat()
+        self.warmup_s = None
+
+    def open(self):
+        """冷启动（池在后台线程中调用）"""
+
+    def healthy(self) -> bool:
+        return True
+
+    def execute(self, instruction: str) -> str:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def describe(self) -> dict:
+        return {
+            "id": self.context_id,
+            "kind": self.kind,
+            "uses": self.uses,
+            "errors": self.errors,
+            "created_at": self.created_at,
+            "warmup_s": self.warmup_s,
+        }
+
+
+class DummyContext(ExecutionContext):
+    """
+    测试用上下文
+
+    Args:
+        warmup: 冷启动耗时（秒），也可以是返回秒数的函数（例如模拟器按分布采样）
+        runner: 执行指令的函数，默认直接返回成功
+    """
+
+    kind = "dummy"
+
+    def __init__(self, context_id: str, warmup=0.0, runner=None):
+        super().__init__(context_id)
+        self.warmup = warmup
+        self.runner = runner
+        self.closed = False
+
+    def open(self):
+        delay = self.warmup() if callable(self.warmup) else self.warmup
+        if delay:
+            time.sleep(delay)
+
+    def healthy(self) -> bool:
+        return not self.closed
+
+    def execute(self, instruction: str) -> str:
+        if self.runner is not None:
+            return self.runner(instruction)
+        return f"Dummy context {self.context_id} executed: {instruction}"
+
+    def close(self):
+        self.closed = True
+
+
+class BrowserWindowContext(ExecutionContext):
+    """
+    Windows 浏览器窗口上下文
+
+    open() 按标题关键词查找一个可见的浏览器窗口并绑定其句柄（查找方式与
+    test_lockscreen.test_3_find_specific_window 一致），healthy() 检查窗口是否仍然存在。
+    执行前把窗口切到前台，实际操作由 runner 完成。
+
+    每个窗口同一时间只绑定给一个上下文（close() 时释放），窗口数少于池大小时多出的上下文创建失败，
+    租用之间不会共用同一个窗口。
+    """
+
+    kind = "browser"
+    _claimed = set()                 # 已被上下文绑定的窗口句柄
+    _claim_lock = threading.Lock()
+
+    def __init__(self, context_id: str, runner, keywords=BROWSER_KEYWORDS):
+        super().__init__(context_id)
+        self.runner = runner
+        self.keywords = keywords
+        self.hwnd = None
+        self.title = None
+
+    def open(self):
+        import win32gui
+
+        found = []
+
+        def enum_callback(hwnd, results):
+            if win32gui.IsWindowVisible(hwnd):
+                title = win32gui.GetWindowText(hwnd)
+                if any(kw.lower() in title.lower() for kw in self.keywords):
+                    results.append((hwnd, title))
+            return True
+
+        win32gui.EnumWindows(enum_callback, found)
+        if not found:
+            raise ContextError(f"未找到浏览器窗口（关键词: {', '.join(self.keywords)}）")
+        with self._claim_lock:
+            free = [(hwnd, title) for hwnd, title in found if hwnd not in self._claimed]
+            if not free:
+                raise ContextError(f"{len(found)} 个浏览器窗口都已绑定到其他上下文")
+            self.hwnd, self.title = free[0]
+            self._claimed.add(self.hwnd)
+
+    def healthy(self) -> bool:
+        import win32gui
+        return self.hwnd is not None and bool(win32gui.IsWindow(self.hwnd))
+
+    def execute(self, instruction: str) -> str:
+        import win32gui
+        win32gui.SetForegroundWindow(self.hwnd)
+        return self.runner(instruction)
+
+    def close(self):
+        with self._claim_lock:
+            self._claimed.discard(self.hwnd)
+
+    def describe(self) -> dict:
+        info = super().describe()
+        info.update(hwnd=self.hwnd, title=(self.title or "")[:80])
+        return info
+
+
+# ============================================================================
+# 上下文池
+# ============================================================================
+
+class ContextPool:
+    """
+    预热的执行上下文池
+
+    Args:
+        factory: factory(context_id) -> ExecutionContext（未 open）
+        size: 上下文数量（通常等于 worker 数量）
+        max_uses: 每个上下文最多使用次数，达到后回收
+        max_errors: 连续出错次数达到后回收
+        lease_timeout: lease() 默认等待时间（秒）
+    """
+
+    def __init__(self, factory, size: int = DEFAULT_POOL_SIZE, max_uses: int = DEFAULT_MAX_USES,
+                 max_errors: int = DEFAULT_MAX_ERRORS, lease_timeout: float = DEFAULT_LEASE_TIMEOUT):
+        self.factory = factory
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.max_errors = max_errors
+        self.lease_timeout = lease_timeout
+
+        self._cond = threading.Condition()
+        self._idle = []
+        self._leased = {}
+        self._warming = 0
+        self._started = False
+        self._last_failure = None
+        self._ids = itertools.count(1)
+
+        self.counters = {
+            # warm_leases: 租用时已有空闲上下文，无需等待
+            "created": 0, "create_failed": 0, "leases": 0, "warm_leases": 0,
+            "lease_timeouts": 0, "recycled_uses": 0, "recycled_errors": 0, "recycled_unhealthy": 0,
+            "recycled_discarded": 0, "closed_surplus": 0,
+        }
+        self._waits = []
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def start(self):
+        """预热上下文（只执行一次）"""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+            missing = self.size
+            self._warming += missing
+        for _ in range(missing):
+            self._spawn()
+
+    def _spawn(self):
+        """后台创建一个上下文（调用前 _warming 已加 1）"""
+        context_id = f"ctx-{next(self._ids)}"
+        threading.Thread(target=self._create, args=(context_id,), name=f"warm-{context_id}", daemon=True).start()
+
+    def _create(self, context_id):
+        ctx = None
+        start = time.monotonic()
+        try:
+            ctx = self.factory(context_id)
+            ctx.open()
+            ctx.warmup_s = round(time.monotonic() - start, 3)
+        except Exception as e:
+            print(f"[{datetime.now()}] 上下文 {context_id} 创建失败: {e}")
+            ctx = None
+        with self._cond:
+            self._warming -= 1
+            if ctx is None:
+                self.counters["create_failed"] += 1
+                self._last_failure = time.monotonic()
+            else:
+                self.counters["created"] += 1
+                self._idle.append(ctx)
+            self._cond.notify_all()
+
+    def _replace(self, ctx, reason: str):
+        """关闭上下文，池未达到当前大小时在后台补充一个新的（调用方持有锁，ctx 已移出 idle / leased）"""
+        self.counters[f"recycled_{reason}"] += 1
+        try:
+            ctx.close()
+        except Exception as e:
+            print(f"[{datetime.now()}] 上下文 {ctx.context_id} 关闭失败: {e}")
+        if len(self._idle) + len(self._leased) + self._warming < self.size:
+            self._warming += 1
+            self._spawn()
+
+    def _record_wait(self, wait: float):
+        self._total_wait += wait
+        self._max_wait = max(self._max_wait, wait)
+        self._waits.append(wait)
+        if len(self._waits) > WAIT_SAMPLE_SIZE:
+            del self._waits[0]
+
+    def acquire(self, timeout: float = None) -> ExecutionContext:
+        """租用一个健康的上下文；超时抛出 PoolTimeoutError"""
+        self.start()
+        timeout = self.lease_timeout if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+        waited = False
+
+        with self._cond:
+            while True:
+                while self._idle:
+                    ctx = self._idle.pop()
+                    if ctx.healthy():
+                        self._leased[ctx.context_id] = ctx
+                        self.counters["leases"] += 1
+                        if not waited:
+                            self.counters["warm_leases"] += 1
+                        self._record_wait(time.monotonic() - start)
+                        return ctx
+                    self._replace(ctx, "unhealthy")
+
+                # 有上下文创建失败时补充，保持池大小（失败后间隔 CREATE_RETRY_INTERVAL 再试）
+                can_retry = (self._last_failure is None
+                             or time.monotonic() >= self._last_failure + CREATE_RETRY_INTERVAL)
+                if len(self._leased) + self._warming < self.size and can_retry:
+                    self._warming += 1
+                    self._spawn()
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters["lease_timeouts"] += 1
+                    raise PoolTimeoutError(f"等待执行上下文超时（{timeout:g} 秒）")
+                waited = True
+                self._cond.wait(min(remaining, CREATE_RETRY_INTERVAL))
+
+    def release(self, ctx: ExecutionContext, error: bool = False, discard: bool = False):
+        """
+        归还上下文；达到使用次数或错误次数上限时回收
+
+        discard=True 时直接替换（例如执行超时，上下文仍被未结束的执行占用）
+        """
+        with self._cond:
+            self._leased.pop(ctx.context_id, None)
+            ctx.uses += 1
+            ctx.errors = ctx.errors + 1 if error else 0
+            if discard:
+                self._replace(ctx, "discarded")
+            elif ctx.errors >= self.max_errors:
+                self._replace(ctx, "errors")
+            elif self.max_uses and ctx.uses >= self.max_uses:
+                self._replace(ctx, "uses")
+            elif len(self._idle) + len(self._leased) + self._warming >= self.size:
+                # resize() 缩小后多出的上下文归还时关闭
+                self.counters["closed_surplus"] += 1
+                ctx.close()
+            else:
+                self._idle.append(ctx)
+            self._cond.notify_all()
+
+    def resize(self, size: int):
+        """修改池大小：变大时在下次租用时补充，变小时关闭多余的空闲上下文（租用中的归还时关闭）"""
+        with self._cond:
+            self.size = max(1, size)
+            surplus = len(self._idle) + len(self._leased) + self._warming - self.size
+            closing = [self._idle.pop() for _ in range(min(max(surplus, 0), len(self._idle)))]
+            self.counters["closed_surplus"] += len(closing)
+            self._cond.notify_all()
+        for ctx in closing:
+            ctx.close()
+
+    @contextmanager
+    def lease(self, timeout: float = None):
+        ctx = self.acquire(timeout)
+        error = discard = False
+        try:
+            yield ctx
+        except Exception as e:
+            error = True
+            # 异常可以声明 discard_context = True（见 handlers.HandlerTimeoutError）
+            discard = getattr(e, "discard_context", False)
+            raise
+        finally:
+            self.release(ctx, error=error, discard=discard)
+
+    def close(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for ctx in idle:
+            ctx.close()
+
+    def stats(self) -> dict:
+        with self._cond:
+            samples = sorted(self._waits)
+            leases = self.counters["leases"]
+            p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+            return {
+                **self.counters,
+                "size": self.size,
+                "idle": len(self._idle),
+                "leased": len(self._leased),
+                "warming": self._warming,
+                "max_uses": self.max_uses,
+                "max_errors": self.max_errors,
+                "avg_lease_wait_s": round(self._total_wait / leases, 4) if leases else 0.0,
+                "p95_lease_wait_s": round(p95, 4),
+                "max_lease_wait_s": round(self._max_wait, 4),
+                "contexts": [c.describe() for c in self._idle + list(self._leased.values())],
+            }
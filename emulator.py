@@ -0,0 +1,288 @@
+# emulator.py
+# Comet TaskRunner 模拟器 - 为 minimal_backend 提供延迟 / 失败 / 启动过程模拟
+"""
+Comet TaskRunner 模拟器
+
+在没有 Windows PC 的 Linux 机器上模拟真实后端的行为，用于调试调度器的并发、超时和重试：
+1. 每条指令的执行时间分布（例如 /1mu3 需要 20-60 秒）
+2. 可配置的失败率（全局 / 按指令）
+3. 模拟 WoL 唤醒后的启动过程：睡眠 → 收到魔术包 → 启动中 → 就绪
+   以及执行上下文（浏览器会话）的冷启动耗时 context_warmup
+4. 并发上限（同时执行的任务数）
+
+启动过程和执行耗时通过可注入的时钟计时（见 sim_clock.py）：
+默认真实时间；离散事件模拟（linux-scheduler/sim_schedule.py）使用 VirtualClock，
+minimal_backend.py --virtual-clock 使用调度脚本维护的 FileClock。
+
+配置文件示例 (emulator.json)：
+    {
+        "time_scale": 1.0,
+        "concurrency": 1,
+        "error_rate": 0.05,
+        "start_asleep": true,
+        "wol_port": 9999,
+        "boot_delay": {"dist": "uniform", "min": 20, "max": 40},
+        "context_warmup": {"dist": "uniform", "min": 3, "max": 8},
+        "instructions": {
+            "/1mu3": {"dist": "uniform", "min": 20, "max": 60},
+            "/iyf": {"dist": "lognormal", "median": 15, "sigma": 0.4, "error_rate": 0.1},
+            "default": {"dist": "fixed", "value": 5}
+        }
+    }
+
+支持的分布：
+    fixed       {"value": 秒}
+    uniform     {"min": 秒, "max": 秒}
+    normal      {"mean": 秒, "stddev": 秒}（截断为 >= 0）
+    lognormal   {"median": 秒, "sigma": 形状参数}
+    exponential {"mean": 秒}
+"""
+
+import heapq
+import json
+import math
+import random
+import socket
+import threading
+
+from sim_clock import RealClock
+
+DEFAULT_PROFILE = {
+    "time_scale": 1.0,             # 所有等待时间乘以该系数（0.01 = 加速 100 倍）
+    "concurrency": 1,
+    "error_rate": 0.0,
+    "start_asleep": False,
+    "wol_port": 9,
+    "boot_delay": {"dist": "uniform", "min": 20, "max": 40},
+    "context_warmup": {"dist": "uniform", "min": 3, "max": 8},
+    "instructions": {
+        "/1mu3": {"dist": "uniform", "min": 20, "max": 60},
+        "/iyf": {"dist": "uniform", "min": 10, "max": 30},
+        "default": {"dist": "fixed", "value": 5},
+    },
+}
+
+MAGIC_HEADER = b"\xff" * 6
+
+
+class EmulatedFailure(Exception):
+    """模拟的任务执行失败"""
+
+
+def sample(spec: dict, rng: random.Random) -> float:
+    """按分布配置采样一个时间（秒）"""
+    dist = spec.get("dist", "fixed")
+    if dist == "fixed":
+        value = spec.get("value", 0)
+    elif dist == "uniform":
+        value = rng.uniform(spec["min"], spec["max"])
+    elif dist == "normal":
+        value = rng.gauss(spec["mean"], spec.get("stddev", 0))
+    elif dist == "lognormal":
+        value = rng.lognormvariate(math.log(spec["median"]), spec.get("sigma", 0.5))
+    elif dist == "exponential":
+        value = rng.expovariate(1.0 / spec["mean"])
+    else:
+        raise ValueError(f"未知的分布类型: {dist}")
+    return max(0.0, float(value))
+
+
+def load_profile(path=None) -> dict:
+    """读取模拟器配置，未指定的字段使用默认值"""
+    profile = json.loads(json.dumps(DEFAULT_PROFILE))
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            custom = json.load(f)
+        instructions = custom.pop("instructions", None)
+        profile.update(custom)
+        if instructions is not None:
+            profile["instructions"] = instructions
+    return profile
+
+
+class Emulator:
+    """
+    模拟后端
+
+    Args:
+        profile: 配置字典（见 load_profile）
+        seed: 随机种子（可复现）
+        clock: 时钟（now() / sleep()），默认真实时间
+    """
+
+    def __init__(self, profile=None, seed=None, clock=None):
+        self.profile = profile or load_profile()
+        self.clock = clock or RealClock()
+        self.rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._state = "asleep" if self.profile.get("start_asleep") else "ready"
+        self._ready_at = None
+        self._wol_thread = None
+        self._arrivals = {}                          # 任务 key -> 到达时刻，只在共享虚拟时钟下记录
+        self._free_at = [float("-inf")] * self.concurrency   # 每个执行槽的空闲时刻（堆）
+
+    @property
+    def time_scale(self) -> float:
+        return float(self.profile.get("time_scale", 1.0))
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, int(self.profile.get("concurrency", 1)))
+
+    def _instruction_spec(self, instruction: str) -> dict:
+        specs = self.profile.get("instructions", {})
+        # 精确匹配，其次按前缀匹配（"/1mu3 extra args" 也算 /1mu3）
+        if instruction in specs:
+            return specs[instruction]
+        for prefix, spec in specs.items():
+            if prefix != "default" and instruction.startswith(prefix):
+                return spec
+        return specs.get("default", {"dist": "fixed", "value": 0})
+
+    # ------------------------------------------------------------------
+    # 任务执行
+    # ------------------------------------------------------------------
+
+    def plan(self, instruction: str):
+        """
+        预先采样一次执行
+
+        Returns:
+            (service_time_seconds, will_fail)
+        """
+        spec = self._instruction_spec(instruction)
+        error_rate = spec.get("error_rate", self.profile.get("error_rate", 0.0))
+        with self._rng_lock:
+            service_time = sample(spec, self.rng)
+            will_fail = self.rng.random() < error_rate
+        return service_time, will_fail
+
+    @property
+    def tracks_arrivals(self) -> bool:
+        """时钟可以等到指定时刻（共享虚拟时钟）时才按到达时刻计算执行时间"""
+        return hasattr(self.clock, "sleep_until")
+
+    def arrive(self, key):
+        """记录任务到达（后端在入队前调用，key 为任务 id；真实时钟下不记录）"""
+        if not self.tracks_arrivals:
+            return
+        with self._state_lock:
+            self._arrivals[key] = self.clock.now()
+
+    def cancel(self, key):
+        """撤销到达记录（任务被拒绝 / 丢弃 / 未执行就失败；已被 execute 使用时不做任何事）"""
+        with self._state_lock:
+            self._arrivals.pop(key, None)
+
+    def pending_arrivals(self) -> int:
+        with self._state_lock:
+            return len(self._arrivals)
+
+    def _virtual_finish(self, key, duration: float) -> float:
+        """
+        按到达时刻和执行槽空闲时刻计算虚拟结束时刻
+
+        调度脚本一次把时钟推进几分钟，worker 醒来时时钟早已越过上一个任务的结束时刻；
+        如果从"现在"开始计时，排队的任务会一直往后拖。这里与 sim_schedule.py 的排队模型一致：
+        开始时刻 = max(到达时刻, 最早空闲的执行槽)
+        """
+        with self._state_lock:
+            arrival = self._arrivals.pop(key, None) if key is not None else None
+            if arrival is None:
+                arrival = self.clock.now()
+            start = max(arrival, heapq.heappop(self._free_at))
+            heapq.heappush(self._free_at, start + duration)
+        return start + duration
+
+    def execute(self, instruction: str, sleep=None, key=None) -> str:
+        """
+        模拟执行一条指令（按时钟阻塞 service_time * time_scale 秒）
+
+        key 为 arrive() 时使用的任务 id，共享虚拟时钟下据此取到达时刻
+        """
+        service_time, will_fail = self.plan(instruction)
+        duration = service_time * self.time_scale
+        if sleep is None and self.tracks_arrivals:
+            self.clock.sleep_until(self._virtual_finish(key, duration))
+        else:
+            (sleep or self.clock.sleep)(duration)
+        if will_fail:
+            raise EmulatedFailure(f"Emulated failure after {service_time:.1f}s: {instruction}")
+        return f"Emulated task completed in {service_time:.1f}s: {instruction}"
+
+    def context_warmup(self) -> float:
+        """采样一次执行上下文冷启动耗时（已乘 time_scale）"""
+        spec = self.profile.get("context_warmup", {"dist": "fixed", "value": 0})
+        with self._rng_lock:
+            return sample(spec, self.rng) * self.time_scale
+
+    # ------------------------------------------------------------------
+    # 电源 / 启动状态
+    # ------------------------------------------------------------------
+
+    def state(self) -> str:
+        with self._state_lock:
+            if self._state == "booting" and self.clock.now() >= self._ready_at:
+                self._state = "ready"
+                self._ready_at = None
+            return self._state
+
+    def is_ready(self) -> bool:
+        return self.state() == "ready"
+
+    def boot_remaining(self) -> float:
+        with self._state_lock:
+            if self._state != "booting":
+                return 0.0
+            return max(0.0, self._ready_at - self.clock.now())
+
+    def wake(self) -> str:
+        """模拟收到 WoL：睡眠状态开始启动，其他状态不变"""
+        with self._state_lock:
+            if self._state == "asleep":
+                with self._rng_lock:
+                    delay = sample(self.profile.get("boot_delay", {"dist": "fixed", "value": 0}), self.rng)
+                self._state = "booting"
+                self._ready_at = self.clock.now() + delay * self.time_scale
+        return self.state()
+
+    def sleep(self):
+        """模拟关机 / 睡眠"""
+        with self._state_lock:
+            self._state = "asleep"
+            self._ready_at = None
+
+    def start_wol_listener(self, port=None, host: str = "0.0.0.0"):
+        """后台监听 UDP 魔术包，收到后调用 wake()"""
+        port = self.profile.get("wol_port", 9) if port is None else port
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError as e:
+            sock.close()
+            print(f"⚠️ 无法监听 WoL 端口 {port}: {e}（可使用 POST /emulator/wake 代替）")
+            return None
+
+        def loop():
+            while True:
+                data, addr = sock.recvfrom(1024)
+                if len(data) >= 102 and data.startswith(MAGIC_HEADER):
+                    print(f"[emulator] 收到 WoL 魔术包 ({addr[0]})，状态: {self.wake()}")
+
+        self._wol_thread = threading.Thread(target=loop, name="emulator-wol", daemon=True)
+        self._wol_thread.start()
+        return port
+
+    def describe(self) -> dict:
+        return {
+            "state": self.state(),
+            "boot_remaining_s": round(self.boot_remaining(), 3),
+            "time_scale": self.time_scale,
+            "clock": type(self.clock).__name__,
+            "pending_arrivals": self.pending_arrivals(),
+            "concurrency": self.concurrency,
+            "error_rate": self.profile.get("error_rate", 0.0),
+            "instructions": self.profile.get("instructions", {}),
+        }
@@ -0,0 +1,195 @@
+# fast_start.py
+# 快速启动 - WoL 冷启动后先打开监听端口应答 /health/live，再加载 Flask 后端
+"""
+后端快速启动模式
+
+WoL 唤醒后 minimal_backend.py 导入 Flask 等依赖需要一段时间，期间端口没有监听，
+Pi 只能看到连接被拒绝。本脚本只依赖标准库：
+
+1. 启动后立即绑定监听端口，由一个轻量线程应答：
+       GET /health/live  -> 200 {"status": "alive", "phase": "starting"}
+       其他请求          -> 503 {"status": "starting"} + Retry-After
+2. 在主线程导入 minimal_backend（Flask / werkzeug 等）
+3. 导入完成后停止临时应答线程，把同一个 socket 交给 werkzeug 继续服务
+   （期间到达的连接留在 listen backlog 中，不会被拒绝）
+
+与直接运行 minimal_backend.py 相比，不使用 debug reloader（reloader 会在子进程中重新导入一遍）。
+
+使用方法：
+    python fast_start.py
+    python fast_start.py --port 5000 --emulator-config emulator.example.json
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+_STARTED_AT = time.perf_counter()
+
+ACCEPT_POLL_INTERVAL = 0.05
+EARLY_READ_TIMEOUT = 1.0
+STARTING_RETRY_AFTER = 1
+LISTEN_BACKLOG = 128
+
+
+def elapsed_ms() -> float:
+    """距离本模块开始加载的毫秒数"""
+    return round((time.perf_counter() - _STARTED_AT) * 1000, 1)
+
+
+def open_listen_socket(host: str, port: int) -> socket.socket:
+    """绑定并监听端口（与 werkzeug 一致，Windows 上不设置 SO_REUSEADDR）"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    if os.name != "nt":
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+
+class EarlyResponder:
+    """
+    应用加载期间的临时应答线程
+
+    只解析请求行，不读取请求体；每个连接应答一次后关闭
+    """
+
+    def __init__(self, sock: socket.socket):
+        self.sock = sock
+        self.served = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.sock.settimeout(ACCEPT_POLL_INTERVAL)
+        self._thread = threading.Thread(target=self._loop, name="early-responder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止应答并恢复 socket 为阻塞模式，之后可以交给 werkzeug"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.sock.settimeout(None)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                conn, _ = self.sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            try:
+                self._handle(conn)
+            except OSError:
+                pass
+            finally:
+                conn.close()
+
+    def _handle(self, conn: socket.socket):
+        conn.settimeout(EARLY_READ_TIMEOUT)
+        data = b""
+        while b"\r\n\r\n" not in data and len(data) < 8192:
+            chunk = conn.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+
+        request_line = data.split(b"\r\n", 1)[0].decode("latin-1", "replace").split()
+        path = request_line[1].split("?", 1)[0] if len(request_line) > 1 else ""
+
+        if path == "/health/live":
+            status, body = "200 OK", {"status": "alive", "phase": "starting", "uptime_ms": elapsed_ms()}
+            extra = ""
+        else:
+            status, body = "503 Service Unavailable", {"status": "starting", "message": "Backend is starting"}
+            extra = f"Retry-After: {STARTING_RETRY_AFTER}\r\n"
+
+        payload = json.dumps(body).encode("utf-8")
+        conn.sendall(
+            (f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+             f"Content-Length: {len(payload)}\r\n{extra}Connection: close\r\n\r\n").encode("latin-1")
+            + payload
+        )
+        self.served += 1
+
+
+def build_listen_parser():
+    """
+    导入后端之前只解析监听地址（只使用标准库）
+
+    其余参数在导入后由 minimal_backend.build_arg_parser() 完整解析，与直接运行后端的参数保持一致
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    return parser
+
+
+def build_arg_parser(minimal_backend):
+    """完整参数（minimal_backend.build_arg_parser()，导入后端之后调用）"""
+    parser = minimal_backend.build_arg_parser()
+    parser.description = "Minimal Test Backend (fast start)"
+    return parser
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if "-h" in argv or "--help" in argv:
+        import minimal_backend
+        build_arg_parser(minimal_backend).parse_args(argv)
+    args, _ = build_listen_parser().parse_known_args(argv)
+
+    try:
+        sock = open_listen_socket(args.host, args.port)
+    except OSError as e:
+        print(f"❌ 无法监听 {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 1
+
+    responder = EarlyResponder(sock)
+    responder.start()
+    listen_ms = elapsed_ms()
+    print(f"⚡ 端口 {args.port} 已监听 ({listen_ms} ms)，/health/live 可用，正在加载后端...", flush=True)
+
+    try:
+        import_start = time.perf_counter()
+        import minimal_backend
+        import_ms = round((time.perf_counter() - import_start) * 1000, 1)
+
+        args = build_arg_parser(minimal_backend).parse_args(argv)
+        minimal_backend.configure(args)
+
+        from werkzeug.serving import make_server
+    except BaseException:
+        responder.stop()
+        sock.close()
+        raise
+
+    responder.stop()
+    server = make_server(args.host, args.port, minimal_backend.app, threaded=True, fd=sock.fileno())
+    # make_server 复制了文件描述符，原 socket 可以关闭
+    sock.close()
+
+    print(f"✅ 后端就绪 ({elapsed_ms()} ms，监听 {listen_ms} ms，导入 {import_ms} ms，"
+          f"加载期间应答 {responder.served} 个请求)", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
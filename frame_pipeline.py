@@ -0,0 +1,352 @@
+# frame_pipeline.py
+# 截图 / 分析多进程流水线 - 共享内存环形缓冲区传递帧，分析进程零拷贝读取
+"""
+持续锁屏监测流水线
+
+test_1_screenshot 在一个线程里依次截图（mss）、转换为 PIL 图像、分析，一帧会被复制多次。
+持续监测时改为多进程：
+
+    截图进程 ──写入──> 共享内存环形缓冲区（slots 个槽位）──零拷贝 NumPy 视图──> N 个分析进程
+
+共享内存布局（multiprocessing.shared_memory）：
+    头部 int64 数组: [write_seq, claim_seq, slot_seq[slots], slot_done[slots], slot_ts[slots]]
+    之后是 slots 个帧 (height, width, 4) BGRA uint8
+
+序号规则：
+    - 第 seq 帧写入槽位 seq % slots；写完后在锁内设置 slot_seq[slot] = seq、write_seq = seq + 1
+    - 槽位空闲 = 从未使用，或 slot_done[slot] == slot_seq[slot]（上一帧已分析完）
+    - 槽位不空闲时丢弃新帧（不覆盖未分析的帧），计入 dropped
+    - 分析进程在锁内领取 claim_seq（< write_seq），分析完设置 slot_done[slot] = seq
+
+使用方法：
+    python frame_pipeline.py --source synthetic --workers 2 --fps 60 --duration 10
+    python frame_pipeline.py --source mss --monitor 1 --fps 10 --duration 60   # Windows 上持续监测
+"""
+
+import argparse
+import json
+import math
+import multiprocessing as mp
+import sys
+import time
+from multiprocessing import shared_memory
+
+from capture_planner import MAX_DIVERSITY_SAMPLES, classify
+
+try:
+    import numpy as np
+except ImportError:  # 只有本流水线需要 numpy，其他探测脚本不受影响
+    np = None
+
+DEFAULT_SLOTS = 4
+DEFAULT_WORKERS = 2
+DEFAULT_SCALE = 0.25
+POLL_INTERVAL = 0.0005
+SYNTHETIC_SHAPE = (1080, 1920, 4)
+SYNTHETIC_SWITCH_SECONDS = 2.0
+
+
+class FrameRing:
+    """
+    共享内存帧环形缓冲区
+
+    Args:
+        shape: 帧形状 (height, width, 4)
+        slots: 槽位数
+        lock: multiprocessing.Lock（所有进程共用）
+        name: 已有共享内存名称（attach 时）
+        create: 是否新建
+    """
+
+    def __init__(self, shape, slots: int, lock, name: str = None, create: bool = False):
+        if np is None:
+            raise RuntimeError("frame_pipeline 需要 numpy（pip install numpy）")
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.lock = lock
+        self.frame_bytes = math.prod(self.shape)
+        header_len = 2 + 3 * slots
+        header_bytes = 8 * header_len
+        size = header_bytes + slots * self.frame_bytes
+
+        # 子进程由创建者启动，与创建者共用 resource_tracker，只有创建者调用 unlink
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size if create else 0)
+
+        self.header = np.ndarray((header_len,), dtype=np.int64, buffer=self.shm.buf)
+        self.slot_seq = self.header[2:2 + slots]
+        self.slot_done = self.header[2 + slots:2 + 2 * slots]
+        self.slot_ts = self.header[2 + 2 * slots:]
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+
+        if create:
+            self.header[:2] = 0
+            self.slot_seq[:] = -1
+            self.slot_done[:] = -1
+            self.slot_ts[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def write_seq(self) -> int:
+        return int(self.header[0])
+
+    @property
+    def claim_seq(self) -> int:
+        return int(self.header[1])
+
+    def try_write(self, frame) -> int:
+        """
+        写入一帧（frame 为 shape 相同的数组或 bytes），只复制一次
+
+        Returns:
+            帧序号；槽位仍被未分析的帧占用时返回 -1（丢帧）
+        """
+        with self.lock:
+            seq = int(self.header[0])
+            slot = seq % self.slots
+            if self.slot_seq[slot] != self.slot_done[slot]:
+                return -1
+
+        target = self.frames[slot]
+        if isinstance(frame, (bytes, bytearray, memoryview)):
+            target.reshape(-1)[:] = np.frombuffer(frame, dtype=np.uint8)
+        else:
+            target[...] = frame
+
+        with self.lock:
+            self.slot_ts[slot] = time.time_ns()
+            self.slot_seq[slot] = seq
+            self.header[0] = seq + 1
+        return seq
+
+    def claim(self):
+        """
+        领取下一帧
+
+        Returns:
+            (seq, 帧视图, 写入时间 ns) 或 None（没有新帧）；视图在 release 之前有效
+        """
+        with self.lock:
+            seq = int(self.header[1])
+            if seq >= self.header[0]:
+                return None
+            self.header[1] = seq + 1
+            slot = seq % self.slots
+            return seq, self.frames[slot], int(self.slot_ts[slot])
+
+    def release(self, seq: int):
+        with self.lock:
+            self.slot_done[seq % self.slots] = seq
+
+    def close(self):
+        # 先释放 numpy 视图，否则 SharedMemory.close() 报 BufferError
+        self.header = self.slot_seq = self.slot_done = self.slot_ts = self.frames = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def analyze_frame(frame, step: int) -> dict:
+    """在帧视图上降采样统计亮度和颜色多样性（与 capture_planner.sample_stats 口径一致）"""
+    sample = frame[::step, ::step, :3]
+    pixels = sample.reshape(-1, 3)
+    head = pixels[:MAX_DIVERSITY_SAMPLES].astype(np.uint32)
+    # BGRA: 通道 0 / 1 / 2 = B / G / R
+    packed = (head[:, 2] << 16) | (head[:, 1] << 8) | head[:, 0]
+    return {
+        "width": frame.shape[1],
+        "height": frame.shape[0],
+        "sampled_pixels": int(pixels.shape[0]),
+        "avg_brightness": round(float(sample.mean()), 2),
+        "color_diversity": int(np.unique(packed).size),
+    }
+
+
+# ============================================================================
+# 进程入口（顶层函数，Windows spawn 模式可以 pickle）
+# ============================================================================
+
+def _synthetic_frames(shape):
+    """锁屏（深色单色 + 亮块）和桌面（随机噪声）两种合成帧"""
+    rng = np.random.default_rng(0)
+    locked = np.full(shape, 18, dtype=np.uint8)
+    h, w = shape[:2]
+    locked[int(h * 0.7):int(h * 0.8), int(w * 0.05):int(w * 0.25), :3] = 235
+    desktop = rng.integers(0, 256, size=shape, dtype=np.uint8)
+    return locked, desktop
+
+
+def capture_loop(ring_name, shape, slots, lock, stop, counters, source="synthetic", monitor=1, fps=0.0):
+    """截图进程：按 fps 截图写入环形缓冲区（fps <= 0 时不限速）"""
+    ring = FrameRing(shape, slots, lock, name=ring_name)
+    interval = 1.0 / fps if fps > 0 else 0.0
+    next_at = time.perf_counter()
+    try:
+        if source == "mss":
+            import mss
+            sct = mss.mss()
+            region = sct.monitors[monitor]
+            grab = lambda: sct.grab(region).raw
+        else:
+            locked, desktop = _synthetic_frames(shape)
+            start = time.perf_counter()
+            grab = lambda: locked if int((time.perf_counter() - start) / SYNTHETIC_SWITCH_SECONDS) % 2 == 0 else desktop
+
+        while not stop.is_set():
+            seq = ring.try_write(grab())
+            with counters.get_lock():
+                counters[0] += 1
+                if seq < 0:
+                    counters[1] += 1
+            if interval:
+                next_at += interval
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_at = time.perf_counter()
+    finally:
+        ring.close()
+
+
+def analysis_worker(worker_id, ring_name, shape, slots, lock, stop, results, step):
+    """分析进程：领取帧，在共享内存视图上直接分析，结果放入 results 队列"""
+    ring = FrameRing(shape, slots, lock, name=ring_name)
+    try:
+        while not stop.is_set():
+            claimed = ring.claim()
+            if claimed is None:
+                time.sleep(POLL_INTERVAL)
+                continue
+            seq, frame, written_ns = claimed
+            try:
+                stats = analyze_frame(frame, step)
+            finally:
+                ring.release(seq)
+            # 释放后不再持有槽位视图
+            frame = None
+            locked, _ = classify(stats)
+            results.put((seq, worker_id, locked, stats["avg_brightness"], stats["color_diversity"],
+                         (time.time_ns() - written_ns) / 1e6))
+    finally:
+        ring.close()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return round(sorted_values[max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)], 3)
+
+
+def run_pipeline(source="synthetic", shape=SYNTHETIC_SHAPE, slots=DEFAULT_SLOTS, workers=DEFAULT_WORKERS,
+                 fps=0.0, duration=10.0, scale=DEFAULT_SCALE, monitor=1, on_change=None) -> dict:
+    """运行流水线 duration 秒并返回统计"""
+    step = max(1, round(1 / scale))
+    lock = mp.Lock()
+    stop = mp.Event()
+    counters = mp.Array("q", 2)          # [captured, dropped]
+    results = mp.Queue()
+    ring = FrameRing(shape, slots, lock, create=True)
+
+    procs = [mp.Process(target=capture_loop, name="capture",
+                        args=(ring.name, shape, slots, lock, stop, counters, source, monitor, fps))]
+    procs += [mp.Process(target=analysis_worker, name=f"analysis-{i}",
+                         args=(i, ring.name, shape, slots, lock, stop, results, step))
+              for i in range(workers)]
+
+    latencies = []
+    per_worker = {}
+    verdict = None
+    changes = 0
+    start = time.perf_counter()
+    try:
+        for p in procs:
+            p.start()
+        while time.perf_counter() - start < duration:
+            try:
+                seq, worker_id, locked, brightness, diversity, latency_ms = results.get(timeout=0.1)
+            except Exception:
+                continue
+            latencies.append(latency_ms)
+            per_worker[worker_id] = per_worker.get(worker_id, 0) + 1
+            if locked != verdict:
+                if verdict is not None:
+                    changes += 1
+                verdict = locked
+                if on_change:
+                    on_change(seq, locked, brightness, diversity)
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        elapsed = time.perf_counter() - start
+        captured, dropped = counters[0], counters[1]
+        ring.close()
+        ring.unlink()
+
+    latencies.sort()
+    return {
+        "source": source,
+        "frame_shape": list(shape),
+        "frame_mb": round(math.prod(shape) / 1e6, 2),
+        "slots": slots,
+        "shm_mb": round(slots * math.prod(shape) / 1e6, 2),
+        "workers": workers,
+        "scale": scale,
+        "target_fps": fps,
+        "elapsed_s": round(elapsed, 3),
+        "captured": captured,
+        "dropped": dropped,
+        "analyzed": len(latencies),
+        "capture_fps": round(captured / elapsed, 2) if elapsed else 0.0,
+        "analysis_fps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "per_worker": per_worker,
+        "latency_ms": {"p50": _percentile(latencies, 50), "p95": _percentile(latencies, 95),
+                       "max": round(latencies[-1], 3) if latencies else 0.0},
+        "verdict_changes": changes,
+        "likely_locked": verdict,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="截图 / 分析多进程流水线（持续锁屏监测）")
+    parser.add_argument("--source", choices=["synthetic", "mss"], default="synthetic")
+    parser.add_argument("--monitor", type=int, default=1, help="mss 显示器序号（0 = 所有显示器）")
+    parser.add_argument("--width", type=int, default=SYNTHETIC_SHAPE[1], help="合成帧宽度")
+    parser.add_argument("--height", type=int, default=SYNTHETIC_SHAPE[0], help="合成帧高度")
+    parser.add_argument("--slots", type=int, default=DEFAULT_SLOTS, help="环形缓冲区槽位数")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_WORKERS, help="分析进程数")
+    parser.add_argument("--fps", type=float, default=0.0, help="截图帧率（0 = 不限速）")
+    parser.add_argument("--duration", "-d", type=float, default=10.0, help="运行时长（秒）")
+    parser.add_argument("--scale", type=float, default=DEFAULT_SCALE, help="分析采样比例")
+    args = parser.parse_args(argv)
+
+    if np is None:
+        print("❌ 需要 numpy: pip install numpy", file=sys.stderr)
+        return 2
+
+    if args.source == "mss":
+        import mss
+        with mss.mss() as sct:
+            mon = sct.monitors[args.monitor]
+            shape = (mon["height"], mon["width"], 4)
+    else:
+        shape = (args.height, args.width, 4)
+
+    def on_change(seq, locked, brightness, diversity):
+        print(f"{'🔒 锁屏' if locked else '🖥️  桌面'} (帧 {seq}，亮度 {brightness}，颜色多样性 {diversity})",
+              file=sys.stderr, flush=True)
+
+    report = run_pipeline(args.source, shape, args.slots, args.workers, args.fps, args.duration,
+                          args.scale, args.monitor, on_change=on_change)
+    print(json.dumps(report, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,327 @@
+# handlers.py
+# 任务处理器注册表 - 端点族 / 指令前缀映射到处理器插件，启动时发现，按处理器限制并发和超时
+"""
+任务处理器注册表
+
+原来后端只有一个手写的 /execute/ai 路由，config.sh 中的 /execute/ai_assistant 直接 404，
+每增加一种任务都要改 minimal_backend.py。现在：
+
+    POST /execute/<family>     端点族（ai / ai_assistant / url ...）选出默认处理器
+    指令前缀（/1mu3、/iyf ...） 命中时改用该前缀的处理器
+
+处理器声明：
+    prefixes     - 认领的指令前缀（"/1mu3" 匹配 "/1mu3" 和 "/1mu3 参数"，不匹配 "/1mu3x"）
+    endpoints    - 作为默认处理器的端点族
+    payload_key  - 从请求 JSON 中读取指令的字段（instruction / url）
+    concurrency  - 同时执行的上限（超时后仍在运行的执行也计入）
+    timeout      - 单次执行超时（秒），超时的执行上下文被丢弃并替换
+
+插件在启动时从 handlers.d/ 发现：
+    *.json  - 声明式处理器（一个对象或列表），新增签到类型只需添加配置，不改代码
+    *.py    - 定义 register(registry) 的模块，用于需要自定义执行逻辑的处理器
+
+前缀查找在 compile() 时预先按长度分组成哈希表，每个请求只做"不同前缀长度数"次字典查找，
+与处理器数量无关。
+
+handlers.d/checkins.json 示例：
+    [
+        {"name": "1mu3", "prefixes": ["/1mu3"], "concurrency": 1, "timeout": 180},
+        {"name": "iyf", "prefixes": ["/iyf"], "concurrency": 1, "timeout": 120}
+    ]
+"""
+
+import contextvars
+import importlib.util
+import json
+import threading
+from datetime import datetime
+from pathlib import Path
+
+HANDLER_DIR = Path("handlers.d")
+DEFAULT_TIMEOUT = 600.0
+DEFAULT_CONCURRENCY = 1
+PAYLOAD_KEYS = ("instruction", "url")
+
+
+class HandlerError(Exception):
+    """处理器配置或执行失败"""
+
+
+class HandlerTimeoutError(HandlerError):
+    """执行超时；上下文池收到后丢弃该上下文（仍被超时的执行占用）"""
+
+    discard_context = True
+
+
+class Handler:
+    """
+    任务处理器
+
+    Args:
+        name: 处理器名称（唯一）
+        prefixes: 认领的指令前缀
+        endpoints: 作为默认处理器的端点族（/execute/<family>）
+        concurrency: 同时执行上限（None 或 0 表示不限制）
+        timeout: 单次执行超时（秒，None 或 0 表示不限制）
+        payload_key: 请求 JSON 中的指令字段
+        description: 说明
+
+    子类可以覆盖 execute(ctx, instruction) 实现自定义执行逻辑
+    """
+
+    def __init__(self, name, prefixes=(), endpoints=(), concurrency=DEFAULT_CONCURRENCY,
+                 timeout=DEFAULT_TIMEOUT, payload_key="instruction", description=""):
+        if payload_key not in PAYLOAD_KEYS:
+            raise HandlerError(f"处理器 {name}: 未知的 payload_key: {payload_key}（可选: {', '.join(PAYLOAD_KEYS)}）")
+        self.name = name
+        self.prefixes = tuple(prefixes)
+        self.endpoints = tuple(endpoints)
+        self.concurrency = concurrency or None
+        self.timeout = timeout or None
+        self.payload_key = payload_key
+        self.description = description
+        self._slots = threading.BoundedSemaphore(self.concurrency) if self.concurrency else None
+        self._lock = threading.Lock()
+        self.counters = {"started": 0, "completed": 0, "failed": 0, "timeouts": 0, "busy_waits": 0, "running": 0}
+
+    @classmethod
+    def from_dict(cls, spec: dict):
+        spec = dict(spec)
+        try:
+            name = spec.pop("name")
+        except KeyError:
+            raise HandlerError(f"处理器配置缺少 name: {spec}") from None
+        unknown = set(spec) - {"prefixes", "endpoints", "concurrency", "timeout", "payload_key", "description"}
+        if unknown:
+            raise HandlerError(f"处理器 {name}: 未知字段 {', '.join(sorted(unknown))}")
+        return cls(name, **spec)
+
+    def instruction_from(self, data: dict) -> str:
+        return str(data.get(self.payload_key) or "")
+
+    def execute(self, ctx, instruction: str) -> str:
+        """在执行上下文中执行指令（默认交给上下文本身）"""
+        return ctx.execute(instruction)
+
+    def _count(self, key, delta=1):
+        with self._lock:
+            self.counters[key] += delta
+
+    def acquire_slot(self, timeout=None) -> bool:
+        """占用一个并发名额；已满时等待，超时返回 False"""
+        if self._slots is None:
+            return True
+        if self._slots.acquire(blocking=False):
+            return True
+        self._count("busy_waits")
+        return self._slots.acquire(timeout=timeout)
+
+    def release_slot(self):
+        if self._slots is not None:
+            self._slots.release()
+
+    def run(self, ctx, instruction: str) -> str:
+        """
+        执行一次（调用方已通过 acquire_slot 占用名额，本方法负责释放）
+
+        有超时时在单独线程中执行（带上调用方的 contextvars，例如当前任务 id）；
+        超时后抛出 HandlerTimeoutError，执行线程结束时才释放名额
+        """
+        self._count("started")
+        self._count("running")
+        outcome = {}
+
+        def target():
+            try:
+                outcome["result"] = self.execute(ctx, instruction)
+            except Exception as e:
+                outcome["error"] = e
+            finally:
+                self._count("running", -1)
+                self.release_slot()
+
+        if self.timeout is None:
+            target()
+        else:
+            context = contextvars.copy_context()
+            thread = threading.Thread(target=context.run, args=(target,), name=f"handler-{self.name}", daemon=True)
+            thread.start()
+            thread.join(self.timeout)
+            if thread.is_alive():
+                self._count("timeouts")
+                raise HandlerTimeoutError(f"处理器 {self.name} 执行超时（{self.timeout:g} 秒）: {instruction}")
+
+        if "error" in outcome:
+            self._count("failed")
+            raise outcome["error"]
+        self._count("completed")
+        return outcome["result"]
+
+    def describe(self) -> dict:
+        with self._lock:
+            counters = dict(self.counters)
+        return {
+            "name": self.name,
+            "kind": type(self).__name__,
+            "prefixes": list(self.prefixes),
+            "endpoints": list(self.endpoints),
+            "payload_key": self.payload_key,
+            "concurrency": self.concurrency,
+            "timeout": self.timeout,
+            "description": self.description,
+            **counters,
+        }
+
+
+class HandlerRegistry:
+    """处理器注册表"""
+
+    def __init__(self):
+        self._handlers = {}
+        self._endpoints = {}
+        self._prefixes = {}
+        self._table = ()
+        self.sources = {}
+
+    def register(self, handler: Handler, source="builtin", replace=False):
+        """
+        注册处理器；前缀 / 端点族与其他处理器冲突时抛出 HandlerError
+
+        replace=True 时同名处理器被替换（插件覆盖内置处理器）
+        """
+        old = self._handlers.get(handler.name)
+        if old is not None and not replace:
+            raise HandlerError(f"处理器 {handler.name} 已注册（来自 {self.sources[handler.name]}）")
+        for prefix in handler.prefixes:
+            owner = self._prefixes.get(prefix)
+            if owner not in (None, old):
+                raise HandlerError(f"指令前缀 {prefix} 已由处理器 {owner.name} 认领")
+        for family in handler.endpoints:
+            owner = self._endpoints.get(family)
+            if owner not in (None, old):
+                raise HandlerError(f"端点族 {family} 已由处理器 {owner.name} 认领")
+
+        if old is not None:
+            self._prefixes = {p: h for p, h in self._prefixes.items() if h is not old}
+            self._endpoints = {f: h for f, h in self._endpoints.items() if h is not old}
+        self._handlers[handler.name] = handler
+        self._prefixes.update((p, handler) for p in handler.prefixes)
+        self._endpoints.update((f, handler) for f in handler.endpoints)
+        self.sources[handler.name] = source
+        self.compile()
+        return handler
+
+    def compile(self):
+        """预编译前缀查找表：按长度从长到短分组 ((长度, {前缀: 处理器}), ...)"""
+        groups = {}
+        for prefix, handler in self._prefixes.items():
+            groups.setdefault(len(prefix), {})[prefix] = handler
+        self._table = tuple(sorted(groups.items(), reverse=True))
+
+    def match_prefix(self, instruction: str):
+        """最长前缀匹配（前缀之后必须是结尾或空白）"""
+        size = len(instruction)
+        for length, group in self._table:
+            if length > size:
+                continue
+            handler = group.get(instruction[:length])
+            if handler is not None and (length == size or instruction[length].isspace()):
+                return handler
+        return None
+
+    def resolve(self, family: str, data: dict):
+        """
+        为 /execute/<family> 请求选择处理器
+
+        Returns:
+            (handler, instruction)；端点族未注册时返回 (None, None)
+        """
+        default = self._endpoints.get(family)
+        if default is None:
+            return None, None
+        instruction = default.instruction_from(data)
+        return self.match_prefix(instruction) or default, instruction
+
+    def get(self, name: str):
+        return self._handlers.get(name)
+
+    @property
+    def endpoints(self):
+        return sorted(self._endpoints)
+
+    def discover(self, directory=HANDLER_DIR):
+        """
+        加载插件目录中的处理器（*.json 声明式，*.py 定义 register(registry)）
+
+        单个插件加载失败只打印错误并跳过，不影响后端启动
+
+        Returns:
+            加载成功的插件文件名列表
+        """
+        directory = Path(directory)
+        if not directory.is_dir():
+            return []
+        loaded = []
+        for path in sorted(directory.iterdir()):
+            if path.suffix not in (".json", ".py") or path.name.startswith(("_", ".")):
+                continue
+            try:
+                if path.suffix == ".json":
+                    with open(path, "r", encoding="utf-8") as f:
+                        specs = json.load(f)
+                    for spec in specs if isinstance(specs, list) else [specs]:
+                        self.register(Handler.from_dict(spec), source=path.name, replace=True)
+                else:
+                    spec = importlib.util.spec_from_file_location(f"handlers_d_{path.stem}", path)
+                    module = importlib.util.module_from_spec(spec)
+                    spec.loader.exec_module(module)
+                    if not hasattr(module, "register"):
+                        raise HandlerError("插件没有定义 register(registry)")
+                    module.register(_SourceRegistry(self, path.name))
+                loaded.append(path.name)
+            except Exception as e:
+                print(f"[{datetime.now()}] 处理器插件 {path.name} 加载失败: {e}")
+        return loaded
+
+    def stats(self) -> dict:
+        return {
+            "endpoints": {f: h.name for f, h in sorted(self._endpoints.items())},
+            "prefixes": {p: h.name for p, h in sorted(self._prefixes.items())},
+            "prefix_lengths": [length for length, _ in self._table],
+            "handlers": [dict(h.describe(), source=self.sources[name]) for name, h in self._handlers.items()],
+        }
+
+
+class _SourceRegistry:
+    """传给 .py 插件的注册表代理，记录处理器来源并允许覆盖内置处理器"""
+
+    def __init__(self, registry: HandlerRegistry, source: str):
+        self._registry = registry
+        self._source = source
+
+    def register(self, handler: Handler, replace=True):
+        return self._registry.register(handler, source=self._source, replace=replace)
+
+
+def builtin_handlers(concurrency=None, timeout=DEFAULT_TIMEOUT):
+    """
+    内置处理器（默认不限制并发，由 worker 数量限制）
+
+        ai  - /execute/ai 和 /execute/ai_assistant（config.sh 默认使用后者）
+        url - /execute/url，请求 JSON 中的 url 作为指令
+    """
+    return [
+        Handler("ai", endpoints=("ai", "ai_assistant"), concurrency=concurrency, timeout=timeout,
+                description="AI 指令"),
+        Handler("url", endpoints=("url",), concurrency=concurrency, timeout=timeout, payload_key="url",
+                description="打开 URL"),
+    ]
+
+
+def create_registry(directory=HANDLER_DIR, concurrency=None, timeout=DEFAULT_TIMEOUT):
+    """内置处理器 + 插件目录"""
+    registry = HandlerRegistry()
+    for handler in builtin_handlers(concurrency, timeout):
+        registry.register(handler)
+    registry.discover(directory)
+    return registry
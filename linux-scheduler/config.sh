@@ -15,12 +15,28 @@ COMET_PORT="5000"
 # API 认证
 COMET_API_KEY="${COMET_API_KEY:-my-secret-password-123}"
 
+# Wake-on-LAN 配置（使用 wol.py 原生发送，未配置 MAC 时回退到 wolwin alias）
+WOL_MAC="${WOL_MAC:-}"                      # 例如 "AA:BB:CC:DD:EE:FF"，多个用空格分隔
+WOL_TARGETS="255.255.255.255 192.168.0.255" # 广播地址或主机 host[:port]，空格分隔
+WOL_REPEAT=3                                # 每个目标重复发送次数
+
 # 唤醒等待时间（秒）- Windows 启动后等待 Comet TaskRunner 启动
 WAKE_WAIT_SECONDS=30
 
+# 任务优先级（high / normal / low）和截止时间（秒，提交后多久内必须开始执行；0 表示不设截止时间）
+# 后端按优先级 + 截止时间排队，每日签到应排在手动调用之前
+TASK_PRIORITY="high"
+TASK_DEADLINE_SECONDS=1800
+
 # 每个任务之间的间隔（秒）
 TASK_INTERVAL_SECONDS=10
 
+# 响应日志配置 - 响应体直接写入日志，超过上限的部分截断
+RESPONSE_LOG_MAX_BYTES=2048
+# 提交后是否通过 /status/<id>/stream 把任务结果流式写入日志（会等待任务完成）
+STREAM_TASK_RESULT=false
+STREAM_WAIT_SECONDS=120
+
 # 健康检查配置
 HEALTH_CHECK_RETRIES=10
 HEALTH_CHECK_INTERVAL=10
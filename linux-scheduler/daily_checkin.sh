@@ -6,7 +6,7 @@
 # 功能：
 #   1. 使用 wolwin 命令唤醒 Windows PC
 #   2. 等待 PC 启动并确认 Comet TaskRunner 服务可用
-#   3. 调用 API 执行每日签到任务
+#   3. 调用 API 提交每日签到任务，并跟踪到任务真正完成
 #
 # 兼容系统：
 #   - DietPi (Raspberry Pi)
@@ -23,6 +23,9 @@
 # 配置区域 - 根据你的环境修改这些值
 # =============================================================================
 
+# 脚本目录（track_tasks.py 与本脚本放在一起）
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+
 # Windows PC 配置
 WINDOWS_IP="192.168.0.147"
 COMET_PORT="5000"
@@ -32,14 +35,23 @@ COMET_BASE_URL="http://${WINDOWS_IP}:${COMET_PORT}"
 # 从环境变量读取，如果未设置则使用默认值（本地测试不需要 key）
 COMET_API_KEY="${COMET_API_KEY:-}"
 
-# 每日签到指令 - Comet 快捷命令
-DAILY_CHECKIN_INSTRUCTION="/1mu3"
+# 每日签到指令 - Comet 快捷命令（可添加多个，全部完成才算成功）
+DAILY_CHECKIN_INSTRUCTIONS=(
+    "/1mu3"
+)
+
+# 任务优先级和截止时间（秒）- 后端按优先级排队
+TASK_PRIORITY="high"
+TASK_DEADLINE_SECONDS=1800
 
 # 等待配置
 WAKE_WAIT_SECONDS=90          # 唤醒后等待 PC 启动的时间
 HEALTH_CHECK_RETRIES=10       # 健康检查重试次数
 HEALTH_CHECK_INTERVAL=10      # 每次健康检查间隔（秒）
 
+# 完成跟踪配置 - 所有任务共用一个等待时间
+TRACK_TIMEOUT_SECONDS=900
+
 # 日志配置
 LOG_FILE="${HOME}/daily_checkin.log"
 
@@ -120,43 +132,42 @@ wait_for_service() {
     return 1
 }
 
-# 执行每日签到
+# 执行每日签到：提交所有指令，并发跟踪直到全部完成
 execute_checkin() {
     log_info "执行每日签到任务..."
-    log_info "指令: ${DAILY_CHECKIN_INSTRUCTION}"
+    log_info "指令: ${DAILY_CHECKIN_INSTRUCTIONS[*]}"
+    
+    if ! command -v python3 &> /dev/null; then
+        log_error "python3 不可用，无法跟踪任务完成状态"
+        return 1
+    fi
     
-    local url="${COMET_BASE_URL}/execute/ai"
-    local headers="-H 'Content-Type: application/json'"
+    # 链路追踪：本次签到一个 trace_id，可在后端 /traces/<trace_id> 查看各阶段耗时
+    local trace_id=$(head -c 16 /dev/urandom | od -An -tx1 | tr -d ' \n')
+    log "Trace ID: ${trace_id}"
+    
+    local track_args=(--base-url "$COMET_BASE_URL" --timeout "$TRACK_TIMEOUT_SECONDS"
+                      --priority "$TASK_PRIORITY" --deadline "$TASK_DEADLINE_SECONDS"
+                      --trace-id "$trace_id")
     
     # 如果设置了 API Key，添加到请求头
     if [ -n "$COMET_API_KEY" ]; then
-        headers="${headers} -H 'X-API-Key: ${COMET_API_KEY}'"
+        track_args+=(--api-key "$COMET_API_KEY")
     fi
     
-    local body="{\"instruction\": \"${DAILY_CHECKIN_INSTRUCTION}\"}"
+    for instruction in "${DAILY_CHECKIN_INSTRUCTIONS[@]}"; do
+        track_args+=(--task "/execute/ai|${instruction}|签到 ${instruction}")
+    done
     
-    # 执行 API 调用
-    local response
-    if [ -n "$COMET_API_KEY" ]; then
-        response=$(curl -s -X POST "$url" \
-            -H "Content-Type: application/json" \
-            -H "X-API-Key: ${COMET_API_KEY}" \
-            -d "$body" 2>&1)
-    else
-        response=$(curl -s -X POST "$url" \
-            -H "Content-Type: application/json" \
-            -d "$body" 2>&1)
-    fi
+    # track_tasks.py 解析 JSON 响应、并发轮询 /status/<task_id>，全部完成才返回 0
+    python3 "${SCRIPT_DIR}/track_tasks.py" "${track_args[@]}" 2>&1 | tee -a "$LOG_FILE"
+    local rc=${PIPESTATUS[0]}
     
-    # 检查响应
-    if echo "$response" | grep -q "task_id"; then
-        local task_id=$(echo "$response" | grep -o '"task_id"[[:space:]]*:[[:space:]]*"[^"]*"' | sed 's/.*"\([^"]*\)"$/\1/')
-        log_success "签到任务已提交！Task ID: ${task_id}"
-        log_info "响应: ${response}"
+    if [ "$rc" -eq 0 ]; then
+        log_success "所有签到任务已完成"
         return 0
     else
-        log_error "签到任务提交失败"
-        log_error "响应: ${response}"
+        log_error "签到任务未全部完成"
         return 1
     fi
 }
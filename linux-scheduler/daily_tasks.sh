@@ -13,6 +13,7 @@
 #   ./daily_tasks.sh              # 正常执行（唤醒 + 所有任务）
 #   ./daily_tasks.sh --skip-wake  # 跳过唤醒（PC 已开机）
 #   ./daily_tasks.sh --dry-run    # 模拟运行，不实际执行
+#   SCHED_CLOCK=virtual ./daily_tasks.sh --force   # 虚拟时间（等待立即返回，见下方"时钟"）
 #
 # 配置：
 #   编辑 config.sh 添加/修改任务
@@ -37,6 +38,7 @@ COMET_BASE_URL="http://${WINDOWS_IP}:${COMET_PORT}"
 SKIP_WAKE=false
 DRY_RUN=false
 FORCE_RUN=false
+WAKE_WAITED=false       # wol.py 已在唤醒确认中完成等待
 
 # 解析命令行参数
 while [[ $# -gt 0 ]]; do
@@ -70,6 +72,55 @@ while [[ $# -gt 0 ]]; do
     esac
 done
 
+# ==============================================================================
+# 时钟（SCHED_CLOCK=virtual 时使用虚拟时间，见 sim_clock.py / sim_schedule.py）
+# ==============================================================================
+# virtual 模式下所有等待（倒计时 / 健康检查间隔 / 任务间隔）立即返回，只推进 SCHED_CLOCK_FILE 中的时间；
+# 日志时间戳和 span 时间也使用虚拟时间。后端用 --virtual-clock 读取同一文件时，
+# 模拟器的启动和执行耗时随调度脚本的等待推进，一次运行不到一秒；只看时间统计时用 sim_schedule.py。
+# 虚拟时间下锁文件写入时钟文件旁的 virtual-locks/，不影响真实定时任务的当日锁。
+# SCHED_CLOCK_START 指定虚拟时间起点（Unix 时间戳），未指定时沿用时钟文件，文件不存在时从当前时间开始。
+
+SCHED_CLOCK="${SCHED_CLOCK:-real}"
+SCHED_CLOCK_FILE="${SCHED_CLOCK_FILE:-/tmp/satellite-y/clock}"
+
+if [ "$SCHED_CLOCK" = virtual ]; then
+    mkdir -p "$(dirname "$SCHED_CLOCK_FILE")"
+    if [ -n "$SCHED_CLOCK_START" ] || [ ! -f "$SCHED_CLOCK_FILE" ]; then
+        echo "${SCHED_CLOCK_START:-$(date '+%s')}" > "$SCHED_CLOCK_FILE"
+    fi
+fi
+
+# 当前时间（Unix 时间戳，带小数）
+clock_now() {
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        cat "$SCHED_CLOCK_FILE"
+    else
+        date '+%s.%N' | cut -c1-17
+    fi
+}
+
+# 按时钟格式化时间，参数同 date: clock_date '+%Y-%m-%d'
+clock_date() {
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        local now
+        now=$(clock_now)
+        date -d "@${now%.*}" "$@"
+    else
+        date "$@"
+    fi
+}
+
+# 等待指定秒数（virtual 模式下原子替换时钟文件，后端不会读到写了一半的值）
+clock_sleep() {
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        awk -v now="$(clock_now)" -v s="$1" 'BEGIN { printf "%.3f\n", now + s }' > "${SCHED_CLOCK_FILE}.$$"
+        mv "${SCHED_CLOCK_FILE}.$$" "$SCHED_CLOCK_FILE"
+    else
+        sleep "$1"
+    fi
+}
+
 # ==============================================================================
 # 每日执行锁检查（防止 timer 重启时重复执行）
 # ==============================================================================
@@ -77,8 +128,12 @@ done
 # 导致它认为今天还没执行过，从而立即触发执行。
 # 解决方案：使用锁文件记录今天是否已执行。
 
-TODAY=$(date '+%Y-%m-%d')
+TODAY=$(clock_date '+%Y-%m-%d')
 LOCK_DIR="/tmp/satellite-y"
+if [ "$SCHED_CLOCK" = virtual ]; then
+    # 虚拟时间使用单独的锁目录，模拟运行不会写入真实定时任务的当日锁
+    LOCK_DIR="$(dirname "$SCHED_CLOCK_FILE")/virtual-locks"
+fi
 LOCK_FILE="${LOCK_DIR}/daily-checkin-${TODAY}.lock"
 
 # 确保锁目录存在
@@ -87,7 +142,7 @@ mkdir -p "$LOCK_DIR"
 if [[ "$FORCE_RUN" == "false" ]] && [[ -f "$LOCK_FILE" ]]; then
     LOCK_TIME=$(cat "$LOCK_FILE" 2>/dev/null || echo "unknown")
     echo "=============================================="
-    echo "[$(date '+%Y-%m-%d %H:%M:%S')] ⏭️  今日任务已执行，跳过"
+    echo "[$(clock_date '+%Y-%m-%d %H:%M:%S')] ⏭️  今日任务已执行，跳过"
     echo "  锁文件: $LOCK_FILE"
     echo "  执行时间: $LOCK_TIME"
     echo "  如需强制执行，请使用: $0 --force"
@@ -96,7 +151,7 @@ if [[ "$FORCE_RUN" == "false" ]] && [[ -f "$LOCK_FILE" ]]; then
 fi
 
 # 记录执行时间到锁文件
-echo "$(date '+%Y-%m-%d %H:%M:%S')" > "$LOCK_FILE"
+echo "$(clock_date '+%Y-%m-%d %H:%M:%S')" > "$LOCK_FILE"
 
 # 确保日志目录存在
 mkdir -p "$LOG_DIR"
@@ -110,40 +165,146 @@ CYAN='\033[0;36m'
 NC='\033[0m'
 
 log() {
-    local msg="[$(date '+%Y-%m-%d %H:%M:%S')] $1"
+    local msg="[$(clock_date '+%Y-%m-%d %H:%M:%S')] $1"
     echo -e "${BLUE}${msg}${NC}"
     echo "$msg" >> "$LOG_FILE"
 }
 
 log_success() {
-    local msg="[$(date '+%Y-%m-%d %H:%M:%S')] ✅ $1"
+    local msg="[$(clock_date '+%Y-%m-%d %H:%M:%S')] ✅ $1"
     echo -e "${GREEN}${msg}${NC}"
     echo "$msg" >> "$LOG_FILE"
 }
 
 log_error() {
-    local msg="[$(date '+%Y-%m-%d %H:%M:%S')] ❌ $1"
+    local msg="[$(clock_date '+%Y-%m-%d %H:%M:%S')] ❌ $1"
     echo -e "${RED}${msg}${NC}"
     echo "$msg" >> "$LOG_FILE"
 }
 
 log_warning() {
-    local msg="[$(date '+%Y-%m-%d %H:%M:%S')] ⚠️  $1"
+    local msg="[$(clock_date '+%Y-%m-%d %H:%M:%S')] ⚠️  $1"
     echo -e "${YELLOW}${msg}${NC}"
     echo "$msg" >> "$LOG_FILE"
 }
 
 log_task() {
-    local msg="[$(date '+%Y-%m-%d %H:%M:%S')] 🔹 $1"
+    local msg="[$(clock_date '+%Y-%m-%d %H:%M:%S')] 🔹 $1"
     echo -e "${CYAN}${msg}${NC}"
     echo "$msg" >> "$LOG_FILE"
 }
 
+# 将响应体（文件或 stdin）写入日志，最多 RESPONSE_LOG_MAX_BYTES 字节
+# 不经过 shell 变量，避免长响应占用内存
+log_body() {
+    local label=$1
+    local source=${2:--}
+    local cap=${RESPONSE_LOG_MAX_BYTES:-2048}
+    local prefix="[$(clock_date '+%Y-%m-%d %H:%M:%S')]   ${label}: "
+    
+    {
+        printf '%s' "$prefix"
+        head -c "$cap" "$source"
+        echo ""
+    } | tee -a "$LOG_FILE"
+    
+    if [ "$source" != "-" ]; then
+        local size=$(wc -c < "$source")
+        if [ "$size" -gt "$cap" ]; then
+            log "  ...(已截断，共 ${size} 字节，仅记录前 ${cap} 字节)"
+        fi
+    fi
+}
+
+# ==============================================================================
+# 共享配置（comet.config.json，见 live_config.py）
+# ==============================================================================
+# 文件中写明的 scheduler 字段覆盖 config.sh 中的同名配置（TASKS / TASK_PRIORITY / ...）。
+# 启动时读取一次，执行任务列表前再读取一次：等待唤醒期间修改的配置也会生效，
+# 无需 deploy.sh 或重启 timer。文件无效时保留当前配置。
+
+LIVE_CONFIG_FILE="${COMET_CONFIG:-${SCRIPT_DIR}/comet.config.json}"
+CONFIG_VERSION="config.sh"
+
+load_live_config() {
+    [ -f "$LIVE_CONFIG_FILE" ] || return 0
+    command -v python3 &> /dev/null || return 0
+    
+    # 部署目录中 live_config.py 与脚本同级，仓库中位于上一级
+    local tool="${SCRIPT_DIR}/live_config.py"
+    [ -f "$tool" ] || tool="${SCRIPT_DIR}/../live_config.py"
+    
+    local previous=$CONFIG_VERSION
+    local exports
+    if exports=$(python3 "$tool" export-sh "$LIVE_CONFIG_FILE" 2>&1); then
+        eval "$exports"
+        [ "$CONFIG_VERSION" != "$previous" ] && log "配置版本: ${CONFIG_VERSION} (${LIVE_CONFIG_FILE})"
+    else
+        log_warning "共享配置无效，继续使用 ${CONFIG_VERSION}: ${exports}"
+    fi
+    return 0
+}
+
+# ==============================================================================
+# 链路追踪（W3C traceparent）
+# ==============================================================================
+# 每次运行一个 trace_id，各阶段 / 每个任务一个 span_id；
+# span 先写入本地 TRACE_SPAN_FILE，运行结束后上传到后端 /traces
+
+random_hex() {
+    head -c "$1" /dev/urandom | od -An -tx1 | tr -d ' \n'
+}
+
+now_ts() {
+    clock_now
+}
+
+TRACE_ID=$(random_hex 16)
+RUN_SPAN_ID=$(random_hex 8)
+RUN_STARTED_AT=$(now_ts)
+TRACE_SPAN_FILE="${LOG_DIR}/traces.ndjson"
+RUN_SPAN_LINES=()
+
+# 记录一个 span: record_span <name> <span_id> <parent_span_id> <start> <end> [attributes_json]
+record_span() {
+    local parent=null
+    local attributes=${6:-"{}"}
+    [ -n "$3" ] && parent="\"$3\""
+    
+    local line
+    line=$(printf '{"trace_id": "%s", "span_id": "%s", "parent_span_id": %s, "name": "%s", "service": "scheduler", "start_time": %s, "end_time": %s, "attributes": %s}' \
+        "$TRACE_ID" "$2" "$parent" "$1" "$4" "$5" "$attributes")
+    echo "$line" >> "$TRACE_SPAN_FILE"
+    RUN_SPAN_LINES+=("$line")
+}
+
+# 上传本次运行的 span 到后端（失败不影响任务结果）
+upload_spans() {
+    [ "$DRY_RUN" = true ] && return 0
+    [ ${#RUN_SPAN_LINES[@]} -eq 0 ] && return 0
+    
+    if printf '%s\n' "${RUN_SPAN_LINES[@]}" | curl -s -o /dev/null --max-time 10 -X POST "${COMET_BASE_URL}/traces" \
+        -H "Content-Type: application/x-ndjson" \
+        -H "X-API-Key: ${COMET_API_KEY}" \
+        --data-binary @- 2>/dev/null; then
+        log "Trace: ${COMET_BASE_URL}/traces/${TRACE_ID}"
+    else
+        log_warning "span 上传失败，已保存在 ${TRACE_SPAN_FILE}"
+    fi
+}
+
 # 实时倒计时
 countdown() {
     local seconds=$1
     local message="${2:-等待中}"
     
+    # 虚拟时间：一次推进，不逐秒刷新
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        clock_sleep "$seconds"
+        printf "${BLUE}[%s]${NC} ⏱️  ${message}: ${seconds} 秒（虚拟时间）完成!\n" "$(clock_date '+%H:%M:%S')"
+        return 0
+    fi
+    
     while [ $seconds -gt 0 ]; do
         local mins=$((seconds / 60))
         local secs=$((seconds % 60))
@@ -163,17 +324,37 @@ check_service() {
 wake_windows() {
     log "发送 Wake-on-LAN..."
     
-    # 加载用户 alias
-    if [ -f "$HOME/.bashrc" ]; then
-        shopt -s expand_aliases 2>/dev/null
-        source "$HOME/.bashrc" 2>/dev/null
-    fi
-    
     if [ "$DRY_RUN" = true ]; then
         log "[DRY-RUN] 跳过实际 WoL 发送"
         return 0
     fi
     
+    # 优先使用原生 wol.py（无需加载 ~/.bashrc）
+    if [ -n "$WOL_MAC" ] && command -v python3 &> /dev/null; then
+        local wol_args=()
+        for mac in $WOL_MAC; do wol_args+=(--mac "$mac"); done
+        for target in $WOL_TARGETS; do wol_args+=(--target "$target"); done
+        
+        local wol_result
+        wol_result=$(python3 "${SCRIPT_DIR}/wol.py" send "${wol_args[@]}" --repeat "${WOL_REPEAT:-3}" \
+            --confirm "${WINDOWS_IP}:${COMET_PORT}" --timeout "$WAKE_WAIT_SECONDS" --json 2>>"$LOG_FILE")
+        log "  WoL 结果: ${wol_result}"
+        WAKE_WAITED=true
+        
+        if echo "$wol_result" | grep -q '"confirmed": true'; then
+            log_success "WoL 包已发送，端口已可连接"
+        else
+            log_warning "WoL 包已发送，但 ${WAKE_WAIT_SECONDS} 秒内端口未可连接"
+        fi
+        return 0
+    fi
+    
+    # 回退: 加载用户 alias
+    if [ -f "$HOME/.bashrc" ]; then
+        shopt -s expand_aliases 2>/dev/null
+        source "$HOME/.bashrc" 2>/dev/null
+    fi
+    
     if command -v wolwin &> /dev/null || type wolwin &> /dev/null; then
         wolwin
         log_success "WoL 包已发送"
@@ -197,7 +378,7 @@ wait_for_service() {
             return 0
         fi
         log "  检查 $i/$HEALTH_CHECK_RETRIES - 服务未响应..."
-        sleep $HEALTH_CHECK_INTERVAL
+        clock_sleep $HEALTH_CHECK_INTERVAL
     done
     
     log_error "服务等待超时"
@@ -220,23 +401,47 @@ execute_task() {
     fi
     
     local url="${COMET_BASE_URL}${endpoint}"
-    local response
     local http_code
+    local body_file
+    local span_id=$(random_hex 8)
+    local span_start=$(now_ts)
+    body_file=$(mktemp "${TMPDIR:-/tmp}/satellite-y-response.XXXXXX")
+    
+    # TASK_DEADLINE_SECONDS=0 表示不设截止时间（后端拒绝 deadline <= 0）
+    local deadline_field=""
+    if [ "${TASK_DEADLINE_SECONDS:-1800}" -gt 0 ] 2>/dev/null; then
+        deadline_field=", \"deadline\": ${TASK_DEADLINE_SECONDS:-1800}"
+    fi
     
     # 直接发送请求到后端，不做端点验证
-    # 后端自行处理请求的有效性
-    response=$(curl -s -w "\n%{http_code}" -X POST "$url" \
+    # 后端自行处理请求的有效性；响应体写入临时文件而不是 shell 变量
+    http_code=$(curl -s -o "$body_file" -w "%{http_code}" -X POST "$url" \
         -H "Content-Type: application/json" \
         -H "X-API-Key: ${COMET_API_KEY}" \
-        -d "{\"instruction\": \"${instruction}\"}" 2>&1)
-    
-    # 分离响应体和状态码
-    http_code=$(echo "$response" | tail -n1)
-    response=$(echo "$response" | sed '$d')
+        -H "traceparent: 00-${TRACE_ID}-${span_id}-01" \
+        -d "{\"instruction\": \"${instruction}\", \"priority\": \"${TASK_PRIORITY:-normal}\"${deadline_field}}" 2>>"$LOG_FILE")
     
     # 记录响应
     log "  HTTP 状态: ${http_code}"
-    log "  响应: ${response}"
+    log_body "响应" "$body_file"
+    
+    # 可选：流式记录任务结果（head 读满上限后 curl 自动断开）
+    # 虚拟时间下任务只在调度脚本推进时钟时完成，等待结果会卡住，因此跳过
+    if [ "$STREAM_TASK_RESULT" = true ] && [ "$SCHED_CLOCK" != virtual ] && [[ "$http_code" =~ ^2 ]]; then
+        local task_id
+        task_id=$(grep -o '"task_id"[[:space:]]*:[[:space:]]*"[^"]*"' "$body_file" | head -1 | sed 's/.*"\([^"]*\)"$/\1/')
+        if [ -n "$task_id" ]; then
+            curl -sN --max-time "$((${STREAM_WAIT_SECONDS:-120} + 10))" \
+                -H "X-API-Key: ${COMET_API_KEY}" \
+                "${COMET_BASE_URL}/status/${task_id}/stream?wait=${STREAM_WAIT_SECONDS:-120}" 2>/dev/null \
+                | log_body "结果流"
+        fi
+    fi
+    
+    rm -f "$body_file"
+    
+    record_span "scheduler.task" "$span_id" "$RUN_SPAN_ID" "$span_start" "$(now_ts)" \
+        "{\"instruction\": \"${instruction}\", \"endpoint\": \"${endpoint}\", \"http_status\": \"${http_code}\"}"
     
     # 简单判断：2xx 状态码视为成功
     if [[ "$http_code" =~ ^2 ]]; then
@@ -255,29 +460,44 @@ main() {
     log "  每日定时任务开始"
     log "=============================================="
     log ""
+    load_live_config
     log "目标: ${COMET_BASE_URL}"
     log "任务数量: ${#TASKS[@]}"
     log "日志文件: ${LOG_FILE}"
+    log "Trace ID: ${TRACE_ID}"
     [ "$SKIP_WAKE" = true ] && log "模式: 跳过唤醒"
     [ "$DRY_RUN" = true ] && log "模式: 模拟运行"
+    [ "$SCHED_CLOCK" = virtual ] && log "时钟: 虚拟时间 (${SCHED_CLOCK_FILE})"
     log ""
     
     # Step 1: 唤醒 Windows
     if [ "$SKIP_WAKE" = false ]; then
+        local wake_start=$(now_ts)
         wake_windows
         log ""
-        countdown $WAKE_WAIT_SECONDS "等待系统启动"
+        # wol.py 已在确认唤醒时等待过，无需再固定倒计时
+        if [ "$WAKE_WAITED" = true ]; then
+            log "已完成唤醒确认，跳过启动倒计时"
+        else
+            countdown $WAKE_WAIT_SECONDS "等待系统启动"
+        fi
+        record_span "scheduler.wake" "$(random_hex 8)" "$RUN_SPAN_ID" "$wake_start" "$(now_ts)"
     else
         log "跳过 WoL 唤醒步骤"
     fi
     
     # Step 2: 检查服务
+    local ready_start=$(now_ts)
     if ! wait_for_service; then
+        record_span "scheduler.readiness" "$(random_hex 8)" "$RUN_SPAN_ID" "$ready_start" "$(now_ts)" '{"ready": false}'
+        record_span "scheduler.run" "$RUN_SPAN_ID" "" "$RUN_STARTED_AT" "$(now_ts)" '{"success": false}'
         log_error "服务不可用，终止任务"
         exit 1
     fi
+    record_span "scheduler.readiness" "$(random_hex 8)" "$RUN_SPAN_ID" "$ready_start" "$(now_ts)" '{"ready": true}'
     
-    # Step 3: 执行所有任务
+    # Step 3: 执行所有任务（先读取最新配置；循环展开的是此刻的任务列表，之后的修改下次运行生效）
+    load_live_config
     log ""
     log "开始执行任务列表..."
     log ""
@@ -311,9 +531,13 @@ main() {
     log "  任务执行完成"
     log "=============================================="
     log "  成功: ${success_count}/${total_tasks}"
-    log "  时间: $(date '+%Y-%m-%d %H:%M:%S')"
+    log "  时间: $(clock_date '+%Y-%m-%d %H:%M:%S')"
     log "=============================================="
     
+    record_span "scheduler.run" "$RUN_SPAN_ID" "" "$RUN_STARTED_AT" "$(now_ts)" \
+        "{\"tasks\": ${total_tasks}, \"succeeded\": ${success_count}, \"config_version\": \"${CONFIG_VERSION}\"}"
+    upload_spans
+    
     if [ $success_count -eq $total_tasks ]; then
         exit 0
     else
@@ -171,6 +171,13 @@ for cmd in "${REQUIRED_CMDS[@]}"; do
     fi
 done
 
+# python3 可选：用于 wol.py 原生唤醒，缺失时回退到 wolwin alias
+if command -v python3 &> /dev/null; then
+    log_success "python3 可用 ($(python3 --version 2>&1))"
+else
+    log_warn "python3 不可用 - wol.py 将被跳过，回退到 wolwin alias"
+fi
+
 # 检查仓库目录
 echo ""
 echo -e "${BLUE}📁 目录检查:${NC}"
@@ -245,7 +252,7 @@ elif [[ -d "$DEPLOY_DIR" ]] && [[ -f "${DEPLOY_DIR}/config.sh" ]]; then
     sudo mkdir -p "$CURRENT_BACKUP_DIR"
     
     # 备份脚本文件
-    for file in "${DEPLOY_DIR}"/*.sh; do
+    for file in "${DEPLOY_DIR}"/*.sh "${DEPLOY_DIR}"/*.py; do
         if [[ -f "$file" ]]; then
             sudo cp "$file" "$CURRENT_BACKUP_DIR/"
             log_success "  备份: $(basename "$file")"
@@ -315,11 +322,13 @@ echo -e "${YELLOW}┌───────────────────
 echo -e "${YELLOW}│ 文件对比: 源文件 vs 已部署文件                                   │${NC}"
 echo -e "${YELLOW}└─────────────────────────────────────────────────────────────────┘${NC}"
 
-FILES_TO_COMPARE=("config.sh" "daily_tasks.sh" "daily_checkin.sh" "interval_checkin.sh")
+FILES_TO_COMPARE=("config.sh" "daily_tasks.sh" "daily_checkin.sh" "interval_checkin.sh" "wol.py" "track_tasks.py" "live_config.py")
 CHANGES_DETECTED=false
 
 for file in "${FILES_TO_COMPARE[@]}"; do
     SOURCE_FILE="${SOURCE_DIR}/${file}"
+    # live_config.py 与后端共用，位于仓库根目录
+    [[ "$file" == "live_config.py" ]] && SOURCE_FILE="${REPO_DIR}/${file}"
     DEPLOYED_FILE="${DEPLOY_DIR}/${file}"
     
     echo ""
@@ -413,7 +422,7 @@ sudo mkdir -p "$DEPLOY_DIR"
 
 # 复制脚本文件
 log_info "复制脚本文件..."
-for file in "${SOURCE_DIR}"/*.sh; do
+for file in "${SOURCE_DIR}"/*.sh "${SOURCE_DIR}"/*.py "${REPO_DIR}/live_config.py"; do
     if [[ -f "$file" ]]; then
         sudo cp "$file" "$DEPLOY_DIR/"
         sudo chmod +x "${DEPLOY_DIR}/$(basename "$file")"
@@ -10,6 +10,8 @@
 #   ./interval_checkin.sh              # 默认每 5 分钟执行一次
 #   ./interval_checkin.sh 10           # 每 10 分钟执行一次
 #   ./interval_checkin.sh 1            # 每 1 分钟执行一次（快速测试）
+#   ./interval_checkin.sh 5 288        # 执行 288 个周期后退出（0 = 不限）
+#   SCHED_CLOCK=virtual ./interval_checkin.sh 5 288   # 虚拟时间跑完一整天（见下方"时钟"）
 #
 # ==============================================================================
 
@@ -23,6 +25,9 @@ else
     WINDOWS_IP="192.168.0.147"
     COMET_PORT="5000"
     COMET_API_KEY="${COMET_API_KEY:-my-secret-password-123}"
+    WOL_MAC="${WOL_MAC:-}"
+    WOL_TARGETS="255.255.255.255"
+    WOL_REPEAT=3
     WAKE_WAIT_SECONDS=20
     TASK_INTERVAL_SECONDS=30
     TASKS=(
@@ -33,8 +38,60 @@ fi
 
 # 配置覆盖
 INTERVAL_MINUTES="${1:-5}"              # 默认 5 分钟，可通过参数覆盖
+MAX_CYCLES="${2:-0}"                    # 执行多少个周期后退出，0 = 直到手动终止
+INTERVAL_HEALTH_RETRIES="${INTERVAL_HEALTH_RETRIES:-5}"     # 每个周期的健康检查次数
+INTERVAL_HEALTH_INTERVAL="${INTERVAL_HEALTH_INTERVAL:-10}"  # 健康检查失败后的等待（秒）
 COMET_BASE_URL="http://${WINDOWS_IP}:${COMET_PORT}"
 
+# ==============================================================================
+# 时钟（SCHED_CLOCK=virtual 时使用虚拟时间，见 sim_clock.py / sim_schedule.py）
+# ==============================================================================
+# virtual 模式下所有等待（倒计时 / 健康检查间隔 / 任务间隔）立即返回，只推进 SCHED_CLOCK_FILE 中的时间；
+# 日志时间戳和 span 时间也使用虚拟时间。后端用 --virtual-clock 读取同一文件时，
+# 模拟器的启动和执行耗时随调度脚本的等待推进。每个周期仍要启动 curl / python 等进程（约 0.6 秒），
+# 288 个周期（一天）需要几分钟；只看时间统计时用 sim_schedule.py（毫秒级）。
+# SCHED_CLOCK_START 指定虚拟时间起点（Unix 时间戳），未指定时沿用时钟文件，文件不存在时从当前时间开始。
+
+SCHED_CLOCK="${SCHED_CLOCK:-real}"
+SCHED_CLOCK_FILE="${SCHED_CLOCK_FILE:-/tmp/satellite-y/clock}"
+
+if [ "$SCHED_CLOCK" = virtual ]; then
+    mkdir -p "$(dirname "$SCHED_CLOCK_FILE")"
+    if [ -n "$SCHED_CLOCK_START" ] || [ ! -f "$SCHED_CLOCK_FILE" ]; then
+        echo "${SCHED_CLOCK_START:-$(date '+%s')}" > "$SCHED_CLOCK_FILE"
+    fi
+fi
+
+# 当前时间（Unix 时间戳，带小数）
+clock_now() {
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        cat "$SCHED_CLOCK_FILE"
+    else
+        date '+%s.%N' | cut -c1-17
+    fi
+}
+
+# 按时钟格式化时间，参数同 date: clock_date '+%Y-%m-%d'
+clock_date() {
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        local now
+        now=$(clock_now)
+        date -d "@${now%.*}" "$@"
+    else
+        date "$@"
+    fi
+}
+
+# 等待指定秒数（virtual 模式下原子替换时钟文件，后端不会读到写了一半的值）
+clock_sleep() {
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        awk -v now="$(clock_now)" -v s="$1" 'BEGIN { printf "%.3f\n", now + s }' > "${SCHED_CLOCK_FILE}.$$"
+        mv "${SCHED_CLOCK_FILE}.$$" "$SCHED_CLOCK_FILE"
+    else
+        sleep "$1"
+    fi
+}
+
 # 颜色输出
 RED='\033[0;31m'
 GREEN='\033[0;32m'
@@ -44,23 +101,52 @@ CYAN='\033[0;36m'
 NC='\033[0m'
 
 log() {
-    echo -e "${BLUE}[$(date '+%Y-%m-%d %H:%M:%S')]${NC} $1"
+    echo -e "${BLUE}[$(clock_date '+%Y-%m-%d %H:%M:%S')]${NC} $1"
 }
 
 log_success() {
-    echo -e "${GREEN}[$(date '+%Y-%m-%d %H:%M:%S')] ✅ $1${NC}"
+    echo -e "${GREEN}[$(clock_date '+%Y-%m-%d %H:%M:%S')] ✅ $1${NC}"
 }
 
 log_error() {
-    echo -e "${RED}[$(date '+%Y-%m-%d %H:%M:%S')] ❌ $1${NC}"
+    echo -e "${RED}[$(clock_date '+%Y-%m-%d %H:%M:%S')] ❌ $1${NC}"
 }
 
 log_warning() {
-    echo -e "${YELLOW}[$(date '+%Y-%m-%d %H:%M:%S')] ⚠️  $1${NC}"
+    echo -e "${YELLOW}[$(clock_date '+%Y-%m-%d %H:%M:%S')] ⚠️  $1${NC}"
 }
 
 log_task() {
-    echo -e "${CYAN}[$(date '+%Y-%m-%d %H:%M:%S')] 🔹 $1${NC}"
+    echo -e "${CYAN}[$(clock_date '+%Y-%m-%d %H:%M:%S')] 🔹 $1${NC}"
+}
+
+# ==============================================================================
+# 共享配置（comet.config.json，见 live_config.py）
+# ==============================================================================
+# 文件中写明的 scheduler 字段覆盖 config.sh 中的同名配置（TASKS / TASK_PRIORITY / ...）。
+# 每个周期执行任务列表前重新读取，修改后下一个周期生效，无需重启脚本。
+# 文件无效时保留当前配置。
+
+LIVE_CONFIG_FILE="${COMET_CONFIG:-${SCRIPT_DIR}/comet.config.json}"
+CONFIG_VERSION="config.sh"
+
+load_live_config() {
+    [ -f "$LIVE_CONFIG_FILE" ] || return 0
+    command -v python3 &> /dev/null || return 0
+    
+    # 部署目录中 live_config.py 与脚本同级，仓库中位于上一级
+    local tool="${SCRIPT_DIR}/live_config.py"
+    [ -f "$tool" ] || tool="${SCRIPT_DIR}/../live_config.py"
+    
+    local previous=$CONFIG_VERSION
+    local exports
+    if exports=$(python3 "$tool" export-sh "$LIVE_CONFIG_FILE" 2>&1); then
+        eval "$exports"
+        [ "$CONFIG_VERSION" != "$previous" ] && log "配置版本: ${CONFIG_VERSION} (${LIVE_CONFIG_FILE})"
+    else
+        log_warning "共享配置无效，继续使用 ${CONFIG_VERSION}: ${exports}"
+    fi
+    return 0
 }
 
 # 实时倒计时显示
@@ -68,14 +154,21 @@ countdown() {
     local seconds=$1
     local message="${2:-等待中}"
     
+    # 虚拟时间：一次推进，不逐秒刷新
+    if [ "$SCHED_CLOCK" = virtual ]; then
+        clock_sleep "$seconds"
+        printf "${BLUE}[$(clock_date '+%Y-%m-%d %H:%M:%S')]${NC} ⏱️  ${message}: ${seconds} 秒（虚拟时间）完成!\n"
+        return 0
+    fi
+    
     while [ $seconds -gt 0 ]; do
         local mins=$((seconds / 60))
         local secs=$((seconds % 60))
-        printf "\r${BLUE}[$(date '+%Y-%m-%d %H:%M:%S')]${NC} ⏱️  ${message}: %02d:%02d 剩余 " $mins $secs
+        printf "\r${BLUE}[$(clock_date '+%Y-%m-%d %H:%M:%S')]${NC} ⏱️  ${message}: %02d:%02d 剩余 " $mins $secs
         sleep 1
         seconds=$((seconds - 1))
     done
-    printf "\r${BLUE}[$(date '+%Y-%m-%d %H:%M:%S')]${NC} ⏱️  ${message}: 00:00 完成!      \n"
+    printf "\r${BLUE}[$(clock_date '+%Y-%m-%d %H:%M:%S')]${NC} ⏱️  ${message}: 00:00 完成!      \n"
 }
 
 # 检查服务是否在线
@@ -96,16 +189,17 @@ execute_task() {
     local url="${COMET_BASE_URL}${endpoint}"
     local response
     
-    if [[ "$endpoint" == "/execute/ai" ]]; then
+    # /execute/url 发送 url，其他端点族（ai / ai_assistant / 插件）与 daily_tasks.sh 相同发送 instruction
+    if [[ "$endpoint" == "/execute/url" ]]; then
         response=$(curl -s -X POST "$url" \
             -H "Content-Type: application/json" \
             -H "X-API-Key: ${COMET_API_KEY}" \
-            -d "{\"instruction\": \"${instruction}\"}" 2>&1)
-    elif [[ "$endpoint" == "/execute/url" ]]; then
+            -d "{\"url\": \"${instruction}\"}" 2>&1)
+    elif [[ "$endpoint" == /execute/* ]]; then
         response=$(curl -s -X POST "$url" \
             -H "Content-Type: application/json" \
             -H "X-API-Key: ${COMET_API_KEY}" \
-            -d "{\"url\": \"${instruction}\"}" 2>&1)
+            -d "{\"instruction\": \"${instruction}\", \"priority\": \"${TASK_PRIORITY:-normal}\"}" 2>&1)
     else
         log_error "未知端点类型: ${endpoint}"
         return 1
@@ -133,29 +227,46 @@ run_checkin_cycle() {
     # Step 1: 发送 WoL 唤醒
     log "Step 1: 发送 Wake-on-LAN..."
     
-    # 尝试加载用户的 alias 定义
-    if [ -f "$HOME/.bashrc" ]; then
-        shopt -s expand_aliases 2>/dev/null
-        source "$HOME/.bashrc" 2>/dev/null
-    fi
+    local wake_waited=false
     
-    if command -v wolwin &> /dev/null || type wolwin &> /dev/null; then
-        wolwin
-        log_success "WoL 包已发送"
-    elif [ -f "$HOME/.bashrc" ] && grep -q "alias wolwin" "$HOME/.bashrc"; then
-        eval $(grep "alias wolwin" "$HOME/.bashrc" | sed "s/alias wolwin=//;s/'//g;s/\"//g")
-        log_success "WoL 包已发送 (通过 alias)"
+    if [ -n "$WOL_MAC" ] && command -v python3 &> /dev/null; then
+        # 原生 wol.py：并发发送并确认端口可连接
+        local wol_args=()
+        for mac in $WOL_MAC; do wol_args+=(--mac "$mac"); done
+        for target in $WOL_TARGETS; do wol_args+=(--target "$target"); done
+        
+        python3 "${SCRIPT_DIR}/wol.py" send "${wol_args[@]}" --repeat "${WOL_REPEAT:-3}" \
+            --confirm "${WINDOWS_IP}:${COMET_PORT}" --timeout "$WAKE_WAIT_SECONDS"
+        wake_waited=true
     else
-        log_warning "wolwin 命令未找到"
+        # 尝试加载用户的 alias 定义
+        if [ -f "$HOME/.bashrc" ]; then
+            shopt -s expand_aliases 2>/dev/null
+            source "$HOME/.bashrc" 2>/dev/null
+        fi
+        
+        if command -v wolwin &> /dev/null || type wolwin &> /dev/null; then
+            wolwin
+            log_success "WoL 包已发送"
+        elif [ -f "$HOME/.bashrc" ] && grep -q "alias wolwin" "$HOME/.bashrc"; then
+            eval $(grep "alias wolwin" "$HOME/.bashrc" | sed "s/alias wolwin=//;s/'//g;s/\"//g")
+            log_success "WoL 包已发送 (通过 alias)"
+        else
+            log_warning "wolwin 命令未找到"
+        fi
     fi
     
     # Step 2: 等待系统启动
     log "Step 2: 等待系统启动..."
-    countdown $WAKE_WAIT_SECONDS "系统启动"
+    if [ "$wake_waited" = true ]; then
+        log "已完成唤醒确认，跳过启动倒计时"
+    else
+        countdown $WAKE_WAIT_SECONDS "系统启动"
+    fi
     
     # Step 3: 检查服务状态
     log "Step 3: 检查 Comet TaskRunner 服务..."
-    local retries=5
+    local retries=$INTERVAL_HEALTH_RETRIES
     local connected=false
     
     for i in $(seq 1 $retries); do
@@ -166,7 +277,7 @@ run_checkin_cycle() {
             break
         fi
         log "  服务未响应，重试 $i/$retries..."
-        sleep 10
+        clock_sleep "$INTERVAL_HEALTH_INTERVAL"
     done
     
     if [ "$connected" = false ]; then
@@ -174,7 +285,8 @@ run_checkin_cycle() {
         return 1
     fi
     
-    # Step 4: 执行所有任务
+    # Step 4: 执行所有任务（先读取最新配置）
+    load_live_config
     log "Step 4: 执行任务列表 (共 ${#TASKS[@]} 个)..."
     log ""
     
@@ -216,13 +328,17 @@ main() {
     echo "  间隔循环签到脚本"
     echo "=============================================="
     echo ""
+    load_live_config
     echo "  目标: ${COMET_BASE_URL}"
+    echo "  配置版本: ${CONFIG_VERSION}"
     echo "  任务数量: ${#TASKS[@]}"
     for task_entry in "${TASKS[@]}"; do
         IFS='|' read -r _ instruction description <<< "$task_entry"
         echo "    - ${description} (${instruction})"
     done
     echo "  间隔: ${INTERVAL_MINUTES} 分钟"
+    [ "$MAX_CYCLES" -gt 0 ] && echo "  周期数: ${MAX_CYCLES}"
+    [ "$SCHED_CLOCK" = virtual ] && echo "  时钟: 虚拟时间 (${SCHED_CLOCK_FILE})"
     echo "  按 Ctrl+C 终止"
     echo ""
     echo "=============================================="
@@ -239,6 +355,11 @@ main() {
         cycle=$((cycle + 1))
         run_checkin_cycle $cycle
         
+        if [ "$MAX_CYCLES" -gt 0 ] && [ $cycle -ge "$MAX_CYCLES" ]; then
+            log_success "已完成 ${MAX_CYCLES} 个周期，退出"
+            return 0
+        fi
+        
         log ""
         countdown $interval_seconds "下次执行倒计时"
     done
@@ -228,7 +228,7 @@ log_header "Step 3: 执行回滚"
 
 # 复制脚本文件
 log_info "恢复脚本文件..."
-for file in "${SELECTED_BACKUP_PATH}"/*.sh; do
+for file in "${SELECTED_BACKUP_PATH}"/*.sh "${SELECTED_BACKUP_PATH}"/*.py; do
     if [[ -f "$file" ]]; then
         sudo cp "$file" "$DEPLOY_DIR/"
         sudo chmod +x "${DEPLOY_DIR}/$(basename "$file")"
@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+# sim_schedule.py
+# 调度离散事件模拟 - 用虚拟时钟跑 daily_tasks.sh / interval_checkin.sh 的时间逻辑和模拟器后端，毫秒级得到一整天的结果
+"""
+调度时间逻辑的离散事件模拟
+
+测试调度脚本原来要真的等完 WAKE_WAIT_SECONDS、HEALTH_CHECK_INTERVAL × HEALTH_CHECK_RETRIES、
+TASK_INTERVAL_SECONDS 等倒计时。本工具按脚本的同一套步骤和配置（config.sh + comet.config.json）
+在虚拟时间中执行，后端使用 emulator.py 的模拟器（启动耗时、执行耗时分布、失败率、并发上限、
+上下文冷启动），事件之间直接跳转，一整天的间隔调度几毫秒内完成
+（SCHED_CLOCK=virtual 直接运行脚本每个周期约 0.6 秒，主要是进程启动）。
+
+模拟的步骤（与脚本一致）：
+    daily     - 每天 --at 时刻（加上 timer 的 RandomizedDelaySec 随机延迟）运行一次 daily_tasks.sh：
+                WoL → 唤醒确认（设置了 WOL_MAC 时 wol.py 每秒探测端口，否则倒计时 WAKE_WAIT_SECONDS）→
+                健康检查 HEALTH_CHECK_RETRIES × HEALTH_CHECK_INTERVAL → 依次提交任务，间隔 TASK_INTERVAL_SECONDS
+    interval  - interval_checkin.sh：先倒计时一个间隔，每个周期 WoL → 唤醒 →
+                健康检查 INTERVAL_HEALTH_RETRIES × INTERVAL_HEALTH_INTERVAL → 提交任务，
+                周期结束后再倒计时一个间隔（周期 = 执行耗时 + 间隔，会逐渐漂移）
+
+配置按脚本的方式读取：source config.sh，再应用共享配置；interval_checkin.sh 自己的默认值
+（INTERVAL_HEALTH_*）直接从脚本中读取，不在这里重复定义。
+
+后端模型：任务进入 FIFO 队列，worker 数量 = 模拟器并发上限；每次启动后每个上下文第一次使用时
+加上 context_warmup；开始执行时已超过截止时间的任务记为 expired（daily_tasks.sh 会发送 deadline）。
+--idle-sleep 模拟 PC 空闲一段时间后重新睡眠，下一周期需要重新启动。
+
+报告：
+    makespan_s   周期开始（timer 触发 / 倒计时结束）到最后一个任务完成
+    latency_s    任务提交到完成；queue_s 提交到开始执行；end_to_end_s 周期开始到该任务完成
+
+使用方法：
+    python3 sim_schedule.py interval --hours 24 --emulator-config ../emulator.example.json
+    python3 sim_schedule.py interval --interval 10 --task "/execute/ai|/1mu3|一亩三分地" --seed 1
+    python3 sim_schedule.py daily --days 7 --at 02:00 --idle-sleep 30 --output sim_results.json
+
+与真实脚本联调（脚本使用虚拟时钟，后端模拟器读取同一时钟文件）：
+    python minimal_backend.py --emulator-config emulator.example.json --virtual-clock /tmp/satellite-y/clock
+    SCHED_CLOCK=virtual ./interval_checkin.sh 5 288
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+REPO_DIR = SCRIPT_DIR.parent
+sys.path.insert(0, str(REPO_DIR))
+
+from emulator import Emulator, load_profile  # noqa: E402
+from sim_clock import Simulation  # noqa: E402
+
+INTERVAL_SCRIPT = SCRIPT_DIR / "interval_checkin.sh"
+WOL_PROBE_INTERVAL = 1.0                # wol.py --probe-interval 默认值
+TIMER_RANDOMIZED_DELAY = 300            # daily-checkin.timer RandomizedDelaySec
+
+SETTING_NAMES = ("WAKE_WAIT_SECONDS", "HEALTH_CHECK_RETRIES", "HEALTH_CHECK_INTERVAL", "TASK_INTERVAL_SECONDS",
+                 "TASK_PRIORITY", "TASK_DEADLINE_SECONDS", "WOL_MAC", "CONFIG_VERSION",
+                 "INTERVAL_HEALTH_RETRIES", "INTERVAL_HEALTH_INTERVAL")
+NUMERIC_SETTINGS = ("WAKE_WAIT_SECONDS", "HEALTH_CHECK_RETRIES", "HEALTH_CHECK_INTERVAL", "TASK_INTERVAL_SECONDS",
+                    "TASK_DEADLINE_SECONDS", "INTERVAL_HEALTH_RETRIES", "INTERVAL_HEALTH_INTERVAL")
+
+
+def load_scheduler_settings(config_sh=None, live_config=None) -> dict:
+    """
+    按脚本的方式读取调度配置：source config.sh，存在共享配置时再 eval live_config.py export-sh，
+    最后执行 interval_checkin.sh 中 INTERVAL_HEALTH_* 的默认值赋值（config.sh 未设置时生效）
+
+    Returns:
+        {"WAKE_WAIT_SECONDS": 30, ..., "TASKS": [{"endpoint", "instruction", "description"}, ...]}
+    """
+    config_sh = Path(config_sh or SCRIPT_DIR / "config.sh")
+    live_config = Path(live_config or os.environ.get("COMET_CONFIG") or SCRIPT_DIR / "comet.config.json")
+    tool = SCRIPT_DIR / "live_config.py"
+    if not tool.exists():
+        tool = REPO_DIR / "live_config.py"
+
+    script = f"""
+        CONFIG_VERSION=config.sh
+        source "$1"
+        if [ -f "$2" ]; then
+            exports=$("{sys.executable}" "$3" export-sh "$2") || exit 3
+            eval "$exports"
+        fi
+        eval "$(grep -E '^INTERVAL_HEALTH_[A-Z_]+=' "$4")"
+        for name in {' '.join(SETTING_NAMES)}; do printf '%s=%s\\n' "$name" "${{!name}}"; done
+        for task in "${{TASKS[@]}}"; do printf 'TASK=%s\\n' "$task"; done
+    """
+    proc = subprocess.run(["bash", "-c", script, "sim", str(config_sh), str(live_config), str(tool),
+                           str(INTERVAL_SCRIPT)],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"读取调度配置失败: {proc.stderr.strip() or proc.stdout.strip()}")
+
+    settings = {"TASKS": []}
+    for line in proc.stdout.splitlines():
+        name, _, value = line.partition("=")
+        if name == "TASK":
+            settings["TASKS"].append(parse_task(value))
+        elif name in SETTING_NAMES:
+            settings[name] = value
+    for name in NUMERIC_SETTINGS:
+        settings[name] = float(settings.get(name) or 0)
+    settings["HEALTH_CHECK_RETRIES"] = int(settings["HEALTH_CHECK_RETRIES"])
+    settings["INTERVAL_HEALTH_RETRIES"] = int(settings["INTERVAL_HEALTH_RETRIES"])
+    return settings
+
+
+def parse_task(spec: str) -> dict:
+    """解析 endpoint|instruction|description（与 config.sh 中 TASKS 格式一致）"""
+    parts = spec.split("|")
+    if len(parts) < 2 or not parts[0].startswith("/"):
+        raise ValueError(f"无效的任务格式: {spec}（应为 endpoint|instruction|description）")
+    return {
+        "endpoint": parts[0],
+        "instruction": parts[1],
+        "description": parts[2] if len(parts) > 2 else parts[1],
+    }
+
+
+class EmulatedBackend:
+    """
+    模拟器后端（minimal_backend.py --emulator 的排队和执行过程）
+
+    Args:
+        sim: Simulation
+        emulator: 使用 sim.clock 的 Emulator
+        idle_sleep: 空闲多少秒后重新睡眠（0 = 不睡眠）
+    """
+
+    def __init__(self, sim: Simulation, emulator: Emulator, idle_sleep: float = 0.0):
+        self.sim = sim
+        self.emulator = emulator
+        self.idle_sleep = idle_sleep
+        self.queue = deque()
+        self.idle = [True] * emulator.concurrency
+        self.warm = [False] * emulator.concurrency
+        self.last_activity = sim.now()
+        self.boots = 0
+
+    def is_ready(self) -> bool:
+        return self.emulator.is_ready()
+
+    def wake(self):
+        if self.emulator.state() == "asleep":
+            self.boots += 1
+            self.warm = [False] * len(self.warm)         # 重新启动后上下文需要冷启动
+        self.emulator.wake()
+
+    def submit(self, task: dict) -> bool:
+        """提交任务（未就绪时返回 False，对应 503）"""
+        task["submitted_at"] = self.sim.now()
+        if not self.is_ready():
+            task["status"] = "rejected"
+            task["finished_at"] = task["submitted_at"]
+            return False
+        task["status"] = "queued"
+        self.queue.append(task)
+        self._touch()
+        self._dispatch()
+        return True
+
+    def _dispatch(self):
+        now = self.sim.now()
+        while self.queue and True in self.idle:
+            task = self.queue.popleft()
+            deadline = task.get("deadline")
+            if deadline and now > task["submitted_at"] + deadline:
+                task.update(status="expired", started_at=None, finished_at=now)
+                continue
+            worker = self.idle.index(True)
+            self.idle[worker] = False
+            warmup = 0.0 if self.warm[worker] else self.emulator.context_warmup()
+            self.warm[worker] = True
+            service_time, will_fail = self.emulator.plan(task["instruction"])
+            service_time *= self.emulator.time_scale
+            task.update(status="running", started_at=now, warmup_s=warmup, service_s=service_time)
+            self.sim.after(warmup + service_time, self._finish, task, worker, will_fail)
+
+    def _finish(self, task, worker, will_fail):
+        task["status"] = "failed" if will_fail else "done"
+        task["finished_at"] = self.sim.now()
+        self.idle[worker] = True
+        self._touch()
+        self._dispatch()
+
+    def _touch(self):
+        self.last_activity = self.sim.now()
+        if self.idle_sleep:
+            self.sim.after(self.idle_sleep, self._maybe_sleep)
+
+    def _maybe_sleep(self):
+        if (not self.queue and all(self.idle)
+                and self.sim.now() - self.last_activity >= self.idle_sleep
+                and self.emulator.state() == "ready"):
+            self.emulator.sleep()
+
+
+class ScheduleSimulator:
+    """
+    按调度脚本的步骤在虚拟时间中运行
+
+    Args:
+        mode: daily / interval
+        settings: load_scheduler_settings() 的结果
+        backend: EmulatedBackend
+    """
+
+    def __init__(self, mode: str, settings: dict, backend: EmulatedBackend, rng: random.Random):
+        self.mode = mode
+        self.settings = settings
+        self.backend = backend
+        self.sim = backend.sim
+        self.rng = rng
+        self.cycles = []
+
+    def run_cycle(self):
+        """一个周期（daily_tasks.sh 的一次运行 / interval_checkin.sh 的一个周期），生成器进程"""
+        s = self.settings
+        cycle = {"cycle": len(self.cycles) + 1, "started_at": self.sim.now(), "tasks": []}
+        self.cycles.append(cycle)
+
+        # 唤醒：发送 WoL；wol.py 每秒探测端口直到可连接或超时，否则固定倒计时
+        self.backend.wake()
+        wake_wait = s["WAKE_WAIT_SECONDS"]
+        if s.get("WOL_MAC"):
+            waited = 0.0
+            while not self.backend.is_ready() and waited < wake_wait:
+                step = min(WOL_PROBE_INTERVAL, wake_wait - waited)
+                waited += step
+                yield step
+        else:
+            yield wake_wait
+        cycle["wake_s"] = self.sim.now() - cycle["started_at"]
+
+        # 健康检查：每次失败后等待一个间隔（最后一次失败后也等待，与脚本一致）
+        if self.mode == "interval":
+            retries, interval = s["INTERVAL_HEALTH_RETRIES"], s["INTERVAL_HEALTH_INTERVAL"]
+        else:
+            retries, interval = s["HEALTH_CHECK_RETRIES"], s["HEALTH_CHECK_INTERVAL"]
+        ready = False
+        for _ in range(retries):
+            if self.backend.is_ready():
+                ready = True
+                break
+            yield interval
+        cycle["ready"] = ready
+        cycle["ready_s"] = self.sim.now() - cycle["started_at"]
+        if not ready:
+            cycle["scheduler_s"] = cycle["ready_s"]
+            return
+
+        # 提交任务，任务之间倒计时（最后一个任务之后不等待）
+        tasks = s["TASKS"]
+        for index, spec in enumerate(tasks):
+            task = dict(spec, cycle=cycle["cycle"])
+            if self.mode == "daily":
+                task["deadline"] = s["TASK_DEADLINE_SECONDS"] or None
+            cycle["tasks"].append(task)
+            self.backend.submit(task)
+            if index < len(tasks) - 1:
+                yield s["TASK_INTERVAL_SECONDS"]
+        cycle["scheduler_s"] = self.sim.now() - cycle["started_at"]
+
+    def interval_loop(self, interval_seconds: float, until: float):
+        yield interval_seconds                               # 首次执行前倒计时
+        while self.sim.now() < until:
+            yield from self.run_cycle()
+            yield interval_seconds
+
+    def daily_loop(self, start: datetime, at: str, until: float):
+        hour, minute = (int(part) for part in at.split(":"))
+        day = start.replace(hour=hour, minute=minute, second=0, microsecond=0)
+        if day < start:
+            day += timedelta(days=1)
+        while True:
+            fire = (day - start).total_seconds() + self.rng.uniform(0, TIMER_RANDOMIZED_DELAY)
+            if fire >= until:
+                return
+            yield fire - self.sim.now()
+            yield from self.run_cycle()
+            day += timedelta(days=1)
+
+
+def summarize(values) -> dict:
+    values = sorted(v for v in values if v is not None)
+    if not values:
+        return {"count": 0, "median": None, "p95": None, "max": None, "mean": None}
+    return {
+        "count": len(values),
+        "median": round(statistics.median(values), 3),
+        "p95": round(values[min(len(values) - 1, int(len(values) * 0.95))], 3),
+        "max": round(values[-1], 3),
+        "mean": round(statistics.mean(values), 3),
+    }
+
+
+def build_report(simulator: ScheduleSimulator, start: datetime, detail: bool = False) -> dict:
+    """汇总周期 makespan 和每条指令的延迟"""
+    cycles = []
+    statuses = {}
+    per_instruction = {}
+    for cycle in simulator.cycles:
+        # makespan 只统计实际执行的任务；还有任务未结束（模拟结束时仍在运行）的周期不计入
+        executed = [t["finished_at"] for t in cycle["tasks"] if t.get("status") in ("done", "failed")]
+        pending = any(t.get("status") in ("queued", "running") for t in cycle["tasks"])
+        complete = cycle["ready"] and executed and not pending
+        row = {
+            "cycle": cycle["cycle"],
+            "started": (start + timedelta(seconds=cycle["started_at"])).isoformat(timespec="seconds"),
+            "wake_s": round(cycle["wake_s"], 3),
+            "ready": cycle["ready"],
+            "ready_s": round(cycle["ready_s"], 3),
+            "scheduler_s": round(cycle["scheduler_s"], 3),
+            "makespan_s": round(max(executed) - cycle["started_at"], 3) if complete else None,
+            "tasks": [],
+        }
+        for task in cycle["tasks"]:
+            status = task.get("status", "queued")
+            statuses[status] = statuses.get(status, 0) + 1
+            entry = {
+                "instruction": task["instruction"],
+                "status": status,
+                "queue_s": _delta(task, "submitted_at", "started_at"),
+                "warmup_s": _round(task.get("warmup_s")),
+                "service_s": _round(task.get("service_s")),
+                "latency_s": _delta(task, "submitted_at", "finished_at") if status in ("done", "failed") else None,
+                "end_to_end_s": (round(task["finished_at"] - cycle["started_at"], 3)
+                                 if status in ("done", "failed") else None),
+            }
+            row["tasks"].append(entry)
+            stats = per_instruction.setdefault(task["instruction"], {"latency_s": [], "queue_s": [],
+                                                                     "end_to_end_s": [], "statuses": {}})
+            for key in ("latency_s", "queue_s", "end_to_end_s"):
+                stats[key].append(entry[key])
+            stats["statuses"][status] = stats["statuses"].get(status, 0) + 1
+        cycles.append(row)
+
+    report = {
+        "cycles": len(cycles),
+        "cycles_not_ready": sum(1 for c in cycles if not c["ready"]),
+        "boots": simulator.backend.boots,
+        "statuses": statuses,
+        "makespan_s": summarize(c["makespan_s"] for c in cycles),
+        "wake_s": summarize(c["wake_s"] for c in cycles),
+        "ready_s": summarize(c["ready_s"] for c in cycles if c["ready"]),
+        "scheduler_s": summarize(c["scheduler_s"] for c in cycles),
+        "instructions": {
+            name: {"statuses": stats["statuses"],
+                   **{key: summarize(stats[key]) for key in ("latency_s", "queue_s", "end_to_end_s")}}
+            for name, stats in per_instruction.items()
+        },
+    }
+    if detail:
+        report["cycle_detail"] = cycles
+    return report
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+def _delta(task, start_key, end_key):
+    start, end = task.get(start_key), task.get(end_key)
+    return None if start is None or end is None else round(end - start, 3)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="调度时间逻辑的离散事件模拟（虚拟时间）")
+    parser.add_argument("mode", choices=["interval", "daily"], help="模拟 interval_checkin.sh 或 daily_tasks.sh")
+    parser.add_argument("--hours", type=float, help="模拟时长（小时，interval 默认 24）")
+    parser.add_argument("--days", type=int, default=1, help="daily 模式模拟天数")
+    parser.add_argument("--interval", type=float, default=5, help="interval 模式的间隔（分钟，同脚本参数）")
+    parser.add_argument("--at", default="02:00", help="daily 模式的 timer 时刻（daily-checkin.timer OnCalendar）")
+    parser.add_argument("--start", help="虚拟时间起点（ISO 时间，默认今天 00:00）")
+    parser.add_argument("--config-sh", help="config.sh 路径（默认脚本同目录）")
+    parser.add_argument("--config", help="共享配置 comet.config.json（默认 $COMET_CONFIG 或脚本同目录）")
+    parser.add_argument("--task", action="append", help="覆盖任务列表: endpoint|instruction|description（可重复）")
+    parser.add_argument("--emulator-config", help="模拟器配置文件（emulator.py 格式）")
+    parser.add_argument("--idle-sleep", type=float, default=0, help="后端空闲多少分钟后重新睡眠（0 = 不睡眠）")
+    parser.add_argument("--seed", type=int, help="随机种子（默认随机，结果中记录实际使用的种子）")
+    parser.add_argument("--detail", action="store_true", help="输出每个周期 / 任务的明细")
+    parser.add_argument("--label", default="", help="本次模拟标签（用于对比）")
+    parser.add_argument("--output", "-o", help="追加 JSON 结果到文件（每行一个结果）")
+    args = parser.parse_args(argv)
+
+    try:
+        settings = load_scheduler_settings(args.config_sh, args.config)
+        if args.task:
+            settings["TASKS"] = [parse_task(spec) for spec in args.task]
+        profile = load_profile(args.emulator_config)
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    seed = args.seed if args.seed is not None else random.randrange(2 ** 32)
+    start = datetime.fromisoformat(args.start) if args.start else datetime.now().replace(
+        hour=0, minute=0, second=0, microsecond=0)
+    hours = args.hours if args.hours is not None else (24 if args.mode == "interval" else 24 * args.days)
+    until = hours * 3600
+
+    wall_start = time.perf_counter()
+    sim = Simulation()
+    emulator = Emulator(profile, seed=seed, clock=sim.clock)
+    backend = EmulatedBackend(sim, emulator, idle_sleep=args.idle_sleep * 60)
+    simulator = ScheduleSimulator(args.mode, settings, backend, random.Random(seed))
+    if args.mode == "interval":
+        sim.spawn(simulator.interval_loop(args.interval * 60, until))
+    else:
+        sim.spawn(simulator.daily_loop(start, args.at, until))
+    sim.run()                                   # 周期在 until 之前开始，已提交的任务执行完为止
+    wall_ms = (time.perf_counter() - wall_start) * 1000
+
+    report = build_report(simulator, start, detail=args.detail)
+    result = {
+        "label": args.label,
+        "timestamp": datetime.now().isoformat(),
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "mode": args.mode,
+        "seed": seed,
+        "start": start.isoformat(),
+        "simulated_hours": hours,
+        "interval_minutes": args.interval if args.mode == "interval" else None,
+        "config_version": settings.get("CONFIG_VERSION"),
+        "tasks": [t["instruction"] for t in settings["TASKS"]],
+        "emulator": {k: profile.get(k) for k in ("time_scale", "concurrency", "error_rate", "start_asleep")},
+        "events": sim.processed,
+        "wall_ms": round(wall_ms, 1),
+        **report,
+    }
+
+    makespan = report["makespan_s"]
+    print(f"🕒 {args.mode}: {hours:g} 小时虚拟时间，{report['cycles']} 个周期，{sim.processed} 个事件，"
+          f"耗时 {wall_ms:.0f}ms", file=sys.stderr)
+    if makespan["count"]:
+        print(f"📊 makespan 中位数 {makespan['median']}s / p95 {makespan['p95']}s / 最大 {makespan['max']}s，"
+              f"任务状态 {report['statuses']}", file=sys.stderr)
+    else:
+        print(f"⚠️  没有完成执行的周期，任务状态 {report['statuses']}", file=sys.stderr)
+    for name, stats in report["instructions"].items():
+        if not stats["latency_s"]["count"]:
+            print(f"   {name}: 没有执行（{stats['statuses']}）", file=sys.stderr)
+            continue
+        print(f"   {name}: latency 中位数 {stats['latency_s']['median']}s / p95 {stats['latency_s']['p95']}s，"
+              f"排队 p95 {stats['queue_s']['p95']}s", file=sys.stderr)
+
+    text = json.dumps(result, ensure_ascii=False)
+    print(text)
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
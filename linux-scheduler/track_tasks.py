@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# track_tasks.py
+# 任务提交 + 完成跟踪 - 提交当天所有指令，并发轮询 /status/<task_id> 直到全部完成
+"""
+任务完成跟踪客户端
+
+流程：
+1. 按顺序提交所有任务（POST endpoint，JSON 解析响应中的 task_id）
+2. 每个 task_id 一个轮询线程，指数退避查询 /status/<task_id>；
+   429 / 5xx / 网络错误时重试，404（如后端重启后任务 id 不存在）和其他 4xx 直接记为失败
+3. 所有任务共享同一个截止时间（--timeout），总等待时间 = 最慢的任务，而不是逐个相加
+4. 只有全部任务状态为完成时才返回 0
+
+使用方法：
+    python3 track_tasks.py --base-url http://192.168.0.147:5000 --api-key KEY \\
+        --task "/execute/ai|/1mu3|一亩三分地 每日签到" \\
+        --task "/execute/ai|/iyf|IYF 每日任务" \\
+        --timeout 900
+
+退出码：
+    0 - 全部任务完成
+    1 - 有任务提交失败 / 执行失败 / 超时
+    2 - 参数错误
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+# 任务状态分类
+DONE_STATES = {"done", "completed", "success", "succeeded", "finished"}
+FAILED_STATES = {"failed", "error", "cancelled", "canceled", "preempted", "expired", "rejected"}
+
+# 轮询退避配置
+INITIAL_POLL_INTERVAL = 1.0
+MAX_POLL_INTERVAL = 15.0
+BACKOFF_FACTOR = 1.5
+REQUEST_TIMEOUT = 10.0
+
+
+def log(message: str):
+    print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {message}", flush=True)
+
+
+def parse_task(spec: str) -> dict:
+    """解析 endpoint|instruction|description（与 config.sh 中 TASKS 格式一致）"""
+    parts = spec.split("|")
+    if len(parts) < 2 or not parts[0].startswith("/"):
+        raise ValueError(f"无效的任务格式: {spec}（应为 endpoint|instruction|description）")
+    return {
+        "endpoint": parts[0],
+        "instruction": parts[1],
+        "description": parts[2] if len(parts) > 2 else parts[1],
+    }
+
+
+class ApiClient:
+    """简单的 JSON API 客户端"""
+
+    def __init__(self, base_url: str, api_key: str = None, timeout: float = REQUEST_TIMEOUT):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, payload=None, headers=None):
+        """
+        发送请求
+
+        Returns:
+            (http_status, json_body_or_None, retry_after_seconds_or_None)
+        """
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        req.add_header("Accept", "application/json")
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        if self.api_key:
+            req.add_header("X-API-Key", self.api_key)
+        for name, value in (headers or {}).items():
+            req.add_header(name, value)
+
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, body, headers = resp.status, resp.read(), resp.headers
+        except urllib.error.HTTPError as e:
+            status, body, headers = e.code, e.read(), e.headers
+
+        try:
+            parsed = json.loads(body.decode("utf-8")) if body else None
+        except (ValueError, UnicodeDecodeError):
+            parsed = None
+
+        retry_after = None
+        if headers and headers.get("Retry-After"):
+            try:
+                retry_after = float(headers["Retry-After"])
+            except ValueError:
+                pass
+
+        return status, parsed, retry_after
+
+
+def traceparent_header(task: dict) -> dict:
+    """任务的 W3C traceparent 请求头（未设置 trace_id 时为空）"""
+    if not task.get("trace_id"):
+        return {}
+    return {"traceparent": f"00-{task['trace_id']}-{task['span_id']}-01"}
+
+
+def submit_task(client: ApiClient, task: dict, priority=None, deadline=None) -> dict:
+    """提交单个任务，结果写入 task["task_id"] / task["state"]"""
+    key = "url" if task["endpoint"].endswith("/url") else "instruction"
+    payload = {key: task["instruction"]}
+    if priority:
+        payload["priority"] = priority
+    if deadline:
+        payload["deadline"] = deadline
+
+    task["submitted_at"] = time.monotonic()
+    try:
+        status, body, _ = client.request("POST", task["endpoint"], payload,
+                                         headers=traceparent_header(task))
+    except (OSError, urllib.error.URLError) as e:
+        task.update(state="submit_failed", error=str(e))
+        return task
+
+    task_id = body.get("task_id") if isinstance(body, dict) else None
+    if 200 <= status < 300 and task_id:
+        task.update(task_id=str(task_id), state="submitted")
+    else:
+        error = body.get("error") if isinstance(body, dict) else None
+        task.update(state="submit_failed", error=f"HTTP {status}: {error or body}")
+    return task
+
+
+def track_task(client: ApiClient, task: dict, deadline: float, stop: threading.Event):
+    """轮询单个任务直到完成 / 失败 / 超过共享截止时间"""
+    interval = INITIAL_POLL_INTERVAL
+    polls = 0
+
+    while not stop.is_set():
+        wait = None
+        try:
+            status, body, retry_after = client.request("GET", f"/status/{task['task_id']}",
+                                                       headers=traceparent_header(task))
+            polls += 1
+        except (OSError, urllib.error.URLError) as e:
+            # 网络抖动：继续退避重试
+            task["last_error"] = str(e)
+        else:
+            state = str(body.get("status", "")).lower() if isinstance(body, dict) else ""
+            if status == 200 and state in DONE_STATES:
+                task.update(state="done", result=body.get("result"))
+                break
+            if status == 200 and state in FAILED_STATES:
+                task.update(state=state, error=body.get("result") or body.get("error"))
+                break
+            if 400 <= status < 500 and status != 429:
+                # 重试也不会成功：任务 id 不存在、请求被拒绝
+                error = body.get("error") if isinstance(body, dict) else None
+                task.update(state="not_found" if status == 404 else "rejected",
+                            error=f"HTTP {status}: {error or body}")
+                break
+            if state:
+                task["last_state"] = state
+            if retry_after:
+                wait = retry_after
+
+        now = time.monotonic()
+        if now >= deadline:
+            task["state"] = "timeout"
+            break
+
+        # 指数退避 + 抖动，避免多个任务同时打到后端
+        if wait is None:
+            wait = interval * random.uniform(0.8, 1.2)
+            interval = min(interval * BACKOFF_FACTOR, MAX_POLL_INTERVAL)
+        stop.wait(min(wait, deadline - now))
+
+    task["polls"] = polls
+    task["elapsed_s"] = round(time.monotonic() - task["submitted_at"], 3)
+
+
+def run(client: ApiClient, tasks, timeout: float, priority=None, deadline=None) -> bool:
+    """提交并跟踪所有任务，返回是否全部完成"""
+    for i, task in enumerate(tasks, 1):
+        submit_task(client, task, priority=priority, deadline=deadline)
+        if task["state"] == "submitted":
+            log(f"✅ [{i}/{len(tasks)}] 已提交: {task['description']} (Task ID: {task['task_id']})")
+        else:
+            log(f"❌ [{i}/{len(tasks)}] 提交失败: {task['description']} - {task.get('error')}")
+
+    pending = [t for t in tasks if t["state"] == "submitted"]
+    if pending:
+        log(f"⏳ 等待 {len(pending)} 个任务完成（最长 {timeout:.0f} 秒）...")
+
+    # 所有任务共用一个截止时间
+    track_deadline = time.monotonic() + timeout
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=track_task, args=(client, t, track_deadline, stop), daemon=True)
+        for t in pending
+    ]
+    for t in threads:
+        t.start()
+    try:
+        for t in threads:
+            t.join()
+    except KeyboardInterrupt:
+        stop.set()
+        raise
+
+    for task in pending:
+        if task["state"] == "done":
+            log(f"✅ 已完成: {task['description']} ({task['elapsed_s']}s, {task['polls']} 次查询)")
+        elif task["state"] == "timeout":
+            log(f"❌ 超时: {task['description']} (最后状态: {task.get('last_state', 'unknown')})")
+        else:
+            log(f"❌ 失败: {task['description']} ({task['state']}: {task.get('error')})")
+
+    return all(t["state"] == "done" for t in tasks)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="提交任务并跟踪完成状态")
+    parser.add_argument("--base-url", required=True, help="后端地址，如 http://192.168.0.147:5000")
+    parser.add_argument("--api-key", default=None, help="X-API-Key")
+    parser.add_argument("--task", action="append", required=True,
+                        help="endpoint|instruction|description（可重复）")
+    parser.add_argument("--timeout", type=float, default=900, help="所有任务的总等待时间（秒）")
+    parser.add_argument("--priority", help="任务优先级（high / normal / low）")
+    parser.add_argument("--deadline", type=float, help="任务截止时间（秒）")
+    parser.add_argument("--trace-id", help="链路追踪 trace_id（32 位 hex），每个任务生成一个 span_id 通过 traceparent 传给后端")
+    parser.add_argument("--json", action="store_true", help="最后输出一行 JSON 汇总")
+    args = parser.parse_args(argv)
+
+    try:
+        tasks = [parse_task(spec) for spec in args.task]
+        if args.trace_id and not re.fullmatch(r"[0-9a-f]{32}", args.trace_id):
+            raise ValueError(f"无效的 trace_id: {args.trace_id}")
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    if args.trace_id:
+        for task in tasks:
+            task.update(trace_id=args.trace_id, span_id=os.urandom(8).hex())
+
+    client = ApiClient(args.base_url, api_key=args.api_key or None)
+    start = time.monotonic()
+    success = run(client, tasks, args.timeout, priority=args.priority, deadline=args.deadline)
+    elapsed = round(time.monotonic() - start, 3)
+
+    done = sum(1 for t in tasks if t["state"] == "done")
+    log(f"{'✅' if success else '❌'} 完成 {done}/{len(tasks)}，总耗时 {elapsed}s")
+
+    if args.json:
+        summary = {
+            "success": success,
+            "done": done,
+            "total": len(tasks),
+            "elapsed_s": elapsed,
+            "tasks": [
+                {k: t.get(k) for k in ("description", "instruction", "task_id", "span_id", "state", "elapsed_s", "polls", "error")}
+                for t in tasks
+            ],
+        }
+        print(json.dumps(summary, ensure_ascii=False), flush=True)
+
+    return 0 if success else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
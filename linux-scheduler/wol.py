@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# wol.py
+# 原生 Wake-on-LAN 发送器 - 替代 ~/.bashrc 中的 wolwin alias
+"""
+Wake-on-LAN 唤醒工具
+
+功能：
+1. 根据 MAC 地址构建魔术包（6 x 0xFF + 16 x MAC）
+2. 并发发送到多个广播地址 / 主机，每个目标可重复发送
+3. 异步探测 TCP 端口，确认目标机器已唤醒
+4. 记录从发包到端口首次可连接的唤醒延迟
+
+使用方法：
+    python3 wol.py send --mac AA:BB:CC:DD:EE:FF
+    python3 wol.py send --mac AA:BB:CC:DD:EE:FF --target 192.168.0.255 --repeat 3
+    python3 wol.py send --mac AA:BB:CC:DD:EE:FF --confirm 192.168.0.147:5000 --timeout 120
+    python3 wol.py listen --port 9999     # 本地 UDP 监听，用于在 Linux 上测试
+
+本地测试：
+    python3 wol.py listen --port 9999 --count 3 &
+    python3 wol.py send --mac AA:BB:CC:DD:EE:FF --target 127.0.0.1:9999 --repeat 3
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import sys
+import time
+
+# 默认 WoL 端口（9 = discard，部分网卡也监听 7）
+DEFAULT_WOL_PORT = 9
+DEFAULT_BROADCAST = "255.255.255.255"
+
+MAGIC_HEADER = b"\xff" * 6
+MAGIC_PACKET_SIZE = 6 + 16 * 6
+
+
+def parse_mac(mac: str) -> bytes:
+    """
+    解析 MAC 地址
+
+    支持 AA:BB:CC:DD:EE:FF / AA-BB-CC-DD-EE-FF / AABB.CCDD.EEFF / AABBCCDDEEFF
+    """
+    cleaned = mac.strip()
+    for sep in (":", "-", ".", " "):
+        cleaned = cleaned.replace(sep, "")
+
+    if len(cleaned) != 12:
+        raise ValueError(f"无效的 MAC 地址: {mac}")
+
+    try:
+        return bytes.fromhex(cleaned)
+    except ValueError:
+        raise ValueError(f"无效的 MAC 地址: {mac}") from None
+
+
+def build_magic_packet(mac: str) -> bytes:
+    """构建魔术包: 6 个 0xFF + 16 次重复的 MAC 地址"""
+    return MAGIC_HEADER + parse_mac(mac) * 16
+
+
+def parse_magic_packet(data: bytes):
+    """
+    解析魔术包，返回 MAC 地址字符串
+
+    不是合法魔术包时返回 None
+    """
+    if len(data) < MAGIC_PACKET_SIZE or not data.startswith(MAGIC_HEADER):
+        return None
+
+    mac = data[6:12]
+    if data[6:MAGIC_PACKET_SIZE] != mac * 16:
+        return None
+
+    return ":".join(f"{b:02X}" for b in mac)
+
+
+def parse_endpoint(value: str, default_port: int):
+    """解析 host[:port]"""
+    host, sep, port = value.rpartition(":")
+    if not sep:
+        return value, default_port
+    return host, int(port)
+
+
+async def _send_to_target(sock, packet: bytes, target, repeat: int, interval: float):
+    """向单个目标重复发送魔术包，返回成功发送的次数"""
+    sent = 0
+
+    for i in range(repeat):
+        try:
+            # UDP sendto 不会长时间阻塞，直接调用即可（兼容 Python < 3.11）
+            sock.sendto(packet, target)
+            sent += 1
+        except OSError as e:
+            print(f"  ⚠ 发送到 {target[0]}:{target[1]} 失败: {e}", file=sys.stderr)
+
+        if i < repeat - 1:
+            await asyncio.sleep(interval)
+
+    return sent
+
+
+async def send_magic_packets(macs, targets, repeat: int = 3, interval: float = 0.1):
+    """
+    并发发送魔术包
+
+    Args:
+        macs: MAC 地址列表
+        targets: [(host, port), ...] 广播地址或主机
+        repeat: 每个目标的重复次数（UDP 不可靠，多发几次）
+        interval: 同一目标两次发送之间的间隔（秒）
+
+    Returns:
+        dict: 发送统计，包括首包发送时间（time.monotonic）
+    """
+    packets = [build_magic_packet(mac) for mac in macs]
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+    sock.setblocking(False)
+
+    try:
+        sent_at = time.monotonic()
+        jobs = [
+            _send_to_target(sock, packet, target, repeat, interval)
+            for packet in packets
+            for target in targets
+        ]
+        counts = await asyncio.gather(*jobs)
+    finally:
+        sock.close()
+
+    return {
+        "sent_at": sent_at,
+        "packets_sent": sum(counts),
+        "packets_expected": len(jobs) * repeat,
+    }
+
+
+async def _probe_port(host: str, port: int, connect_timeout: float) -> bool:
+    """尝试建立一次 TCP 连接"""
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout=connect_timeout
+        )
+    except (OSError, asyncio.TimeoutError):
+        return False
+
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def wait_for_port(endpoints, timeout: float = 120, probe_interval: float = 1.0,
+                        connect_timeout: float = 2.0):
+    """
+    异步探测多个 TCP 端口，返回第一个可连接的端点
+
+    Returns:
+        (host, port) 或 None（超时）
+    """
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        round_start = time.monotonic()
+        results = await asyncio.gather(
+            *(_probe_port(host, port, connect_timeout) for host, port in endpoints)
+        )
+        for endpoint, is_open in zip(endpoints, results):
+            if is_open:
+                return endpoint
+
+        remaining = deadline - time.monotonic()
+        wait = min(probe_interval - (time.monotonic() - round_start), remaining)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    return None
+
+
+async def wake(macs, targets, repeat: int = 3, interval: float = 0.1,
+               confirm=None, timeout: float = 120, probe_interval: float = 1.0):
+    """
+    发送魔术包并（可选）确认唤醒
+
+    Returns:
+        dict: 结果，包括 wake_latency_s（发包到端口首次可连接）
+    """
+    stats = await send_magic_packets(macs, targets, repeat=repeat, interval=interval)
+
+    result = {
+        "success": stats["packets_sent"] > 0,
+        "macs": list(macs),
+        "targets": [f"{h}:{p}" for h, p in targets],
+        "packets_sent": stats["packets_sent"],
+        "packets_expected": stats["packets_expected"],
+    }
+
+    if confirm:
+        endpoint = await wait_for_port(confirm, timeout=timeout, probe_interval=probe_interval)
+        result["confirmed"] = endpoint is not None
+        result["success"] = result["success"] and endpoint is not None
+        if endpoint is not None:
+            result["confirmed_endpoint"] = f"{endpoint[0]}:{endpoint[1]}"
+            result["wake_latency_s"] = round(time.monotonic() - stats["sent_at"], 3)
+
+    return result
+
+
+def listen(port: int, host: str = "0.0.0.0", count: int = 0, timeout: float = 0):
+    """
+    本地 UDP 监听，打印收到的魔术包（用于在 Linux 上测试发送端）
+
+    Args:
+        count: 收到多少个合法魔术包后退出（0 = 不限）
+        timeout: 最长监听时间（0 = 不限）
+
+    Returns:
+        int: 收到的合法魔术包数量
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    if timeout:
+        sock.settimeout(timeout)
+
+    print(f"👂 监听 UDP {host}:{port} ...", flush=True)
+    received = 0
+    try:
+        while not count or received < count:
+            try:
+                data, addr = sock.recvfrom(1024)
+            except socket.timeout:
+                break
+            mac = parse_magic_packet(data)
+            if mac:
+                received += 1
+                print(f"  ✓ 魔术包 #{received} 来自 {addr[0]}:{addr[1]} → {mac}", flush=True)
+            else:
+                print(f"  ✗ 非魔术包 ({len(data)} bytes) 来自 {addr[0]}:{addr[1]}", flush=True)
+    finally:
+        sock.close()
+
+    return received
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Wake-on-LAN 发送 / 测试工具")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    send_p = sub.add_parser("send", help="发送魔术包")
+    send_p.add_argument("--mac", action="append", required=True,
+                        help="目标 MAC 地址（可重复指定）")
+    send_p.add_argument("--target", action="append", default=[],
+                        help=f"广播地址或主机 host[:port]（可重复，默认 {DEFAULT_BROADCAST}:{DEFAULT_WOL_PORT}）")
+    send_p.add_argument("--repeat", type=int, default=3, help="每个目标重复次数")
+    send_p.add_argument("--interval", type=float, default=0.1, help="重复发送间隔（秒）")
+    send_p.add_argument("--confirm", action="append", default=[],
+                        help="发送后探测的 TCP 端点 host:port（可重复）")
+    send_p.add_argument("--timeout", type=float, default=120, help="唤醒确认超时（秒）")
+    send_p.add_argument("--probe-interval", type=float, default=1.0, help="端口探测间隔（秒）")
+    send_p.add_argument("--json", action="store_true", help="以 JSON 输出结果")
+
+    listen_p = sub.add_parser("listen", help="本地 UDP 监听（测试用）")
+    listen_p.add_argument("--host", default="0.0.0.0")
+    listen_p.add_argument("--port", type=int, default=DEFAULT_WOL_PORT)
+    listen_p.add_argument("--count", type=int, default=0, help="收到 N 个包后退出")
+    listen_p.add_argument("--timeout", type=float, default=0, help="最长监听时间（秒）")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "listen":
+        received = listen(args.port, host=args.host, count=args.count, timeout=args.timeout)
+        return 0 if received else 1
+
+    try:
+        for mac in args.mac:
+            parse_mac(mac)
+        targets = [parse_endpoint(t, DEFAULT_WOL_PORT) for t in args.target] \
+            or [(DEFAULT_BROADCAST, DEFAULT_WOL_PORT)]
+        confirm = [parse_endpoint(c, 0) for c in args.confirm]
+    except ValueError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 2
+
+    result = asyncio.run(wake(
+        args.mac, targets,
+        repeat=args.repeat,
+        interval=args.interval,
+        confirm=confirm,
+        timeout=args.timeout,
+        probe_interval=args.probe_interval,
+    ))
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False))
+    else:
+        print(f"📡 已发送 {result['packets_sent']}/{result['packets_expected']} 个魔术包 → {', '.join(result['targets'])}")
+        if confirm:
+            if result.get("confirmed"):
+                print(f"✅ {result['confirmed_endpoint']} 已可连接，唤醒延迟 {result['wake_latency_s']}s")
+            else:
+                print(f"❌ {args.timeout:.0f}s 内未能连接 {', '.join(args.confirm)}")
+
+    return 0 if result["success"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,497 @@
+# live_config.py
+# 共享配置 - 调度器与后端共用的带类型、带版本的配置文件，文件变化时热加载并原子替换
+"""
+共享配置与热加载
+
+config.sh 每次运行时重新 source，修改任务列表要通过 deploy.sh 重新部署；后端的队列容量、
+限流、worker 数量、处理器并发写死在代码里。本模块定义一个调度器和后端共用的配置文件
+（comet.config.json）：
+
+    {
+        "schema": 1,
+        "version": "2026-10-19.1",              # 可选的版本标签
+        "scheduler": {                          # Pi 端 daily_tasks.sh / interval_checkin.sh
+            "tasks": [{"endpoint": "/execute/ai", "instruction": "/1mu3", "description": "..."}],
+            "task_priority": "high",
+            "task_deadline_seconds": 1800,
+            "task_interval_seconds": 10
+        },
+        "backend": {                            # Windows 端 minimal_backend.py
+            "worker_count": 1,
+            "queue_max_size": 100,
+            "client_weights": {"pi-key": 2},
+            "rate_limits": {"execute_task": [5, 20]},
+            "handlers": [{"name": "1mu3", "prefixes": ["/1mu3"], "concurrency": 1, "timeout": 180}]
+        }
+    }
+
+- 类型检查：未知字段、类型错误、取值越界都会让整个文件被拒绝，继续使用上一个版本
+- 版本：内容摘要（sha256 前 12 位），有 version 标签时为 "标签+摘要"；每次成功加载 revision 加 1
+- 热加载：Linux 上用 inotify 监视配置文件所在目录（兼容编辑器"写临时文件再改名"），
+  其他系统按修改时间轮询
+- 原子替换：校验通过后才调用 on_change(new, old)；回调抛出异常时拒绝该版本。
+  已在执行的任务继续使用开始时的配置
+
+后端未设置的字段保持代码中的默认值；调度器只导出文件中写明的字段，其余沿用 config.sh。
+
+使用方法：
+    python live_config.py check comet.config.json
+    python live_config.py export-sh comet.config.json     # 输出 bash 赋值语句（调度器 eval）
+    python live_config.py watch comet.config.json         # 打印每次生效的版本
+"""
+
+import argparse
+import copy
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import os
+import select
+import shlex
+import struct
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+SCHEMA_VERSION = 1
+CONFIG_FILE = Path("comet.config.json")
+POLL_INTERVAL = 1.0
+DEBOUNCE_SECONDS = 0.2
+PRIORITIES = ("high", "normal", "low")
+
+# inotify 事件（linux/inotify.h）
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class ConfigError(Exception):
+    """配置文件无法读取或未通过校验"""
+
+
+# ============================================================================
+# 类型检查
+# ============================================================================
+
+def _non_negative(value):
+    return None if value >= 0 else "不能为负数"
+
+
+def _positive(value):
+    return None if value > 0 else "必须大于 0"
+
+
+def _priority(value):
+    return None if value in PRIORITIES else f"必须是 {' / '.join(PRIORITIES)} 之一"
+
+
+def _check_tasks(tasks):
+    for i, task in enumerate(tasks):
+        if not isinstance(task, dict):
+            return f"[{i}] 必须是对象"
+        unknown = set(task) - {"endpoint", "instruction", "description"}
+        if unknown:
+            return f"[{i}] 未知字段 {', '.join(sorted(unknown))}"
+        for key in ("endpoint", "instruction"):
+            if not isinstance(task.get(key), str) or not task[key]:
+                return f"[{i}].{key} 必须是非空字符串"
+        if not task["endpoint"].startswith("/"):
+            return f"[{i}].endpoint 必须以 / 开头"
+        if "|" in "".join(str(v) for v in task.values()):
+            return f"[{i}] 不能包含 |（与 config.sh 的任务格式冲突）"
+    return None
+
+
+def _check_weights(weights):
+    for client, weight in weights.items():
+        if isinstance(weight, bool) or not isinstance(weight, (int, float)) or weight <= 0:
+            return f"{client}: 权重必须是正数"
+    return None
+
+
+def _check_rates(rates):
+    for endpoint, value in rates.items():
+        if (not isinstance(value, list) or len(value) != 2
+                or any(isinstance(v, bool) or not isinstance(v, (int, float)) or v <= 0 for v in value)):
+            return f"{endpoint}: 必须是 [每秒令牌数, 桶容量]（正数）"
+    return None
+
+
+def _check_handlers(handlers):
+    names = set()
+    for i, spec in enumerate(handlers):
+        if not isinstance(spec, dict) or not isinstance(spec.get("name"), str):
+            return f"[{i}] 必须是带 name 的对象（格式同 handlers.d/*.json）"
+        if spec["name"] in names:
+            return f"[{i}] 处理器 {spec['name']} 重复"
+        names.add(spec["name"])
+    return None
+
+
+# 字段: (类型, 默认值, 检查函数)；后端默认值 None 表示沿用代码中的设置
+SCHEMA = {
+    "scheduler": {
+        "tasks": (list, None, _check_tasks),
+        "task_priority": (str, None, _priority),
+        "task_deadline_seconds": (int, None, _positive),
+        "task_interval_seconds": (int, None, _non_negative),
+    },
+    "backend": {
+        "worker_count": (int, None, _positive),
+        "queue_max_size": (int, None, _positive),
+        "client_weights": (dict, None, _check_weights),
+        "rate_limits": (dict, None, _check_rates),
+        "handlers": (list, None, _check_handlers),
+    },
+}
+
+# 导出给 bash 的变量名（与 config.sh 一致）
+SHELL_NAMES = {
+    "tasks": "TASKS",
+    "task_priority": "TASK_PRIORITY",
+    "task_deadline_seconds": "TASK_DEADLINE_SECONDS",
+    "task_interval_seconds": "TASK_INTERVAL_SECONDS",
+}
+
+
+def validate(document) -> dict:
+    """
+    校验配置文档，返回补全默认值后的副本
+
+    Raises:
+        ConfigError: 列出所有问题
+    """
+    if not isinstance(document, dict):
+        raise ConfigError("配置必须是 JSON 对象")
+    errors = []
+    schema = document.get("schema")
+    if schema != SCHEMA_VERSION:
+        errors.append(f"schema: 必须为 {SCHEMA_VERSION}（当前 {schema!r}）")
+    label = document.get("version")
+    if label is not None and not isinstance(label, str):
+        errors.append("version: 必须是字符串")
+    unknown = set(document) - {"schema", "version", *SCHEMA}
+    if unknown:
+        errors.append(f"未知字段 {', '.join(sorted(unknown))}")
+
+    result = {"schema": schema, "version": label}
+    for section, fields in SCHEMA.items():
+        values = document.get(section, {})
+        if not isinstance(values, dict):
+            errors.append(f"{section}: 必须是对象")
+            values = {}
+        unknown = set(values) - set(fields)
+        if unknown:
+            errors.append(f"{section}: 未知字段 {', '.join(sorted(unknown))}")
+        result[section] = {}
+        for name, (kind, default, check) in fields.items():
+            value = values.get(name, default)
+            if value is not None:
+                if isinstance(value, bool) or not isinstance(value, kind):
+                    errors.append(f"{section}.{name}: 类型应为 {kind.__name__}")
+                    continue
+                problem = check(value)
+                if problem:
+                    errors.append(f"{section}.{name}: {problem}")
+                    continue
+            result[section][name] = copy.deepcopy(value)
+
+    if errors:
+        raise ConfigError("; ".join(errors))
+    return result
+
+
+def digest(document: dict) -> str:
+    canonical = json.dumps(document, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+class ConfigSnapshot:
+    """一个已校验的配置版本（只读，取值请用 section() / get()）"""
+
+    __slots__ = ("_data", "label", "digest", "revision", "source", "loaded_at")
+
+    def __init__(self, data: dict, revision: int = 0, source=None):
+        self._data = data
+        self.label = data.get("version")
+        self.digest = digest(data)
+        self.revision = revision
+        self.source = str(source) if source else None
+        self.loaded_at = datetime.now().isoformat()
+
+    @property
+    def version(self) -> str:
+        return f"{self.label}+{self.digest}" if self.label else self.digest
+
+    def section(self, name: str) -> dict:
+        """某一节中文件里写明的字段（副本）"""
+        return {k: copy.deepcopy(v) for k, v in self._data[name].items() if v is not None}
+
+    def get(self, section: str, name: str, default=None):
+        value = self._data[section].get(name)
+        return default if value is None else copy.deepcopy(value)
+
+    def describe(self) -> dict:
+        return {
+            "version": self.version,
+            "label": self.label,
+            "digest": self.digest,
+            "revision": self.revision,
+            "schema": self._data["schema"],
+            "source": self.source,
+            "loaded_at": self.loaded_at,
+        }
+
+    def to_dict(self) -> dict:
+        return copy.deepcopy(self._data)
+
+
+def load_config(path) -> ConfigSnapshot:
+    path = Path(path)
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            document = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"无法读取 {path}: {e}") from e
+    return ConfigSnapshot(validate(document), source=path)
+
+
+# ============================================================================
+# 热加载
+# ============================================================================
+
+class LiveConfig:
+    """
+    热加载的配置
+
+    Args:
+        path: 配置文件
+        on_change: 回调 on_change(new, old)，校验通过后调用；抛出异常时拒绝新版本
+    """
+
+    def __init__(self, path=CONFIG_FILE, on_change=None):
+        self.path = Path(path)
+        self.on_change = on_change
+        self.current = None
+        self.last_error = None
+        self.counters = {"applied": 0, "rejected": 0, "unchanged": 0}
+        self._lock = threading.Lock()
+        self._revision = 0
+        self._watcher = None
+
+    def reload(self, strict: bool = False) -> bool:
+        """
+        读取并应用配置文件
+
+        Returns:
+            是否生效了新版本（内容未变化时返回 False）
+
+        Raises:
+            ConfigError: strict=True 且文件无效时（启动时使用）
+        """
+        with self._lock:
+            try:
+                snapshot = load_config(self.path)
+                if self.current is not None and snapshot.digest == self.current.digest:
+                    self.counters["unchanged"] += 1
+                    return False
+                snapshot.revision = self._revision + 1
+                if self.on_change is not None:
+                    self.on_change(snapshot, self.current)
+            except Exception as e:
+                self.counters["rejected"] += 1
+                self.last_error = {"error": str(e), "at": datetime.now().isoformat()}
+                print(f"[{datetime.now()}] ⚠️ 配置 {self.path} 未生效，继续使用 "
+                      f"{self.current.version if self.current else '默认配置'}: {e}")
+                if strict and isinstance(e, ConfigError):
+                    raise
+                if strict:
+                    raise ConfigError(str(e)) from e
+                return False
+            self._revision = snapshot.revision
+            self.current = snapshot
+            self.last_error = None
+            self.counters["applied"] += 1
+            print(f"[{datetime.now()}] ✅ 配置已生效: {snapshot.version} (revision {snapshot.revision})")
+            return True
+
+    def watch(self, poll_interval: float = POLL_INTERVAL):
+        """启动后台线程，文件变化时自动 reload"""
+        if self._watcher is None:
+            self._watcher = FileWatcher(self.path, self.reload, poll_interval)
+            self._watcher.start()
+        return self._watcher
+
+    def stop(self):
+        if self._watcher is not None:
+            self._watcher.stop()
+            self._watcher = None
+
+    def stats(self) -> dict:
+        return {
+            "path": str(self.path),
+            "active": self.current.describe() if self.current else None,
+            "last_error": self.last_error,
+            "watcher": self._watcher.mode if self._watcher else None,
+            **self.counters,
+        }
+
+
+class FileWatcher:
+    """
+    监视单个文件，变化时调用 callback()
+
+    Linux 上用 inotify 监视所在目录（文件被改名替换也能收到），不可用时按 mtime / 大小轮询
+    """
+
+    def __init__(self, path, callback, poll_interval: float = POLL_INTERVAL):
+        self.path = Path(path).absolute()
+        self.callback = callback
+        self.poll_interval = poll_interval
+        self.mode = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._fd = None
+
+    def start(self):
+        self._fd = self._open_inotify()
+        self.mode = "inotify" if self._fd is not None else "poll"
+        self._thread = threading.Thread(target=self._loop, name="config-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _open_inotify(self):
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                return None
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+            if libc.inotify_add_watch(fd, os.fsencode(self.path.parent), mask) < 0:
+                os.close(fd)
+                return None
+            return fd
+        except (OSError, AttributeError):
+            return None
+
+    def _loop(self):
+        if self._fd is not None:
+            self._inotify_loop()
+        else:
+            self._poll_loop()
+
+    def _fire(self):
+        try:
+            self.callback()
+        except Exception as e:
+            print(f"[{datetime.now()}] 配置重新加载失败: {e}")
+
+    def _inotify_loop(self):
+        name = os.fsencode(self.path.name)
+        while not self._stop.is_set():
+            ready, _, _ = select.select([self._fd], [], [], self.poll_interval)
+            if not ready:
+                continue
+            if self._read_events(name):
+                # 合并短时间内的多次写入
+                time.sleep(DEBOUNCE_SECONDS)
+                self._read_events(name)
+                self._fire()
+
+    def _read_events(self, name: bytes) -> bool:
+        matched = False
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            _, _, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            if data[offset:offset + length].rstrip(b"\0") == name:
+                matched = True
+            offset += length
+        return matched
+
+    def _signature(self):
+        try:
+            st = self.path.stat()
+            return st.st_mtime_ns, st.st_size
+        except OSError:
+            return None
+
+    def _poll_loop(self):
+        last = self._signature()
+        while not self._stop.wait(self.poll_interval):
+            current = self._signature()
+            if current != last and current is not None:
+                last = current
+                self._fire()
+
+
+# ============================================================================
+# 调度器导出
+# ============================================================================
+
+def export_shell(snapshot: ConfigSnapshot) -> str:
+    """把 scheduler 节中写明的字段输出为 bash 赋值语句（变量名与 config.sh 一致）"""
+    lines = [f"CONFIG_VERSION={shlex.quote(snapshot.version)}"]
+    for name, value in snapshot.section("scheduler").items():
+        var = SHELL_NAMES[name]
+        if name == "tasks":
+            entries = [f"{t['endpoint']}|{t['instruction']}|{t.get('description', t['instruction'])}"
+                       for t in value]
+            lines.append(f"{var}=(" + " ".join(shlex.quote(e) for e in entries) + ")")
+        else:
+            lines.append(f"{var}={shlex.quote(str(value))}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="共享配置（调度器 / 后端）")
+    parser.add_argument("command", choices=["check", "export-sh", "watch"])
+    parser.add_argument("path", nargs="?", default=str(CONFIG_FILE))
+    args = parser.parse_args(argv)
+
+    if args.command == "watch":
+        live = LiveConfig(args.path)
+        live.reload()
+        watcher = live.watch()
+        print(f"👀 监视 {args.path}（{watcher.mode}），Ctrl+C 退出")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            live.stop()
+        return 0
+
+    try:
+        snapshot = load_config(args.path)
+    except ConfigError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        return 1
+
+    if args.command == "check":
+        print(json.dumps(snapshot.describe(), ensure_ascii=False))
+    else:
+        print(export_shell(snapshot))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
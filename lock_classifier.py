@@ -0,0 +1,307 @@
+# lock_classifier.py
+# 锁屏分类器 - 基于已知锁屏 / 桌面截图的指纹（感知哈希 + 颜色直方图）做最近邻判断
+"""
+参考指纹锁屏分类器
+
+test_1_screenshot 原来用亮度 < 30、颜色数 < 100 / 500 两个手调阈值判断锁屏，容易误判。
+本模块为已知的锁屏 / 桌面截图预先计算紧凑指纹，分类时在内存索引中查找最近邻：
+
+    dhash     - 64 位差值哈希（9x8 灰度缩略图相邻像素比较），对缩放 / 轻微变化不敏感
+    histogram - RGB 各 4 级量化后的 64 格颜色直方图（千分比）
+
+距离 = HASH_WEIGHT * 汉明距离 / 64 + (1 - HASH_WEIGHT) * 直方图总变差距离，取值 0 ~ 1。
+k 个最近邻按 1 / 距离 加权投票；最近邻距离超过 max_distance 时返回 unknown。
+
+指纹按区域（clock / password / monitor1 ...，与 capture_planner 的区域名一致）分别存储，
+只与同一区域的指纹比较，因此添加和分类时都必须指定区域；
+保存为 JSON 文件（默认 lock_signatures.json），每条约 200 字节。
+
+使用方法：
+    python lock_classifier.py add --label locked --region clock lockscreen_test_results/*_clock.png
+    python lock_classifier.py add --label desktop --region clock desktop_clock.png
+    python lock_classifier.py classify --region clock screenshot.png
+    python lock_classifier.py selftest          # 用合成图像验证（不需要 Windows）
+    python -m pytest -q test_lock_classifier.py
+"""
+
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+SIGNATURE_FILE = Path("lock_signatures.json")
+LABELS = ("locked", "desktop")
+
+HASH_SIZE = 8                  # dhash 为 HASH_SIZE x HASH_SIZE 位
+HIST_LEVELS = 4                # 每个颜色通道量化级数（4^3 = 64 格）
+HIST_SAMPLE_SIZE = (64, 36)    # 计算直方图前缩小到该尺寸
+HASH_WEIGHT = 0.5
+DEFAULT_K = 3
+DEFAULT_MAX_DISTANCE = 0.5
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+class Fingerprint:
+    """一张截图（或截图区域）的紧凑指纹"""
+
+    __slots__ = ("label", "region", "dhash", "histogram", "source")
+
+    def __init__(self, dhash: int, histogram, region: str, label=None, source=None):
+        self.dhash = dhash
+        self.histogram = tuple(histogram)
+        self.label = label
+        self.region = region
+        self.source = source
+
+    def distance(self, other: "Fingerprint") -> float:
+        hash_distance = hamming(self.dhash, other.dhash) / (HASH_SIZE * HASH_SIZE)
+        hist_distance = sum(abs(a - b) for a, b in zip(self.histogram, other.histogram)) / 2000
+        return HASH_WEIGHT * hash_distance + (1 - HASH_WEIGHT) * hist_distance
+
+    def to_dict(self) -> dict:
+        return {
+            "label": self.label,
+            "region": self.region,
+            "dhash": f"{self.dhash:016x}",
+            "histogram": list(self.histogram),
+            "source": self.source,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Fingerprint":
+        return cls(int(data["dhash"], 16), data["histogram"], data["region"], label=data.get("label"),
+                   source=data.get("source"))
+
+
+def dhash(img) -> int:
+    """64 位差值哈希：缩小到 9x8 灰度，比较每行相邻像素"""
+    from PIL import Image
+
+    gray = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR)
+    pixels = gray.tobytes()
+    value = 0
+    for row in range(HASH_SIZE):
+        for col in range(HASH_SIZE):
+            left = pixels[row * (HASH_SIZE + 1) + col]
+            right = pixels[row * (HASH_SIZE + 1) + col + 1]
+            value = (value << 1) | (left > right)
+    return value
+
+
+def region_names(monitors: int = 1) -> list:
+    """capture_planner 产生的区域名（关注区域 + 整个显示器），指纹的 region 应使用这些名称"""
+    from capture_planner import DEFAULT_ROIS
+
+    return [*DEFAULT_ROIS, *(f"monitor{i}" for i in range(1, monitors + 1))]
+
+
+def fingerprint_image(img, region: str, label=None, source=None) -> Fingerprint:
+    """计算 PIL 图像的指纹（region 为截图对应的 capture_planner 区域名）"""
+    from PIL import Image
+
+    # 颜色直方图: 缩小后按 RGB 各 HIST_LEVELS 级量化，千分比
+    small = img.convert("RGB").resize(HIST_SAMPLE_SIZE, Image.BILINEAR)
+    counts = [0] * (HIST_LEVELS ** 3)
+    shift = 8 - (HIST_LEVELS - 1).bit_length()
+    data = small.tobytes()
+    for i in range(0, len(data), 3):
+        counts[((data[i] >> shift) * HIST_LEVELS + (data[i + 1] >> shift)) * HIST_LEVELS + (data[i + 2] >> shift)] += 1
+    total = len(data) // 3
+    histogram = [round(c * 1000 / total) for c in counts]
+
+    return Fingerprint(dhash(img), histogram, region, label=label, source=source)
+
+
+class SignatureIndex:
+    """
+    内存中的指纹索引
+
+    按区域分组，分类时只与同一区域的指纹比较
+    """
+
+    def __init__(self, k: int = DEFAULT_K, max_distance: float = DEFAULT_MAX_DISTANCE):
+        self.k = k
+        self.max_distance = max_distance
+        self._by_region = {}
+
+    def __len__(self):
+        return sum(len(v) for v in self._by_region.values())
+
+    def add(self, fingerprint: Fingerprint):
+        if fingerprint.label not in LABELS:
+            raise ValueError(f"未知的标签: {fingerprint.label}（可选: {', '.join(LABELS)}）")
+        self._by_region.setdefault(fingerprint.region, []).append(fingerprint)
+
+    def regions(self):
+        return sorted(self._by_region)
+
+    def nearest(self, fingerprint: Fingerprint, k: int = None):
+        """返回 [(距离, 指纹)]，按距离升序"""
+        candidates = self._by_region.get(fingerprint.region, [])
+        scored = sorted(((fingerprint.distance(c), c) for c in candidates), key=lambda x: x[0])
+        return scored[:k or self.k]
+
+    def classify(self, fingerprint: Fingerprint) -> dict:
+        """
+        最近邻分类
+
+        Returns:
+            {"label": locked / desktop / unknown, "confidence", "distance", "neighbours"}
+        """
+        neighbours = self.nearest(fingerprint)
+        result = {
+            "region": fingerprint.region,
+            "label": "unknown",
+            "confidence": 0.0,
+            "distance": round(neighbours[0][0], 4) if neighbours else None,
+            "neighbours": [{"label": c.label, "distance": round(d, 4), "source": c.source} for d, c in neighbours],
+        }
+        if not neighbours or neighbours[0][0] > self.max_distance:
+            return result
+
+        votes = {}
+        for d, c in neighbours:
+            votes[c.label] = votes.get(c.label, 0.0) + 1.0 / (d + 1e-3)
+        label = max(votes, key=votes.get)
+        result.update(label=label, confidence=round(votes[label] / sum(votes.values()), 3))
+        return result
+
+    def save(self, path=SIGNATURE_FILE):
+        entries = [fp.to_dict() for region in self.regions() for fp in self._by_region[region]]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "signatures": entries}, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path=SIGNATURE_FILE, **kwargs) -> "SignatureIndex":
+        index = cls(**kwargs)
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        for entry in data.get("signatures", []):
+            index.add(Fingerprint.from_dict(entry))
+        return index
+
+
+# ============================================================================
+# 合成图像（Linux 上验证用）
+# ============================================================================
+
+def synthetic_frame(kind: str, size=(480, 270), seed=None):
+    """
+    生成合成截图
+
+    locked  - 深色渐变壁纸，左下角大号时钟，中间密码框
+    desktop - 浅色壁纸，底部任务栏，若干彩色窗口和文字行
+    """
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(seed)
+    w, h = size
+    img = Image.new("RGB", size)
+    draw = ImageDraw.Draw(img)
+
+    if kind == "locked":
+        base = [rng.randint(10, 70) for _ in range(3)]
+        for y in range(h):
+            shade = [max(0, min(255, c + (y * 40) // h)) for c in base]
+            draw.line([(0, y), (w, y)], fill=tuple(shade))
+        # 时钟数字（白色块）
+        x0, y0 = int(w * rng.uniform(0.04, 0.08)), int(h * rng.uniform(0.68, 0.74))
+        digit_w, digit_h = int(w * 0.05), int(h * 0.14)
+        for i in range(4):
+            x = x0 + i * (digit_w + 6) + (10 if i >= 2 else 0)
+            draw.rectangle([x, y0, x + digit_w, y0 + digit_h], outline=(240, 240, 240), width=3)
+        draw.rectangle([x0, y0 + digit_h + 8, x0 + int(w * 0.2), y0 + digit_h + 14], fill=(220, 220, 220))
+        # 密码框
+        bx, by = int(w * 0.4), int(h * rng.uniform(0.55, 0.6))
+        draw.rectangle([bx, by, bx + int(w * 0.2), by + int(h * 0.05)], fill=(60, 60, 60), outline=(200, 200, 200))
+    elif kind == "desktop":
+        wallpaper = tuple(rng.randint(120, 230) for _ in range(3))
+        draw.rectangle([0, 0, w, h], fill=wallpaper)
+        for _ in range(rng.randint(2, 4)):
+            x, y = rng.randint(0, w // 2), rng.randint(0, h // 2)
+            ww, wh = rng.randint(w // 4, w // 2), rng.randint(h // 4, h // 2)
+            draw.rectangle([x, y, x + ww, y + wh], fill=(250, 250, 250), outline=(90, 90, 90))
+            draw.rectangle([x, y, x + ww, y + 12], fill=tuple(rng.randint(0, 255) for _ in range(3)))
+            for line in range(y + 20, y + wh - 6, 8):
+                draw.line([(x + 6, line), (x + rng.randint(ww // 3, ww - 6), line)],
+                          fill=tuple(rng.randint(0, 120) for _ in range(3)))
+        draw.rectangle([0, h - 16, w, h], fill=(32, 32, 40))
+        for i in range(rng.randint(4, 8)):
+            draw.rectangle([40 + i * 20, h - 13, 52 + i * 20, h - 3], fill=tuple(rng.randint(60, 255) for _ in range(3)))
+    else:
+        raise ValueError(f"未知的合成类型: {kind}")
+    return img
+
+
+def selftest(train: int = 10, test: int = 40, seed: int = 0, region: str = "monitor1") -> dict:
+    """用合成图像（整屏，默认区域 monitor1）建立索引并评估准确率"""
+    index = SignatureIndex()
+    for i in range(train):
+        for kind in LABELS:
+            index.add(fingerprint_image(synthetic_frame(kind, seed=seed + i), region, label=kind,
+                                        source=f"synthetic-{kind}-{i}"))
+
+    correct = unknown = 0
+    for i in range(test):
+        for kind in LABELS:
+            verdict = index.classify(fingerprint_image(synthetic_frame(kind, seed=seed + 10000 + i), region))
+            if verdict["label"] == kind:
+                correct += 1
+            elif verdict["label"] == "unknown":
+                unknown += 1
+    total = test * len(LABELS)
+    return {"train": train * len(LABELS), "test": total, "accuracy": round(correct / total, 4), "unknown": unknown}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="参考指纹锁屏分类器")
+    parser.add_argument("--index", default=str(SIGNATURE_FILE), help="指纹文件")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    region_help = f"区域名（与 capture_planner 一致: {' / '.join(region_names())} ...）"
+
+    add = sub.add_parser("add", help="把截图加入指纹库")
+    add.add_argument("--label", required=True, choices=LABELS)
+    add.add_argument("--region", required=True, help=region_help)
+    add.add_argument("images", nargs="+")
+
+    classify = sub.add_parser("classify", help="判断截图是否为锁屏")
+    classify.add_argument("--region", required=True, help=region_help)
+    classify.add_argument("images", nargs="+")
+
+    sub.add_parser("selftest", help="用合成图像验证分类器")
+    args = parser.parse_args(argv)
+
+    if args.command == "selftest":
+        print(json.dumps(selftest(), ensure_ascii=False))
+        return 0
+
+    from PIL import Image
+
+    path = Path(args.index)
+    if args.command == "add":
+        index = SignatureIndex.load(path) if path.exists() else SignatureIndex()
+        for image_path in args.images:
+            with Image.open(image_path) as img:
+                index.add(fingerprint_image(img, args.region, label=args.label, source=image_path))
+        index.save(path)
+        print(f"✅ 已添加 {len(args.images)} 个指纹，共 {len(index)} 个")
+        return 0
+
+    if not path.exists():
+        print(f"❌ 指纹文件不存在: {path}（先用 add 添加参考截图）", file=sys.stderr)
+        return 2
+    index = SignatureIndex.load(path)
+    for image_path in args.images:
+        with Image.open(image_path) as img:
+            verdict = index.classify(fingerprint_image(img, args.region))
+        print(json.dumps({"image": image_path, **verdict}, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,291 @@
 # minimal_backend.py
 # 最小化测试后端 - 在 Windows PC 上运行
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
 from datetime import datetime
+import atexit
+import codecs
+import contextvars
+import json
+import os
+import secrets
 import socket
+import threading
+import time
+
+from admission import AdmissionController
+from context_pool import BrowserWindowContext, ContextPool, DummyContext
+from handlers import Handler, create_registry
+from live_config import CONFIG_FILE, LiveConfig
+from result_spool import ResultSpool
+from task_cache import RecentTaskCache
+from task_queue import JobQueue, QueueFullError, parse_priority, parse_deadline
+from tracing import FileSpanCollector, new_trace_id, parse_traceparent, validate_span
 
 app = Flask(__name__)
 
-# 记录请求计数
+# 准入控制：API Key 校验 + 限流 + 并发上限
+# COMET_API_KEYS 为逗号分隔的 key 列表，未设置时不校验（本地测试）
+API_KEYS = [k.strip() for k in os.environ.get('COMET_API_KEYS', os.environ.get('COMET_API_KEY', '')).split(',') if k.strip()]
+ENDPOINT_RATE_LIMITS = {
+    'execute_task': (5.0, 20),             # (每秒令牌数, 桶容量)
+    'get_status': (20.0, 50),
+    'stream_status': (5.0, 10),
+}
+MAX_INFLIGHT_REQUESTS = 32
+
+admission = AdmissionController(
+    api_keys=API_KEYS,
+    endpoint_rates=ENDPOINT_RATE_LIMITS,
+    max_inflight=MAX_INFLIGHT_REQUESTS,
+)
+admission.init_app(app)
+
+# 记录请求计数（任务 id 由此分配，多线程服务器下加锁）
+# 任务 id 带每次启动随机生成的前缀：计数器重启后从 1 开始，而上次运行的任务在退出时写入了
+# tasks.ndjson，不加前缀时新任务会和旧记录、旧结果文件同名
 request_count = 0
+request_count_lock = threading.Lock()
+RUN_ID = secrets.token_hex(3)
+
+# 任务结果：大结果落盘，/status 只返回预览
+result_spool = ResultSpool()
+
+# 最近任务：固定容量的环形缓存（见 task_cache.py），内存占用不随运行时间增长
+# 被淘汰的任务写入 task_results/tasks.ndjson，结果只保留磁盘位置，/status 仍可查询
+TASK_CACHE_CAPACITY = 10000
+task_cache = RecentTaskCache(TASK_CACHE_CAPACITY, os.path.join('task_results', 'tasks.ndjson'),
+                             on_evict=result_spool.forget)
+atexit.register(task_cache.close)
+STATUS_RESULT_LIMIT = 4 * 1024           # /status 中 result 字段最多返回 4KB
+STREAM_CHUNK_SIZE = 8 * 1024
+STREAM_WAIT_SECONDS = 300                # /status/<id>/stream 等待任务完成的最长时间
+STREAM_POLL_INTERVAL = 0.5
+
+
+# 任务队列：优先级 + 按 X-API-Key 加权公平 + 截止时间
+QUEUE_MAX_SIZE = 100
+WORKER_COUNT = 1                         # Comet 只有一个浏览器会话，默认串行执行
+CLIENT_WEIGHTS = {}                      # {api_key: weight}，未配置的客户端权重为 1
+workers = []
+workers_lock = threading.Lock()
+
+
+# 链路追踪：span 写入 traces/spans-YYYY-MM-DD.ndjson
+TRACING_ENABLED = True
+tracer = FileSpanCollector('traces')
+
+
+def trace_span(task, name, start, end=None, attributes=None, parent_span_id=None):
+    """为任务记录一个 span（任务没有 trace 上下文或追踪关闭时跳过）"""
+    trace = task.trace if task else None
+    if not TRACING_ENABLED or trace is None:
+        return
+    tracer.record(name, trace['trace_id'], start, end,
+                  parent_span_id=parent_span_id or trace['parent_span_id'],
+                  attributes=attributes)
+
+
+# 任务处理器：/execute/<family> 按端点族和指令前缀选择处理器（见 handlers.py）
+# handlers.d/ 中的 *.json / *.py 插件在启动时加载，新增签到类型不需要修改后端
+HANDLER_DIR = 'handlers.d'
+HANDLER_TIMEOUT = 600.0                  # 内置处理器的执行超时（秒）
+handler_registry = create_registry(HANDLER_DIR, timeout=HANDLER_TIMEOUT)
+
+
+def finish_task(task_id, result, status='done'):
+    """记录任务结果并标记完成"""
+    location = result_spool.put(task_id, result)
+    task_cache.update(task_id, state=status, finished_at=time.time(), result=location)
+    if task_id not in task_cache:
+        result_spool.forget(task_id)          # 任务已被淘汰，结果按位置从磁盘读取
+
+
+def on_job_dropped(job, reason):
+    """任务被抢占或过期"""
+    print(f"[{datetime.now()}] Task {job.task_id} {reason} (priority={job.priority})")
+    if emulator is not None:
+        emulator.cancel(job.task_id)
+    task = task_cache.get(job.task_id)
+    trace_span(task, 'queue.wait', task.created_at if task else time.time(),
+               attributes={'task_id': job.task_id, 'priority': job.priority, 'dropped': reason})
+    finish_task(job.task_id, f'Task {reason} before execution', status=reason)
+
+
+job_queue = JobQueue(max_size=QUEUE_MAX_SIZE, client_weights=CLIENT_WEIGHTS, on_drop=on_job_dropped)
+
+
+# 模拟器模式（--emulator）：按配置模拟执行耗时、失败率和 WoL 启动过程
+emulator = None
+# worker 正在执行的任务 id（处理器超时线程通过 contextvars 继承），模拟器据此取到达时刻
+current_task_id = contextvars.ContextVar('current_task_id', default=None)
+
+
+def enable_emulator(profile_path=None, seed=None, clock_file=None):
+    """
+    开启模拟器模式，worker 数量使用模拟器的并发上限
+
+    clock_file 为调度脚本 SCHED_CLOCK=virtual 模式的时钟文件时，启动过程和执行耗时按该虚拟时间计算
+    """
+    global emulator, WORKER_COUNT
+    # 只有模拟器模式需要，延迟导入以缩短正常启动时间
+    from emulator import Emulator, load_profile
+    from sim_clock import FileClock
+    clock = None
+    if clock_file:
+        clock = FileClock(clock_file)
+        # 虚拟时间下一天的请求在几秒真实时间内到达，按真实时间计算的限流没有意义
+        admission.enabled = False
+    emulator = Emulator(load_profile(profile_path), seed=seed, clock=clock)
+    WORKER_COUNT = emulator.concurrency
+    return emulator
+
+
+def run_instruction(instruction):
+    """执行指令（测试后端：直接返回成功；模拟器模式下按配置耗时 / 失败）"""
+    if emulator is not None:
+        return emulator.execute(instruction, key=current_task_id.get())
+    return f'Test task completed successfully: {instruction}'
+
+
+# 执行上下文池：预热浏览器会话，连续任务复用，按使用次数 / 连续错误回收
+# dummy 用于 Linux 测试；browser 绑定已打开的 Comet / Chrome / Edge 窗口（需要 pywin32）
+CONTEXT_KIND = 'dummy'
+CONTEXT_MAX_USES = 20
+CONTEXT_MAX_ERRORS = 2
+CONTEXT_LEASE_TIMEOUT = 60.0
+context_pool = None
+context_pool_lock = threading.Lock()
+
+
+def create_context(context_id):
+    if CONTEXT_KIND == 'browser':
+        return BrowserWindowContext(context_id, runner=run_instruction)
+    # 模拟器模式下按配置模拟会话冷启动耗时
+    warmup = emulator.context_warmup if emulator is not None else 0.0
+    return DummyContext(context_id, warmup=warmup, runner=run_instruction)
+
+
+def get_context_pool():
+    """首次使用时创建并预热上下文池（大小与 worker 数量一致）"""
+    global context_pool
+    with context_pool_lock:
+        if context_pool is None:
+            context_pool = ContextPool(create_context, size=WORKER_COUNT, max_uses=CONTEXT_MAX_USES,
+                                       max_errors=CONTEXT_MAX_ERRORS, lease_timeout=CONTEXT_LEASE_TIMEOUT)
+            context_pool.start()
+        return context_pool
+
+
+WORKER_IDLE_CHECK = 1.0                  # 空闲 worker 检查是否需要退出的间隔（worker_count 调小后）
+
+
+def worker_loop(index):
+    """从队列中取任务执行（序号不小于 WORKER_COUNT 时退出）"""
+    while True:
+        if index >= WORKER_COUNT:
+            with workers_lock:
+                workers.remove(threading.current_thread())
+            print(f"[{datetime.now()}] Worker {index + 1} retired (worker_count={WORKER_COUNT})")
+            return
+        job = job_queue.get(timeout=WORKER_IDLE_CHECK)
+        if job is None:
+            continue
+        current_task_id.set(job.task_id)
+        started = time.time()
+        task = task_cache.update(job.task_id, state='running', started_at=started)
+        trace_span(task, 'queue.wait', task.created_at if task else started, started,
+                   attributes={'task_id': job.task_id, 'priority': job.priority})
+        
+        # 排队期间配置变化导致处理器被移除时，按指令前缀重新选择
+        handler = (handler_registry.get(task.handler if task else None) or handler_registry.match_prefix(job.payload)
+                   or handler_registry.get('ai'))
+        status = 'done'
+        try:
+            # 先占用处理器的并发名额，再租用执行上下文（名额由 handler.run 释放）
+            if not handler.acquire_slot(timeout=CONTEXT_LEASE_TIMEOUT):
+                raise TimeoutError(f"处理器 {handler.name} 并发已满（{handler.concurrency}）")
+            running = False
+            try:
+                with get_context_pool().lease() as ctx:
+                    trace_span(task, 'context.lease', started,
+                               attributes={'task_id': job.task_id, 'context': ctx.context_id, 'uses': ctx.uses})
+                    running = True
+                    result = handler.run(ctx, job.payload)
+            except Exception:
+                if not running:
+                    handler.release_slot()
+                raise
+            finish_task(job.task_id, result)
+        except Exception as e:
+            status = 'failed'
+            print(f"[{datetime.now()}] Task {job.task_id} failed: {e}")
+            finish_task(job.task_id, str(e), status='failed')
+        if emulator is not None:
+            emulator.cancel(job.task_id)       # 未执行到模拟器就失败时，到达记录不再使用
+        job_queue.record_service(time.time() - started)
+        trace_span(task, 'task.execute', started,
+                   attributes={'task_id': job.task_id, 'instruction': job.payload, 'handler': handler.name,
+                               'status': status})
+
+
+# 共享配置（comet.config.json，见 live_config.py）：文件变化时热加载，在线修改队列 / 限流 / worker / 处理器
+live_config = None
+config_apply_lock = threading.Lock()
+base_settings = {}                       # 配置文件中未设置的字段使用启动时的值
+
+
+def apply_config(config, previous=None):
+    """
+    应用一个已校验的配置版本
+
+    先构建新的处理器注册表（失败则整个版本被拒绝），再一次性替换；
+    正在执行的任务继续使用开始时的处理器和上下文
+    """
+    global WORKER_COUNT, handler_registry
+    backend = config.section('backend')
+    settings = {**base_settings, **backend}
+    
+    registry = create_registry(HANDLER_DIR, timeout=HANDLER_TIMEOUT)
+    for spec in settings.get('handlers', []):
+        registry.register(Handler.from_dict(spec), source='config', replace=True)
+    
+    with config_apply_lock:
+        job_queue.configure(max_size=settings['queue_max_size'], client_weights=settings['client_weights'])
+        admission.endpoint_limiter.configure({**ENDPOINT_RATE_LIMITS, **settings.get('rate_limits', {})})
+        handler_registry = registry
+        WORKER_COUNT = settings['worker_count']
+    
+    if context_pool is not None:
+        context_pool.resize(WORKER_COUNT)
+    with workers_lock:
+        started = bool(workers)
+    if started:
+        ensure_workers()
+
+
+def ensure_workers():
+    """首次提交任务时启动 worker 线程"""
+    with workers_lock:
+        while len(workers) < WORKER_COUNT:
+            t = threading.Thread(target=worker_loop, args=(len(workers),), name=f'worker-{len(workers) + 1}',
+                                 daemon=True)
+            t.start()
+            workers.append(t)
+
+@app.before_request
+def emulator_power_gate():
+    """模拟器模式下，未启动完成时除 /emulator/* 外一律返回 503"""
+    if emulator is None or (request.endpoint or '').startswith('emulator_'):
+        return None
+    state = emulator.state()
+    if state != 'ready':
+        return jsonify({
+            'status': state,
+            'message': 'Emulated machine is not ready',
+            'boot_remaining_s': round(emulator.boot_remaining(), 3),
+        }), 503
+    return None
 
 @app.route('/health', methods=['GET'])
 def health():
@@ -20,48 +297,339 @@ def health():
         'hostname': socket.gethostname()
     })
 
-@app.route('/execute/ai', methods=['POST'])
-def execute_ai():
-    """模拟 AI 执行端点 - 和你的 Comet TaskRunner 接口一致"""
+@app.route('/health/live', methods=['GET'])
+def health_live():
+    """存活检查 - 不做任何额外工作，进程能处理请求即返回 200"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/execute/<family>', methods=['POST'])
+def execute_task(family):
+    """任务执行端点 - /execute/ai 与 Comet TaskRunner 接口一致，其他端点族由处理器注册表提供"""
     global request_count
-    request_count += 1
     
-    data = request.get_json() or {}
-    instruction = data.get('instruction', '')
+    data = request.get_json(silent=True) or {}
+    handler, instruction = handler_registry.resolve(family, data)
+    if handler is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown endpoint: /execute/{family}',
+            'endpoints': [f'/execute/{f}' for f in handler_registry.endpoints],
+        }), 404
+    
+    try:
+        priority = parse_priority(data.get('priority'))
+        deadline = parse_deadline(data.get('deadline'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    # 参数校验通过后再分配任务 id，被拒绝的请求不占用 id
+    with request_count_lock:
+        request_count += 1
+        request_number = request_count
+    
+    client = request.headers.get('X-API-Key') or request.remote_addr or 'anonymous'
+    
+    # 调度器通过 traceparent 传入 trace_id 和任务 span；没有时新建一个 trace
+    received_at = time.time()
+    trace_id, parent_span_id = parse_traceparent(request.headers.get('traceparent')) or (new_trace_id(), None)
+    
+    print(f"[{datetime.now()}] Received instruction: {instruction} (handler={handler.name}, priority={priority})")
     
-    print(f"[{datetime.now()}] Received instruction: {instruction}")
+    task_id = f'test-{RUN_ID}-{request_number}'
+    task_cache.add(task_id, instruction, priority=priority, handler=handler.name,
+                   trace_id=trace_id, parent_span_id=parent_span_id, created_at=received_at)
+    
+    ensure_workers()
+    if emulator is not None:
+        emulator.arrive(task_id)               # 共享虚拟时钟下按到达时刻计算执行时间
+    try:
+        job_queue.submit(task_id, instruction, client=client, priority=priority, deadline=deadline)
+    except QueueFullError as e:
+        task_cache.remove(task_id)
+        if emulator is not None:
+            emulator.cancel(task_id)
+        response = jsonify({'success': False, 'error': str(e), 'priority': priority})
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response, 503
+    
+    trace_span(task_cache.get(task_id), 'backend.submit', received_at,
+               attributes={'task_id': task_id, 'instruction': instruction, 'client_span': parent_span_id})
     
     return jsonify({
         'success': True,
-        'task_id': f'test-{request_count}',
+        'task_id': task_id,
+        'trace_id': trace_id,
         'instruction_received': instruction,
-        'message': f'Task queued successfully! This is request #{request_count}',
+        'handler': handler.name,
+        'priority': priority,
+        'message': f'Task queued successfully! This is request #{request_number}',
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/queue/stats', methods=['GET'])
+def queue_stats():
+    """队列状态：各优先级类别的排队数量和等待时间"""
+    return jsonify(job_queue.stats())
+
+@app.route('/config', methods=['GET'])
+def config_info():
+    """当前生效的共享配置版本（未使用配置文件时 active 为 null）"""
+    if live_config is None:
+        return jsonify({'active': None, 'path': None})
+    info = live_config.stats()
+    if live_config.current is not None:
+        info['config'] = live_config.current.to_dict()
+    return jsonify(info)
+
+@app.route('/handlers', methods=['GET'])
+def handler_stats():
+    """已注册的处理器（端点族、前缀、并发 / 超时及执行计数）"""
+    return jsonify(handler_registry.stats())
+
+@app.route('/context/stats', methods=['GET'])
+def context_stats():
+    """执行上下文池：空闲 / 租用中 / 回收次数和租用等待时间"""
+    return jsonify(get_context_pool().stats())
+
+@app.route('/admission/stats', methods=['GET'])
+def admission_stats():
+    """准入控制统计：放行 / 拒绝次数和并发请求数"""
+    return jsonify(admission.stats())
+
+@app.route('/tasks/stats', methods=['GET'])
+def task_cache_stats():
+    """最近任务缓存：容量 / 当前数量 / 淘汰和 spill 查询次数"""
+    return jsonify(task_cache.stats())
+
+@app.route('/traces', methods=['POST'])
+def ingest_spans():
+    """
+    接收调度器上传的 span（NDJSON 或 JSON 数组），写入本地 span 文件
+    
+    用于把 Pi 端的 wake / readiness 等阶段和后端 span 放在同一个 trace 中
+    """
+    raw = request.get_data(as_text=True) or ''
+    try:
+        if raw.lstrip().startswith('['):
+            spans = json.loads(raw)
+        else:
+            spans = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    except ValueError as e:
+        return jsonify({'success': False, 'error': f'Invalid span payload: {e}'}), 400
+    
+    valid = [span for span in spans if validate_span(span)]
+    for span in valid:
+        span.setdefault('service', 'scheduler')
+        span.setdefault('attributes', {})
+        span['duration_ms'] = round((span['end_time'] - span['start_time']) * 1000, 3)
+    if valid:
+        tracer.export(valid)
+    
+    return jsonify({'success': True, 'accepted': len(valid), 'rejected': len(spans) - len(valid)})
+
+@app.route('/traces/<trace_id>', methods=['GET'])
+def get_trace(trace_id):
+    """查看一个 trace：所有 span 按时间排序，并按 span 名称汇总耗时"""
+    spans = tracer.load_trace(trace_id.lower())
+    if not spans:
+        return jsonify({'trace_id': trace_id, 'error': 'Trace not found'}), 404
+    
+    breakdown = {}
+    for span in spans:
+        breakdown[span['name']] = round(breakdown.get(span['name'], 0) + span['duration_ms'], 3)
+    
+    start = min(span['start_time'] for span in spans)
+    end = max(span['end_time'] for span in spans)
+    return jsonify({
+        'trace_id': trace_id,
+        'span_count': len(spans),
+        'duration_ms': round((end - start) * 1000, 3),
+        'breakdown_ms': breakdown,
+        'spans': spans,
+    })
+
+@app.route('/emulator', methods=['GET'])
+def emulator_info():
+    """模拟器状态和配置"""
+    if emulator is None:
+        return jsonify({'error': 'Emulator mode is disabled'}), 404
+    return jsonify(emulator.describe())
+
+@app.route('/emulator/wake', methods=['POST'])
+def emulator_wake():
+    """模拟收到 WoL 魔术包"""
+    if emulator is None:
+        return jsonify({'error': 'Emulator mode is disabled'}), 404
+    return jsonify({'state': emulator.wake(), 'boot_remaining_s': round(emulator.boot_remaining(), 3)})
+
+@app.route('/emulator/sleep', methods=['POST'])
+def emulator_sleep():
+    """模拟关机 / 睡眠"""
+    if emulator is None:
+        return jsonify({'error': 'Emulator mode is disabled'}), 404
+    emulator.sleep()
+    return jsonify({'state': emulator.state()})
+
 @app.route('/status/<task_id>', methods=['GET'])
 def get_status(task_id):
-    """任务状态查询"""
-    return jsonify({
+    """任务状态查询（result 超过 STATUS_RESULT_LIMIT 时截断，完整结果见 /stream）"""
+    polled_at = time.time()
+    task = task_cache.get(task_id)
+    if task is None:
+        return jsonify({'task_id': task_id, 'error': 'Task not found'}), 404
+    
+    # 轮询请求带 traceparent 时挂在调用方 span 下，否则挂在任务 span 下
+    caller = parse_traceparent(request.headers.get('traceparent'))
+    trace_span(task, 'status.poll', polled_at,
+               attributes={'task_id': task_id, 'status': task.state},
+               parent_span_id=caller[1] if caller else None)
+    
+    response = {
         'task_id': task_id,
-        'status': 'done',
-        'result': 'Test task completed successfully',
+        'status': task.state,
         'timestamp': datetime.now().isoformat()
-    })
+    }
+    
+    result, truncated = result_spool.preview(task_id, STATUS_RESULT_LIMIT, location=task.result)
+    if result is not None:
+        info = result_spool.info(task_id, location=task.result)
+        response['result'] = result
+        response['result_size'] = info['size']
+        response['result_truncated'] = truncated
+        if truncated:
+            response['stream_url'] = f'/status/{task_id}/stream'
+    
+    return jsonify(response)
 
-if __name__ == '__main__':
+@app.route('/status/<task_id>/stream', methods=['GET'])
+def stream_status(task_id):
+    """
+    以 NDJSON 流式返回任务结果
+    
+    每行一个 JSON 对象:
+        {"type": "meta", ...}       任务信息
+        {"type": "chunk", "data"}   结果分块
+        {"type": "end", ...}        结束（status / truncated）
+    
+    任务未完成时最多等待 ?wait= 秒（默认 STREAM_WAIT_SECONDS）
+    """
+    if task_cache.get(task_id) is None:
+        return jsonify({'task_id': task_id, 'error': 'Task not found'}), 404
+    
+    wait = min(request.args.get('wait', STREAM_WAIT_SECONDS, type=float), STREAM_WAIT_SECONDS)
+    
+    def line(obj):
+        return json.dumps(obj, ensure_ascii=False) + '\n'
+    
+    def generate():
+        deadline = time.monotonic() + wait
+        task = task_cache.get(task_id)
+        while task.result is None and time.monotonic() < deadline:
+            time.sleep(STREAM_POLL_INTERVAL)
+            task = task_cache.get(task_id) or task
+        
+        status = task.state
+        info = result_spool.info(task_id, location=task.result)
+        yield line({'type': 'meta', 'task_id': task_id, 'status': status,
+                    'result_size': info['size'] if info else 0})
+        
+        if info is None:
+            yield line({'type': 'end', 'status': status, 'timeout': True})
+            return
+        
+        # 增量解码，避免多字节字符被分块截断
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        for chunk in result_spool.iter_chunks(task_id, STREAM_CHUNK_SIZE, location=task.result):
+            text = decoder.decode(chunk)
+            if text:
+                yield line({'type': 'chunk', 'data': text})
+        tail = decoder.decode(b'', final=True)
+        if tail:
+            yield line({'type': 'chunk', 'data': tail})
+        
+        yield line({'type': 'end', 'status': status, 'truncated': info['truncated']})
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def build_arg_parser():
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Minimal Test Backend')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--emulator', action='store_true', help='模拟器模式（执行耗时 / 失败 / 启动过程）')
+    parser.add_argument('--emulator-config', help='模拟器配置文件 (JSON)，隐含 --emulator')
+    parser.add_argument('--seed', type=int, help='模拟器随机种子')
+    parser.add_argument('--virtual-clock', metavar='FILE',
+                        help='模拟器使用调度脚本的虚拟时钟文件（SCHED_CLOCK_FILE），隐含 --emulator')
+    parser.add_argument('--context', choices=['dummy', 'browser'], default=CONTEXT_KIND,
+                        help='执行上下文类型（browser 需要 Windows + pywin32）')
+    parser.add_argument('--config', help=f'共享配置文件（默认 {CONFIG_FILE}，存在时加载并热更新）')
+    return parser
+
+def configure(args):
+    """按命令行参数完成启动前的配置并打印启动信息（fast_start.py 复用）"""
+    global CONTEXT_KIND, live_config
+    virtual_clock = getattr(args, 'virtual_clock', None)
+    if args.emulator or args.emulator_config or virtual_clock:
+        enable_emulator(args.emulator_config, seed=args.seed, clock_file=virtual_clock)
+    CONTEXT_KIND = args.context
+    
+    # 共享配置：启动时无效直接报错，运行中无效则保留上一个版本
+    config_path = getattr(args, 'config', None) or CONFIG_FILE
+    if getattr(args, 'config', None) or os.path.exists(config_path):
+        base_settings.update(worker_count=WORKER_COUNT, queue_max_size=QUEUE_MAX_SIZE,
+                             client_weights=CLIENT_WEIGHTS)
+        live_config = LiveConfig(config_path, on_change=apply_config)
+        live_config.reload(strict=True)
+        live_config.watch()
+    # 启动时即开始预热执行上下文，第一个任务不必等待冷启动
+    pool = get_context_pool()
+    
     print("=" * 50)
-    print("Minimal Test Backend")
+    print("Minimal Test Backend" + (" [Emulator]" if emulator else ""))
     print("=" * 50)
     print(f"Hostname: {socket.gethostname()}")
-    print(f"Starting server on 0.0.0.0:5000")
+    print(f"Starting server on {args.host}:{args.port}")
+    print(f"API key check: {'enabled' if API_KEYS else 'disabled (set COMET_API_KEYS)'}")
+    print(f"Execution contexts: {pool.size} x {CONTEXT_KIND} (max {CONTEXT_MAX_USES} uses each)")
+    plugins = sorted({src for src in handler_registry.sources.values() if src != 'builtin'})
+    print(f"Task handlers: {len(handler_registry.sources)} (plugins: {', '.join(plugins) or 'none'})")
+    if live_config is not None:
+        print(f"Config: {live_config.path} version {live_config.current.version} "
+              f"(hot reload: {live_config.stats()['watcher']})")
+    if emulator:
+        wol_port = emulator.start_wol_listener()
+        print(f"Emulator: state={emulator.state()}, concurrency={emulator.concurrency}, "
+              f"time_scale={emulator.time_scale}, clock={type(emulator.clock).__name__}, WoL port={wol_port}")
     print("")
     print("Endpoints:")
     print("  GET  /health      - Health check")
-    print("  POST /execute/ai  - Execute AI task")
+    print("  GET  /health/live - Liveness check")
+    print(f"  POST /execute/<family> - Execute task ({', '.join(handler_registry.endpoints)})")
+    print("  GET  /handlers    - Registered task handlers")
+    print("  GET  /config      - Active shared config version")
     print("  GET  /status/<id> - Get task status")
+    print("  GET  /queue/stats - Queue wait time per priority class")
+    print("  GET  /admission/stats - Rate limit / overload counters")
+    print("  GET  /context/stats - Execution context pool (warm / leased / recycled)")
+    print("  GET  /tasks/stats - Recent-task cache (capacity / evicted / spill lookups)")
+    print("  GET  /status/<id>/stream - Stream task result (NDJSON)")
+    print("  POST /traces      - Upload scheduler spans")
+    print("  GET  /traces/<id> - View a trace")
+    if emulator:
+        print("  GET  /emulator    - Emulator state")
+        print("  POST /emulator/wake | /emulator/sleep - Simulate WoL / power off")
     print("")
     print("Waiting for requests from Raspberry Pi...")
     print("=" * 50)
+
+if __name__ == '__main__':
+    args = build_arg_parser().parse_args()
     
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    # 模拟器模式下关闭 reloader，避免 WoL 监听端口被绑定两次
+    use_reloader = not (args.emulator or args.emulator_config or args.virtual_clock)
+    # reloader 开启时父进程只负责监视文件和重启，配置（预热上下文池、配置文件监视）只在服务进程中执行
+    if not use_reloader or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        configure(args)
+    app.run(host=args.host, port=args.port, debug=True, use_reloader=use_reloader)
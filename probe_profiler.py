@@ -0,0 +1,192 @@
+# probe_profiler.py
+# 探测计时 - 为 test_lockscreen.py / test_auto_unlock.py 的探测函数记录耗时，可选 cProfile / tracemalloc
+"""
+探测计时与剖析
+
+每次调用被 @profiled 装饰（或包在 profile_probe() 中）的探测函数都会记录一条：
+
+    {"probe": "screenshot", "ts": "...", "duration_ms": 412.3, "cpu_ms": 398.0, "error": null,
+     "cprofile": [...], "tracemalloc": {...}}
+
+- duration_ms / cpu_ms 总是记录（perf_counter / process_time，开销可以忽略）
+- cprofile     开启后记录累计耗时最多的函数（top N）
+- tracemalloc  开启后记录本次调用的内存峰值、净分配和分配最多的代码行（明显变慢）
+- 探测函数返回 dict 时，duration_ms 同时写入返回值，随测试结果一起保存
+
+最近的记录保存在内存中（RECENT_RECORDS 条），设置了输出文件时追加为 NDJSON。
+
+环境变量（脚本直接运行时使用）：
+    PROBE_PROFILE=cprofile,tracemalloc       开启剖析
+    PROBE_PROFILE_OUTPUT=probe_profile.ndjson 追加记录到文件
+
+使用方法：
+    from probe_profiler import profiled, profile_probe
+
+    @profiled("screenshot")
+    def test_1_screenshot(): ...
+
+    with profile_probe("unlock") as record:
+        ...
+    print(record["duration_ms"])
+"""
+
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+RECENT_RECORDS = 1000
+DEFAULT_TOP = 15
+
+_settings = {
+    "cprofile": False,
+    "tracemalloc": False,
+    "top": DEFAULT_TOP,
+    "output": None,
+}
+_records = deque(maxlen=RECENT_RECORDS)
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def configure(cprofile=None, tracemalloc=None, top=None, output=None):
+    """修改剖析设置（None 表示保持不变），返回当前设置"""
+    for key, value in (("cprofile", cprofile), ("tracemalloc", tracemalloc), ("top", top), ("output", output)):
+        if value is not None:
+            _settings[key] = value
+    return dict(_settings)
+
+
+def configure_from_env():
+    """读取 PROBE_PROFILE / PROBE_PROFILE_OUTPUT"""
+    modes = {m.strip().lower() for m in os.environ.get("PROBE_PROFILE", "").split(",") if m.strip()}
+    return configure(cprofile="cprofile" in modes, tracemalloc="tracemalloc" in modes,
+                     output=os.environ.get("PROBE_PROFILE_OUTPUT") or None)
+
+
+def records(probe=None) -> list:
+    """最近的记录（可按探测名过滤）"""
+    with _lock:
+        return [r for r in _records if probe is None or r["probe"] == probe]
+
+
+def last(probe=None):
+    """最近一条记录"""
+    found = records(probe)
+    return found[-1] if found else None
+
+
+def clear():
+    with _lock:
+        _records.clear()
+
+
+def _cprofile_top(profiler, top: int) -> list:
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    rows = []
+    for (filename, line, function), (cc, nc, tottime, cumtime, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.basename(filename)}:{line}({function})",
+            "calls": nc,
+            "tottime_ms": round(tottime * 1000, 3),
+            "cumtime_ms": round(cumtime * 1000, 3),
+        })
+    rows.sort(key=lambda r: r["cumtime_ms"], reverse=True)
+    return rows[:top]
+
+
+def _tracemalloc_report(before, peak: int, top: int) -> dict:
+    after = tracemalloc.take_snapshot()
+    stats = after.compare_to(before, "lineno")
+    return {
+        "peak_kb": round(peak / 1024, 1),
+        "net_kb": round(sum(s.size_diff for s in stats) / 1024, 1),
+        "top": [
+            {"line": f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+             "size_kb": round(s.size_diff / 1024, 1), "count": s.count_diff}
+            for s in stats[:top] if s.size_diff > 0
+        ],
+    }
+
+
+@contextmanager
+def profile_probe(name: str, cprofile=None, trace_memory=None):
+    """
+    记录一次探测的耗时（以及可选的 cProfile / tracemalloc 结果）
+
+    嵌套的探测只记录耗时：cProfile 同一时间只能有一个，内存统计已包含在外层探测中。
+    """
+    use_cprofile = _settings["cprofile"] if cprofile is None else cprofile
+    use_tracemalloc = _settings["tracemalloc"] if trace_memory is None else trace_memory
+    depth = getattr(_local, "depth", 0)
+    if depth:
+        use_cprofile = use_tracemalloc = False
+
+    record = {"probe": name, "ts": datetime.now().isoformat(), "duration_ms": None, "cpu_ms": None,
+              "error": None}
+    profiler = None
+    started_tracing = False
+    snapshot = None
+    if use_tracemalloc:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracemalloc.reset_peak()
+        snapshot = tracemalloc.take_snapshot()
+    if use_cprofile:
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:               # 已有其他剖析工具（Python 3.12+ 只允许一个）
+            profiler = None
+
+    _local.depth = depth + 1
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        record["duration_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        record["cpu_ms"] = round((time.process_time() - cpu_start) * 1000, 3)
+        _local.depth = depth
+        if profiler is not None:
+            profiler.disable()
+            record["cprofile"] = _cprofile_top(profiler, _settings["top"])
+        if snapshot is not None:
+            _, peak = tracemalloc.get_traced_memory()
+            record["tracemalloc"] = _tracemalloc_report(snapshot, peak, _settings["top"])
+            if started_tracing:
+                tracemalloc.stop()
+        with _lock:
+            _records.append(record)
+        if _settings["output"]:
+            with open(_settings["output"], "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def profiled(name: str):
+    """探测函数装饰器：每次调用记录一条，返回 dict 时写入 duration_ms"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with profile_probe(name) as record:
+                result = func(*args, **kwargs)
+            if isinstance(result, dict):
+                result["duration_ms"] = record["duration_ms"]
+            return result
+        return wrapper
+    return decorator
+
+
+configure_from_env()
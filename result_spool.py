@@ -0,0 +1,182 @@
+# result_spool.py
+# 任务结果存储 - 小结果留在内存，大结果落盘，按块读取
+"""
+任务结果存储
+
+- 结果小于 inline_limit 时保存在内存，同时追加到 spool_dir/results.log
+- 超过 inline_limit 的结果写入 spool_dir/<task_id>.txt，内存中只保留元信息
+- 超过 max_bytes 的结果在服务端截断（保留开头部分）
+- /status 只返回前 N 字节预览，完整内容通过 iter_chunks 流式读取
+
+put() 返回结果在磁盘上的位置 {"path", "offset", "size", "truncated"}。forget() 释放内存中的副本，
+之后 preview / info / iter_chunks 传入该位置即可从磁盘读取（见 task_cache.py）。
+"""
+
+import os
+import threading
+from pathlib import Path
+
+# 默认配置
+DEFAULT_SPOOL_DIR = Path("task_results")
+DEFAULT_INLINE_LIMIT = 64 * 1024          # 64KB 以内保存在内存
+DEFAULT_MAX_BYTES = 16 * 1024 * 1024      # 单个结果最多保存 16MB
+DEFAULT_CHUNK_SIZE = 8 * 1024
+RESULT_LOG_NAME = "results.log"           # 小结果的追加日志
+
+TRUNCATION_MARKER = "\n...[truncated]"
+
+
+def _safe_name(task_id: str) -> str:
+    """task_id 转为安全的文件名"""
+    return "".join(c if c.isalnum() or c in "-_" else "_" for c in task_id)
+
+
+class ResultSpool:
+    """线程安全的任务结果存储"""
+
+    def __init__(self, spool_dir=DEFAULT_SPOOL_DIR, inline_limit: int = DEFAULT_INLINE_LIMIT,
+                 max_bytes: int = DEFAULT_MAX_BYTES):
+        self.spool_dir = Path(spool_dir)
+        self.inline_limit = inline_limit
+        self.max_bytes = max_bytes
+        self.log_path = self.spool_dir / RESULT_LOG_NAME
+        self._inline = {}     # task_id -> bytes
+        self._meta = {}       # task_id -> {"size", "truncated", "path", "offset"}
+        self._lock = threading.Lock()
+        self._log = None
+        self._log_lock = threading.Lock()
+
+    def _append_log(self, data: bytes) -> int:
+        """追加到结果日志，返回起始偏移"""
+        with self._log_lock:
+            if self._log is None:
+                self.spool_dir.mkdir(parents=True, exist_ok=True)
+                self._log = open(self.log_path, "ab")
+            offset = self._log.tell()
+            self._log.write(data)
+            self._log.flush()
+            return offset
+
+    def put(self, task_id: str, result: str) -> dict:
+        """
+        保存任务结果
+
+        Returns:
+            dict: {"size": 字节数, "truncated": 是否被截断, "spooled": 是否写入单独文件,
+                   "path", "offset": 结果在磁盘上的位置}
+        """
+        data = result.encode("utf-8")
+        truncated = False
+
+        if len(data) > self.max_bytes:
+            marker = TRUNCATION_MARKER.encode("utf-8")
+            data = data[:self.max_bytes - len(marker)] + marker
+            truncated = True
+
+        spooled = len(data) > self.inline_limit
+        if spooled:
+            self.spool_dir.mkdir(parents=True, exist_ok=True)
+            path = self.spool_dir / f"{_safe_name(task_id)}.txt"
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            offset = 0
+        else:
+            path = self.log_path
+            offset = self._append_log(data)
+        meta = {"size": len(data), "truncated": truncated, "path": str(path), "offset": offset}
+
+        with self._lock:
+            self._meta[task_id] = meta
+            if spooled:
+                self._inline.pop(task_id, None)
+            else:
+                self._inline[task_id] = data
+
+        return {**meta, "spooled": spooled}
+
+    def _lookup(self, task_id: str, location=None):
+        """内存中的元信息和数据；已 forget 时使用调用方传入的位置"""
+        with self._lock:
+            meta = self._meta.get(task_id)
+            data = self._inline.get(task_id)
+        if meta is None and location is not None:
+            path = location.get("path")
+            if path is None:
+                path = self.spool_dir / f"{_safe_name(task_id)}.txt" if location.get("spooled") else self.log_path
+            return {**location, "path": str(path), "offset": location.get("offset", 0)}, None
+        return meta, data
+
+    def forget(self, task_id: str):
+        """释放内存中的结果和元信息（磁盘上的内容保留）"""
+        with self._lock:
+            self._meta.pop(task_id, None)
+            self._inline.pop(task_id, None)
+
+    def has(self, task_id: str) -> bool:
+        with self._lock:
+            return task_id in self._meta
+
+    def info(self, task_id: str, location=None):
+        """返回结果元信息，不存在时返回 None"""
+        meta, _ = self._lookup(task_id, location)
+        if meta is None:
+            return None
+        return {"size": meta["size"], "truncated": meta["truncated"],
+                "spooled": meta["path"] != str(self.log_path)}
+
+    def preview(self, task_id: str, limit: int, location=None):
+        """
+        读取结果开头的 limit 字节
+
+        Returns:
+            (text, truncated) 或 (None, False)
+        """
+        meta, data = self._lookup(task_id, location)
+
+        if meta is None:
+            return None, False
+
+        if data is None:
+            with open(meta["path"], "rb") as f:
+                f.seek(meta["offset"])
+                data = f.read(min(limit + 1, meta["size"]))
+
+        # errors="ignore" 避免在多字节字符中间截断导致解码失败
+        text = data[:limit].decode("utf-8", errors="ignore")
+        return text, meta["size"] > limit or meta["truncated"]
+
+    def iter_chunks(self, task_id: str, chunk_size: int = DEFAULT_CHUNK_SIZE, location=None):
+        """按块读取完整结果（bytes），用于流式响应"""
+        meta, data = self._lookup(task_id, location)
+
+        if meta is None:
+            return
+
+        if data is not None:
+            for i in range(0, len(data), chunk_size):
+                yield data[i:i + chunk_size]
+            return
+
+        with open(meta["path"], "rb") as f:
+            f.seek(meta["offset"])
+            remaining = meta["size"]
+            while remaining > 0:
+                chunk = f.read(min(chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+    def discard(self, task_id: str):
+        """删除结果（内存 + 单独文件；results.log 中的内容保留）"""
+        with self._lock:
+            meta = self._meta.pop(task_id, None)
+            self._inline.pop(task_id, None)
+
+        if meta and meta["path"] != str(self.log_path):
+            try:
+                os.remove(meta["path"])
+            except OSError:
+                pass
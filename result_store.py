@@ -0,0 +1,400 @@
+# result_store.py
+# 探测结果存储 - 截图按内容寻址 + 感知哈希去重，结果追加为 NDJSON + 小索引，按大小 / 时间淘汰
+"""
+锁屏探测结果存储
+
+test_lockscreen.py 每次运行都会写一张全尺寸 PNG 和一个缩进格式的 test_results_<ts>.json，
+目录无限增长，查询历史需要逐个打开 JSON。本模块把结果目录整理为：
+
+    lockscreen_test_results/
+        objects/ab/<sha256>.png   截图，按像素内容的 SHA-256 命名
+        objects.json              截图元数据 {id: {dhash, size, bytes, refs, first_seen, last_seen}}
+        runs.ndjson               每次运行一行完整结果（紧凑 JSON）
+        runs.idx                  每次运行一行索引 {run_id, ts, offset, length, likely_locked, logonui, success}
+
+去重：
+    - 像素完全相同 → 同一个对象
+    - 与已有对象尺寸相同且 dhash 汉明距离 <= dedup_distance → 视为近似重复，复用已有对象
+淘汰：
+    - 超过 max_age_days 的运行被删除
+    - 总大小超过 max_bytes 时从最旧的运行开始删除
+    - 不再被任何运行引用的截图随之删除
+
+查询只读取 runs.idx，命中的运行再按偏移量读取 runs.ndjson 中对应的一行。
+
+使用方法：
+    python result_store.py stats
+    python result_store.py query --logonui --desktop     # LogonUI 在运行但截图像桌面
+    python result_store.py query --locked --since 2026-01-01 --full
+    python result_store.py evict --max-mb 100 --max-age-days 14
+    python result_store.py migrate --delete              # 导入旧的 test_results_*.json 和截图
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_ROOT = Path("lockscreen_test_results")
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+DEDUP_DISTANCE = 4             # dhash 汉明距离 <= 4 视为近似重复
+
+
+def _hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def summarize_run(results: dict) -> dict:
+    """从 run_all_tests 的结果中提取索引字段"""
+    tests = {t.get("test"): t for t in results.get("tests", [])}
+    screenshot = tests.get("screenshot", {})
+    process = tests.get("process_check", {})
+    return {
+        "likely_locked": screenshot.get("likely_locked") if screenshot.get("success") else None,
+        "logonui": process.get("screen_locked") if process.get("success") else None,
+        "success": all(t.get("success") for t in tests.values()) if tests else False,
+        "verdict_source": screenshot.get("verdict_source"),
+    }
+
+
+class ProbeResultStore:
+    """
+    探测结果存储
+
+    Args:
+        root: 结果目录
+        max_bytes: 截图 + 结果文件总大小上限
+        max_age_days: 运行记录保留天数
+        dedup_distance: 近似重复判定的 dhash 汉明距离
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes: int = DEFAULT_MAX_BYTES,
+                 max_age_days: float = DEFAULT_MAX_AGE_DAYS, dedup_distance: int = DEDUP_DISTANCE):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.objects_file = self.root / "objects.json"
+        self.runs_file = self.root / "runs.ndjson"
+        self.index_file = self.root / "runs.idx"
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.dedup_distance = dedup_distance
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._objects = self._load_objects()
+
+    # ------------------------------------------------------------------
+    # 截图
+    # ------------------------------------------------------------------
+
+    def _load_objects(self) -> dict:
+        if not self.objects_file.exists():
+            return {}
+        with open(self.objects_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _save_objects(self):
+        tmp = self.objects_file.with_name(self.objects_file.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._objects, f, ensure_ascii=False)
+        os.replace(tmp, self.objects_file)
+
+    def object_path(self, object_id: str) -> Path:
+        return self.objects_dir / object_id[:2] / f"{object_id}.png"
+
+    def put_image(self, img) -> dict:
+        """
+        保存截图（PIL 图像），完全相同或近似重复时复用已有对象
+
+        Returns:
+            {"id", "path", "dedup": None / "exact" / "near", "distance"}
+        """
+        from lock_classifier import dhash
+
+        digest = hashlib.sha256(f"{img.mode}{img.size}".encode() + img.tobytes()).hexdigest()
+        now = datetime.now().isoformat()
+
+        if digest in self._objects:
+            return self._reuse(digest, now, "exact", 0)
+
+        value = dhash(img)
+        size = list(img.size)
+        best_id, best_distance = None, None
+        for object_id, meta in self._objects.items():
+            if meta["size"] != size:
+                continue
+            distance = _hamming(value, int(meta["dhash"], 16))
+            if distance <= self.dedup_distance and (best_distance is None or distance < best_distance):
+                best_id, best_distance = object_id, distance
+        if best_id is not None:
+            return self._reuse(best_id, now, "near", best_distance)
+
+        path = self.object_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        img.save(tmp, format="PNG")
+        os.replace(tmp, path)
+        self._objects[digest] = {
+            "dhash": f"{value:016x}",
+            "size": size,
+            "bytes": path.stat().st_size,
+            "refs": 0,
+            "first_seen": now,
+            "last_seen": now,
+        }
+        self._save_objects()
+        return {"id": digest, "path": str(path), "dedup": None, "distance": None}
+
+    def _reuse(self, object_id, now, kind, distance) -> dict:
+        self._objects[object_id]["last_seen"] = now
+        self._save_objects()
+        return {"id": object_id, "path": str(self.object_path(object_id)), "dedup": kind, "distance": distance}
+
+    # ------------------------------------------------------------------
+    # 运行记录
+    # ------------------------------------------------------------------
+
+    def append_run(self, results: dict, screenshots=()) -> dict:
+        """
+        追加一次运行的完整结果
+
+        Args:
+            results: run_all_tests 的结果
+            screenshots: 本次运行引用的截图对象 id
+        """
+        ts = time.time()
+        run_id = datetime.fromtimestamp(ts).strftime("%Y%m%d_%H%M%S_%f")
+        screenshots = [s for s in dict.fromkeys(screenshots) if s in self._objects]
+        record = {"run_id": run_id, "ts": ts, "screenshots": screenshots, **results}
+        line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+
+        with open(self.runs_file, "ab") as f:
+            offset = f.tell()
+            f.write(line)
+
+        entry = {"run_id": run_id, "ts": ts, "offset": offset, "length": len(line),
+                 "screenshots": screenshots, **summarize_run(results)}
+        with open(self.index_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+        for object_id in screenshots:
+            self._objects[object_id]["refs"] += 1
+        self._save_objects()
+        return entry
+
+    def index(self):
+        """读取全部索引行（每次运行约 200 字节）"""
+        if not self.index_file.exists():
+            return []
+        with open(self.index_file, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def read_run(self, entry: dict) -> dict:
+        with open(self.runs_file, "rb") as f:
+            f.seek(entry["offset"])
+            return json.loads(f.read(entry["length"]))
+
+    def query(self, likely_locked=None, logonui=None, success=None, since=None, until=None, full=False):
+        """
+        按索引字段筛选运行记录
+
+        Args:
+            likely_locked / logonui / success: None 表示不筛选
+            since / until: datetime 或时间戳
+            full: 是否读取完整结果
+        """
+        since = since.timestamp() if isinstance(since, datetime) else since
+        until = until.timestamp() if isinstance(until, datetime) else until
+        for entry in self.index():
+            if likely_locked is not None and entry.get("likely_locked") is not likely_locked:
+                continue
+            if logonui is not None and entry.get("logonui") is not logonui:
+                continue
+            if success is not None and entry.get("success") is not success:
+                continue
+            if since is not None and entry["ts"] < since:
+                continue
+            if until is not None and entry["ts"] > until:
+                continue
+            yield self.read_run(entry) if full else entry
+
+    # ------------------------------------------------------------------
+    # 淘汰
+    # ------------------------------------------------------------------
+
+    def total_bytes(self) -> int:
+        files = [self.runs_file, self.index_file, self.objects_file]
+        size = sum(f.stat().st_size for f in files if f.exists())
+        return size + sum(meta["bytes"] for meta in self._objects.values())
+
+    def evict(self, max_bytes=None, max_age_days=None) -> dict:
+        """
+        删除过期 / 超出大小上限的运行记录及不再引用的截图
+
+        Returns:
+            {"runs_removed", "objects_removed", "bytes_before", "bytes_after"}
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        max_age_days = self.max_age_days if max_age_days is None else max_age_days
+        bytes_before = self.total_bytes()
+        entries = sorted(self.index(), key=lambda e: e["ts"])
+
+        cutoff = time.time() - max_age_days * 86400 if max_age_days else None
+        keep = [e for e in entries if cutoff is None or e["ts"] >= cutoff]
+
+        # 估算每条运行的大小（记录 + 索引行 + 仅被它引用的截图），从最旧的开始删除
+        def run_bytes(entry):
+            return entry["length"] + len(json.dumps(entry, ensure_ascii=False).encode("utf-8")) + 1
+
+        refs = {}
+        for e in keep:
+            for object_id in e.get("screenshots", []):
+                refs[object_id] = refs.get(object_id, 0) + 1
+        size = sum(run_bytes(e) for e in keep) + sum(
+            self._objects[o]["bytes"] for o in refs if o in self._objects)
+        if self.objects_file.exists():
+            size += self.objects_file.stat().st_size
+        while keep and max_bytes and size > max_bytes:
+            oldest = keep.pop(0)
+            size -= run_bytes(oldest)
+            for object_id in oldest.get("screenshots", []):
+                refs[object_id] -= 1
+                if refs[object_id] == 0 and object_id in self._objects:
+                    size -= self._objects[object_id]["bytes"]
+
+        removed_runs = len(entries) - len(keep)
+        if removed_runs:
+            self._rewrite(keep)
+
+        # 删除没有被剩余运行引用的截图（包括从未被运行引用的）
+        live = {o for e in keep for o in e.get("screenshots", [])}
+        removed_objects = 0
+        for object_id in list(self._objects):
+            if object_id not in live:
+                self.object_path(object_id).unlink(missing_ok=True)
+                del self._objects[object_id]
+                removed_objects += 1
+            else:
+                self._objects[object_id]["refs"] = sum(
+                    e.get("screenshots", []).count(object_id) for e in keep)
+        self._save_objects()
+
+        return {
+            "runs_removed": removed_runs,
+            "objects_removed": removed_objects,
+            "bytes_before": bytes_before,
+            "bytes_after": self.total_bytes(),
+        }
+
+    def _rewrite(self, keep):
+        """只保留 keep 中的运行，重写 runs.ndjson 和索引（先写临时文件再替换）"""
+        runs_tmp = self.runs_file.with_name(self.runs_file.name + ".tmp")
+        index_tmp = self.index_file.with_name(self.index_file.name + ".tmp")
+        with open(self.runs_file, "rb") as src, open(runs_tmp, "wb") as runs, \
+                open(index_tmp, "w", encoding="utf-8") as index:
+            for entry in keep:
+                src.seek(entry["offset"])
+                line = src.read(entry["length"])
+                entry = dict(entry, offset=runs.tell())
+                runs.write(line)
+                index.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        os.replace(runs_tmp, self.runs_file)
+        os.replace(index_tmp, self.index_file)
+
+    def stats(self) -> dict:
+        entries = self.index()
+        return {
+            "runs": len(entries),
+            "objects": len(self._objects),
+            "total_bytes": self.total_bytes(),
+            "locked_runs": sum(1 for e in entries if e.get("likely_locked") is True),
+            "logonui_runs": sum(1 for e in entries if e.get("logonui") is True),
+            "first_run": entries[0]["run_id"] if entries else None,
+            "last_run": entries[-1]["run_id"] if entries else None,
+        }
+
+    # ------------------------------------------------------------------
+    # 迁移
+    # ------------------------------------------------------------------
+
+    def migrate(self, delete: bool = False) -> dict:
+        """导入旧格式的 test_results_*.json 及其引用的截图"""
+        from PIL import Image
+
+        imported = 0
+        deleted = []
+        for result_file in sorted(self.root.glob("test_results_*.json")):
+            with open(result_file, "r", encoding="utf-8") as f:
+                results = json.load(f)
+            screenshot_ids = []
+            for test in results.get("tests", []):
+                for path in test.get("filepaths") or ([test["filepath"]] if test.get("filepath") else []):
+                    path = Path(path)
+                    if not path.exists():
+                        continue
+                    with Image.open(path) as img:
+                        screenshot_ids.append(self.put_image(img)["id"])
+                    deleted.append(path)
+            self.append_run(results, screenshot_ids)
+            deleted.append(result_file)
+            imported += 1
+
+        if delete:
+            for path in deleted:
+                path.unlink(missing_ok=True)
+        return {"imported": imported, "deleted": len(deleted) if delete else 0}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="锁屏探测结果存储")
+    parser.add_argument("--root", default=str(DEFAULT_ROOT), help="结果目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    sub.add_parser("stats", help="存储概况")
+
+    query = sub.add_parser("query", help="查询历史运行")
+    verdict = query.add_mutually_exclusive_group()
+    verdict.add_argument("--locked", dest="likely_locked", action="store_const", const=True,
+                         help="截图判断为锁屏")
+    verdict.add_argument("--desktop", dest="likely_locked", action="store_const", const=False,
+                         help="截图判断为桌面")
+    logonui = query.add_mutually_exclusive_group()
+    logonui.add_argument("--logonui", dest="logonui", action="store_const", const=True, help="LogonUI.exe 在运行")
+    logonui.add_argument("--no-logonui", dest="logonui", action="store_const", const=False, help="LogonUI.exe 未运行")
+    query.add_argument("--since", help="开始日期（ISO 格式）")
+    query.add_argument("--until", help="结束日期（ISO 格式）")
+    query.add_argument("--full", action="store_true", help="输出完整结果")
+
+    evict = sub.add_parser("evict", help="按大小 / 时间淘汰")
+    evict.add_argument("--max-mb", type=float, default=DEFAULT_MAX_BYTES / 1024 / 1024)
+    evict.add_argument("--max-age-days", type=float, default=DEFAULT_MAX_AGE_DAYS)
+
+    migrate = sub.add_parser("migrate", help="导入旧的 test_results_*.json 和截图")
+    migrate.add_argument("--delete", action="store_true", help="导入后删除旧文件")
+    args = parser.parse_args(argv)
+
+    store = ProbeResultStore(args.root)
+
+    if args.command == "stats":
+        print(json.dumps(store.stats(), ensure_ascii=False))
+    elif args.command == "query":
+        since = datetime.fromisoformat(args.since) if args.since else None
+        until = datetime.fromisoformat(args.until) if args.until else None
+        count = 0
+        for row in store.query(likely_locked=args.likely_locked, logonui=args.logonui,
+                               since=since, until=until, full=args.full):
+            print(json.dumps(row, ensure_ascii=False, default=str))
+            count += 1
+        print(f"共 {count} 条", file=sys.stderr)
+    elif args.command == "evict":
+        print(json.dumps(store.evict(int(args.max_mb * 1024 * 1024), args.max_age_days), ensure_ascii=False))
+    elif args.command == "migrate":
+        print(json.dumps(store.migrate(delete=args.delete), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# sim_clock.py
+# 可注入时钟 - 真实时间 / 虚拟时间 / 与调度脚本共享的文件时钟，以及离散事件模拟的事件循环
+"""
+可注入时钟
+
+调度器的时间逻辑（唤醒等待、健康检查重试、任务间隔、周期倒计时）和模拟器的启动 / 执行耗时
+原来都直接使用 time.sleep / time.monotonic，测试一天的调度就要真的等一天。现在统一通过时钟对象：
+
+    RealClock     - 真实时间（默认）
+    VirtualClock  - 虚拟时间，sleep() 立即返回并推进时间；配合 Simulation 做离散事件模拟
+    FileClock     - 读取调度脚本在 SCHED_CLOCK=virtual 模式下维护的时钟文件，
+                    让 minimal_backend.py 的模拟器与 daily_tasks.sh / interval_checkin.sh 使用同一虚拟时间
+
+时钟文件格式：一行 Unix 时间戳（秒，可带小数），由调度脚本的 clock_sleep 原子替换写入。
+
+时钟接口：
+    clock.now()        当前时间（秒）
+    clock.sleep(s)     等待 s 秒
+    clock.sleep_until(t)  等到时刻 t（只有 FileClock 提供，模拟器据此按到达时刻排队）
+
+使用方法：
+    sim = Simulation(start=0)
+    def job():
+        yield 30                      # 等待 30 秒虚拟时间
+        print(sim.now())
+    sim.spawn(job())
+    sim.run(until=86400)
+"""
+
+import heapq
+import itertools
+import os
+import time
+from pathlib import Path
+
+DEFAULT_CLOCK_FILE = Path("/tmp/satellite-y/clock")
+FILE_CLOCK_POLL_INTERVAL = 0.01
+
+
+class RealClock:
+    """真实时间（单调时钟）"""
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    虚拟时间（单线程使用）
+
+    sleep() 不阻塞，直接把时间向前推进；Simulation 通过 advance_to() 跳到下一个事件
+    """
+
+    def __init__(self, start: float = 0.0):
+        self._now = float(start)
+
+    def now(self) -> float:
+        return self._now
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            self._now += seconds
+
+    def advance_to(self, when: float):
+        if when < self._now:
+            raise ValueError(f"虚拟时间不能倒退: {when} < {self._now}")
+        self._now = when
+
+
+class FileClock:
+    """
+    与调度脚本共享的虚拟时钟（时钟文件只由调度脚本推进）
+
+    sleep() 等到文件中的时间到达目标时刻：调度脚本推进虚拟时间时，模拟器中执行的任务随之"完成"
+    """
+
+    def __init__(self, path=DEFAULT_CLOCK_FILE, poll_interval: float = FILE_CLOCK_POLL_INTERVAL):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+
+    def now(self) -> float:
+        try:
+            return float(self.path.read_text().strip())
+        except FileNotFoundError:
+            # 调度脚本还没运行：与脚本相同，从当前真实时间开始
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            now = time.time()
+            tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(f"{now:.3f}\n")
+            os.replace(tmp_path, self.path)
+            return now
+        except ValueError:
+            # 极少数情况下读到正在替换的文件，稍后重试
+            time.sleep(self.poll_interval)
+            return float(self.path.read_text().strip())
+
+    def sleep(self, seconds: float):
+        self.sleep_until(self.now() + seconds)
+
+    def sleep_until(self, when: float):
+        """等到时钟文件中的时间到达 when"""
+        while self.now() < when:
+            time.sleep(self.poll_interval)
+
+
+class Simulation:
+    """
+    离散事件模拟的事件循环
+
+    进程是生成器：yield 秒数表示等待这么久的虚拟时间，return 结束；
+    也可以用 at() / after() 直接安排回调。同一时刻的事件按安排顺序执行。
+    """
+
+    def __init__(self, start: float = 0.0):
+        self.clock = VirtualClock(start)
+        self._events = []
+        self._seq = itertools.count()
+        self.processed = 0
+
+    def now(self) -> float:
+        return self.clock.now()
+
+    def at(self, when: float, callback, *args):
+        """在虚拟时刻 when 调用 callback(*args)"""
+        heapq.heappush(self._events, (max(when, self.now()), next(self._seq), callback, args))
+
+    def after(self, delay: float, callback, *args):
+        self.at(self.now() + delay, callback, *args)
+
+    def spawn(self, process, delay: float = 0.0):
+        """启动一个生成器进程"""
+        self.after(delay, self._step, process)
+        return process
+
+    def _step(self, process):
+        try:
+            delay = next(process)
+        except StopIteration:
+            return
+        self.after(max(0.0, float(delay or 0.0)), self._step, process)
+
+    def run(self, until: float = None):
+        """执行事件直到没有事件或到达 until（虚拟时刻）"""
+        while self._events:
+            when = self._events[0][0]
+            if until is not None and when > until:
+                self.clock.advance_to(until)
+                return
+            _, _, callback, args = heapq.heappop(self._events)
+            self.clock.advance_to(when)
+            callback(*args)
+            self.processed += 1
+        if until is not None and until > self.now():
+            self.clock.advance_to(until)
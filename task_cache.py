@@ -0,0 +1,416 @@
+# task_cache.py
+# 最近任务缓存 - 固定容量的数组环形缓冲区 + id 索引，淘汰的任务写入磁盘
+"""
+最近任务缓存
+
+后端原来用全局 dict 为每个任务保存一个 dict（instruction / status / 时间戳 / trace ...），
+运行几周后内存只增不减。本模块把任务记录保存在固定容量的环形缓冲区中：
+
+- 每个字段一个预分配的数组（array / bytearray），每条记录约 100 字节 + task_id 字符串和索引项
+- 指令只保存 64 位哈希（blake2b），状态 / 优先级 / 处理器保存为小整数编码
+- 结果只保存位置（见 result_spool.py 的 results.log 偏移和大小）
+- 写满后覆盖最旧的记录，被覆盖的记录追加到 spill 文件（NDJSON），
+  同时通过 on_evict(task_id) 通知调用方释放相关内存（例如 ResultSpool.forget）
+
+/status/<id> 查询最近的任务是一次字典查找 + 数组读取；已淘汰的任务从 spill 文件末尾向前扫描。
+spill 文件超过 spill_max_bytes 时轮换为 .1（只保留一个旧文件）。
+
+使用方法：
+    cache = RecentTaskCache(capacity=10000, spill_path="task_results/tasks.ndjson")
+    cache.add("test-1", "/1mu3", priority="high", handler="1mu3")
+    cache.update("test-1", state="running", started_at=time.time())
+    record = cache.get("test-1")
+    print(record.state, record.to_dict())
+"""
+
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from array import array
+from pathlib import Path
+
+DEFAULT_CAPACITY = 10000
+DEFAULT_SPILL_FILE = Path("task_results") / "tasks.ndjson"
+DEFAULT_SPILL_MAX_BYTES = 64 * 1024 * 1024
+SCAN_BLOCK_SIZE = 64 * 1024
+
+STATES = ("queued", "running", "done", "failed", "preempted", "expired")
+PRIORITIES = ("high", "normal", "low")
+
+_STATE_CODES = {name: i for i, name in enumerate(STATES)}
+_PRIORITY_CODES = {name: i for i, name in enumerate(PRIORITIES)}
+_NONE_TIME = math.nan
+_NO_HANDLER = 0xFFFF
+
+# flags 位
+_HAS_TRACE = 1
+_HAS_PARENT = 2
+_HAS_RESULT = 4
+_RESULT_TRUNCATED = 8
+_RESULT_SPOOLED = 16           # 结果在单独文件中（否则在 results.log）
+
+_TRACE_BYTES = 24              # trace_id 16 字节 + parent_span_id 8 字节
+
+
+def instruction_hash(instruction: str) -> int:
+    """指令的 64 位哈希"""
+    return int.from_bytes(hashlib.blake2b(instruction.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _fixed_hex(value: str, size: int) -> bytes:
+    """十六进制 id 转为定长字节（长度不对时报错，避免改变 bytearray 长度）"""
+    raw = bytes.fromhex(value)
+    if len(raw) != size:
+        raise ValueError(f"id 长度应为 {size * 2} 个十六进制字符: {value}")
+    return raw
+
+
+def _time_or_none(value: float):
+    return None if math.isnan(value) else value
+
+
+class TaskRecord:
+    """一条任务记录（从缓存或 spill 文件读出的快照）"""
+
+    __slots__ = ("task_id", "instruction_hash", "state", "priority", "handler",
+                 "created_at", "started_at", "finished_at", "trace_id", "parent_span_id", "result")
+
+    def __init__(self, task_id, instruction_hash, state, priority, handler=None, created_at=None,
+                 started_at=None, finished_at=None, trace_id=None, parent_span_id=None, result=None):
+        self.task_id = task_id
+        self.instruction_hash = instruction_hash
+        self.state = state
+        self.priority = priority
+        self.handler = handler
+        self.created_at = created_at
+        self.started_at = started_at
+        self.finished_at = finished_at
+        self.trace_id = trace_id
+        self.parent_span_id = parent_span_id
+        self.result = result            # {"offset", "size", "truncated", "spooled"} 或 None
+
+    @property
+    def trace(self):
+        """{"trace_id", "parent_span_id"}，没有 trace 上下文时为 None"""
+        if self.trace_id is None:
+            return None
+        return {"trace_id": self.trace_id, "parent_span_id": self.parent_span_id}
+
+    def to_dict(self) -> dict:
+        # task_id 必须是第一个字段（spill 文件按行首匹配）
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(**{name: data.get(name) for name in cls.__slots__})
+
+
+class TaskSpill:
+    """
+    被淘汰记录的持久化存储（追加写 NDJSON，按 task_id 从文件末尾向前查找）
+
+    同一个 task_id 可能有多行（淘汰后又更新），以最后一行为准
+    """
+
+    def __init__(self, path=DEFAULT_SPILL_FILE, max_bytes: int = DEFAULT_SPILL_MAX_BYTES):
+        self.path = Path(path)
+        self.rotated_path = self.path.with_name(self.path.name + ".1")
+        self.max_bytes = max_bytes
+        self._file = None
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def append(self, record: TaskRecord):
+        line = (json.dumps(record.to_dict(), ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "ab")
+            elif self.max_bytes and self._file.tell() + len(line) > self.max_bytes:
+                self._file.close()
+                os.replace(self.path, self.rotated_path)
+                self._file = open(self.path, "ab")
+            self._file.write(line)
+            self._file.flush()
+            self.written += 1
+
+    def find(self, task_id: str):
+        """返回最后一次写入的记录，不存在时返回 None"""
+        prefix = ('{"task_id": ' + json.dumps(task_id, ensure_ascii=False) + ",").encode("utf-8")
+        with self._lock:
+            for path in (self.path, self.rotated_path):
+                found = self._scan(path, prefix)
+                if found is not None:
+                    return TaskRecord.from_dict(json.loads(found))
+        return None
+
+    @staticmethod
+    def _scan(path: Path, prefix: bytes):
+        try:
+            f = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        marker = b"\n" + prefix
+        with f:
+            pos = f.seek(0, os.SEEK_END)
+            tail = b""
+            while pos > 0:
+                step = min(SCAN_BLOCK_SIZE, pos)
+                pos -= step
+                f.seek(pos)
+                block = f.read(step) + tail
+                # 块内查找（不逐行拆分）；块的第一行可能不完整，留给下一块
+                found = block.rfind(marker)
+                if found >= 0:
+                    start = found + 1
+                elif pos == 0 and block.startswith(prefix):
+                    start = 0
+                else:
+                    cut = block.find(b"\n")
+                    tail = block if cut < 0 else block[:cut]
+                    continue
+                end = block.find(b"\n", start)
+                return block[start:end if end >= 0 else None]
+            return None
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class RecentTaskCache:
+    """
+    固定容量的最近任务缓存（线程安全）
+
+    Args:
+        capacity: 内存中最多保存的任务数
+        spill_path: 被淘汰记录的 spill 文件（None 表示直接丢弃）
+        on_evict: 回调 on_evict(task_id)，记录离开内存时调用
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, spill_path=DEFAULT_SPILL_FILE, on_evict=None,
+                 spill_max_bytes: int = DEFAULT_SPILL_MAX_BYTES):
+        if capacity <= 0:
+            raise ValueError(f"capacity 必须大于 0: {capacity}")
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.spill = TaskSpill(spill_path, spill_max_bytes) if spill_path else None
+
+        self._ids = [None] * capacity
+        self._index = {}                                  # task_id -> slot
+        self._hash = array("Q", bytes(8 * capacity))
+        self._state = bytearray(capacity)
+        self._priority = bytearray(capacity)
+        self._handler = array("H", [_NO_HANDLER]) * capacity
+        self._created = array("d", [_NONE_TIME]) * capacity
+        self._started = array("d", [_NONE_TIME]) * capacity
+        self._finished = array("d", [_NONE_TIME]) * capacity
+        self._result_offset = array("q", bytes(8 * capacity))
+        self._result_size = array("q", bytes(8 * capacity))
+        self._flags = bytearray(capacity)
+        self._trace = bytearray(_TRACE_BYTES * capacity)
+        self._handlers = []                               # 处理器名称表（编码 -> 名称）
+        self._handler_codes = {}
+        self._next = 0
+        self._lock = threading.Lock()
+        self.counters = {"added": 0, "evicted": 0, "hits": 0, "spill_hits": 0, "misses": 0, "spill_updates": 0}
+
+    def __len__(self):
+        with self._lock:
+            return len(self._index)
+
+    def __contains__(self, task_id):
+        with self._lock:
+            return task_id in self._index
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+
+    def _handler_code(self, handler):
+        if handler is None:
+            return _NO_HANDLER
+        code = self._handler_codes.get(handler)
+        if code is None:
+            if len(self._handlers) >= _NO_HANDLER:
+                raise ValueError("处理器名称过多")
+            code = self._handler_codes[handler] = len(self._handlers)
+            self._handlers.append(handler)
+        return code
+
+    def add(self, task_id: str, instruction: str, priority: str = "normal", handler=None,
+            trace_id=None, parent_span_id=None, created_at: float = None, state: str = "queued"):
+        """添加任务（同 id 已存在时覆盖）；缓存已满时淘汰最旧的记录"""
+        evicted = None
+        with self._lock:
+            slot = self._index.get(task_id)
+            if slot is None:
+                slot = self._next
+                self._next = (slot + 1) % self.capacity
+                old_id = self._ids[slot]
+                if old_id is not None:
+                    evicted = self._record(slot)
+                    del self._index[old_id]
+                    self.counters["evicted"] += 1
+                self._ids[slot] = task_id
+                self._index[task_id] = slot
+
+            self._hash[slot] = instruction_hash(instruction)
+            self._state[slot] = _STATE_CODES[state]
+            self._priority[slot] = _PRIORITY_CODES[priority]
+            self._handler[slot] = self._handler_code(handler)
+            self._created[slot] = time.time() if created_at is None else created_at
+            self._started[slot] = _NONE_TIME
+            self._finished[slot] = _NONE_TIME
+            self._result_offset[slot] = 0
+            self._result_size[slot] = 0
+            flags = 0
+            base = slot * _TRACE_BYTES
+            self._trace[base:base + _TRACE_BYTES] = bytes(_TRACE_BYTES)
+            if trace_id:
+                self._trace[base:base + 16] = _fixed_hex(trace_id, 16)
+                flags |= _HAS_TRACE
+                if parent_span_id:
+                    self._trace[base + 16:base + 24] = _fixed_hex(parent_span_id, 8)
+                    flags |= _HAS_PARENT
+            self._flags[slot] = flags
+            self.counters["added"] += 1
+
+        if evicted is not None:
+            self._spill(evicted)
+
+    def _spill(self, record: TaskRecord):
+        if self.spill is not None:
+            self.spill.append(record)
+        if self.on_evict is not None:
+            self.on_evict(record.task_id)
+
+    def update(self, task_id: str, state: str = None, started_at: float = None, finished_at: float = None,
+               result: dict = None):
+        """
+        更新任务状态 / 时间戳 / 结果位置（result 为 ResultSpool.put 的返回值）
+
+        已淘汰的任务更新后重新追加到 spill 文件
+
+        Returns:
+            更新后的 TaskRecord，任务不存在时返回 None
+        """
+        with self._lock:
+            slot = self._index.get(task_id)
+            if slot is not None:
+                if state is not None:
+                    self._state[slot] = _STATE_CODES[state]
+                if started_at is not None:
+                    self._started[slot] = started_at
+                if finished_at is not None:
+                    self._finished[slot] = finished_at
+                if result is not None:
+                    flags = self._flags[slot] | _HAS_RESULT
+                    flags = flags | _RESULT_TRUNCATED if result.get("truncated") else flags & ~_RESULT_TRUNCATED
+                    flags = flags | _RESULT_SPOOLED if result.get("spooled") else flags & ~_RESULT_SPOOLED
+                    self._flags[slot] = flags
+                    self._result_offset[slot] = result.get("offset", 0)
+                    self._result_size[slot] = result.get("size", 0)
+                return self._record(slot)
+
+        record = self.spill.find(task_id) if self.spill is not None else None
+        if record is None:
+            return None
+        if state is not None:
+            record.state = state
+        if started_at is not None:
+            record.started_at = started_at
+        if finished_at is not None:
+            record.finished_at = finished_at
+        if result is not None:
+            record.result = {k: result.get(k) for k in ("offset", "size", "truncated", "spooled")}
+        self.counters["spill_updates"] += 1
+        self.spill.append(record)          # 已经淘汰过，不再调用 on_evict
+        return record
+
+    def remove(self, task_id: str) -> bool:
+        """删除记录（不写入 spill 文件），例如提交后被队列拒绝的任务"""
+        with self._lock:
+            slot = self._index.pop(task_id, None)
+            if slot is None:
+                return False
+            self._ids[slot] = None
+            return True
+
+    # ------------------------------------------------------------------
+    # 读取
+    # ------------------------------------------------------------------
+
+    def _record(self, slot: int) -> TaskRecord:
+        """从数组构造记录（调用方持有锁）"""
+        flags = self._flags[slot]
+        base = slot * _TRACE_BYTES
+        handler = self._handler[slot]
+        result = None
+        if flags & _HAS_RESULT:
+            result = {"offset": self._result_offset[slot], "size": self._result_size[slot],
+                      "truncated": bool(flags & _RESULT_TRUNCATED), "spooled": bool(flags & _RESULT_SPOOLED)}
+        return TaskRecord(
+            self._ids[slot],
+            self._hash[slot],
+            STATES[self._state[slot]],
+            PRIORITIES[self._priority[slot]],
+            None if handler == _NO_HANDLER else self._handlers[handler],
+            _time_or_none(self._created[slot]),
+            _time_or_none(self._started[slot]),
+            _time_or_none(self._finished[slot]),
+            self._trace[base:base + 16].hex() if flags & _HAS_TRACE else None,
+            self._trace[base + 16:base + 24].hex() if flags & _HAS_PARENT else None,
+            result,
+        )
+
+    def get(self, task_id: str, spill: bool = True):
+        """查询任务；不在内存中时（spill=True）从 spill 文件查找"""
+        with self._lock:
+            slot = self._index.get(task_id)
+            if slot is not None:
+                self.counters["hits"] += 1
+                return self._record(slot)
+        record = self.spill.find(task_id) if spill and self.spill is not None else None
+        with self._lock:
+            self.counters["spill_hits" if record is not None else "misses"] += 1
+        return record
+
+    def state(self, task_id: str):
+        """只查询状态（不构造记录，不读 spill 文件），不在内存中时返回 None"""
+        with self._lock:
+            slot = self._index.get(task_id)
+            return None if slot is None else STATES[self._state[slot]]
+
+    def close(self):
+        """把内存中的记录写入 spill 文件（进程退出前调用，重启后仍可查询）"""
+        with self._lock:
+            records = [self._record(slot) for slot in self._index.values()]
+        if self.spill is not None:
+            for record in sorted(records, key=lambda r: r.created_at or 0):
+                self.spill.append(record)
+            self.spill.close()
+
+    def array_bytes(self) -> int:
+        """预分配数组占用的字节数（不含 task_id 字符串和索引）"""
+        arrays = (self._hash, self._handler, self._created, self._started, self._finished,
+                  self._result_offset, self._result_size)
+        return (sum(a.itemsize * len(a) for a in arrays)
+                + len(self._state) + len(self._priority) + len(self._flags) + len(self._trace))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                **self.counters,
+                "capacity": self.capacity,
+                "size": len(self._index),
+                "array_bytes": self.array_bytes(),
+                "handlers": len(self._handlers),
+            }
+        stats["spilled"] = self.spill.written if self.spill is not None else 0
+        return stats
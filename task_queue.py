@@ -0,0 +1,322 @@
+# task_queue.py
+# 后端任务队列 - 优先级 + 按客户端加权公平 + 截止时间
+"""
+后端任务队列
+
+调度规则：
+1. 优先级类别之间严格优先: high > normal > low
+2. 同一类别内按客户端（X-API-Key）加权公平排队（WFQ 虚拟完成时间）
+3. 截止时间只在有风险时生效：剩余时间（slack）小于预计执行时间的任务按截止时间先后（EDF）
+   提前出队，其余带截止时间的任务照常参与公平排队（附带 deadline 不能绕过按客户端的公平份额）。
+   预计执行时间是 record_service() 上报的执行耗时的指数移动平均
+4. 队列饱和时:
+   - low 任务在队列达到 LOW_ADMIT_RATIO 时即被拒绝
+   - 高优先级任务到达时，抢占（移出）队列中最低优先级、最晚入队的任务
+   - 无可抢占任务时拒绝新任务（QueueFullError）
+5. 出队时已经超过截止时间的任务直接标记为过期，不再执行
+
+每个优先级类别记录排队等待时间，通过 stats() 导出。
+"""
+
+import heapq
+import itertools
+import threading
+import time
+from datetime import datetime
+
+# 优先级类别（数字越小越优先）
+PRIORITY_CLASSES = {"high": 0, "normal": 1, "low": 2}
+DEFAULT_PRIORITY = "normal"
+
+DEFAULT_MAX_SIZE = 100
+LOW_ADMIT_RATIO = 0.8          # 队列达到 80% 时不再接收 low 任务
+WAIT_SAMPLE_SIZE = 200         # 每个类别保留最近 N 个等待时间样本
+CLIENT_PRUNE_SIZE = 1024       # 客户端完成时间表超过该大小时清理空闲客户端
+DEFAULT_SERVICE_ESTIMATE = 30.0   # 还没有执行记录时的预计执行时间（秒）
+SERVICE_EMA_ALPHA = 0.2        # 执行耗时移动平均的权重
+
+
+class QueueFullError(Exception):
+    """队列已满，任务被拒绝"""
+
+    def __init__(self, message, retry_after: int = 5):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_priority(value):
+    """解析请求中的 priority 字段（名称或 0/1/2），无效值抛出 ValueError"""
+    if value is None or value == "":
+        return DEFAULT_PRIORITY
+    if isinstance(value, str) and value.lower() in PRIORITY_CLASSES:
+        return value.lower()
+    if isinstance(value, int) and not isinstance(value, bool):
+        for name, level in PRIORITY_CLASSES.items():
+            if level == value:
+                return name
+    raise ValueError(f"无效的 priority: {value}（可选: {', '.join(PRIORITY_CLASSES)}）")
+
+
+def parse_deadline(value, now: float = None):
+    """
+    解析请求中的 deadline 字段
+
+    支持:
+        - 数字: 从现在起多少秒内完成
+        - ISO 时间字符串: 绝对截止时间
+
+    Returns:
+        time.time() 时间戳或 None
+    """
+    if value is None or value == "":
+        return None
+    now = time.time() if now is None else now
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        if value <= 0:
+            raise ValueError("deadline 必须大于 0")
+        return now + float(value)
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    raise ValueError(f"无效的 deadline: {value}（秒数或 ISO 时间）")
+
+
+class Job:
+    """队列中的一个任务"""
+
+    __slots__ = ("task_id", "payload", "client", "priority", "deadline",
+                 "enqueued_at", "virtual_finish", "seq", "removed")
+
+    def __init__(self, task_id, payload, client, priority, deadline):
+        self.task_id = task_id
+        self.payload = payload
+        self.client = client
+        self.priority = priority
+        self.deadline = deadline
+        self.enqueued_at = time.monotonic()
+        self.virtual_finish = 0.0
+        self.seq = 0
+        self.removed = False
+
+    def sort_key(self):
+        # 按 WFQ 虚拟完成时间；截止时间有风险的任务由 JobQueue 另外按 EDF 提前
+        return (PRIORITY_CLASSES[self.priority], self.virtual_finish, self.seq)
+
+
+class _WaitStats:
+    """单个优先级类别的等待时间统计"""
+
+    def __init__(self):
+        self.dispatched = 0
+        self.rejected = 0
+        self.preempted = 0
+        self.expired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.samples = []
+
+    def record(self, wait: float):
+        self.dispatched += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+        self.samples.append(wait)
+        if len(self.samples) > WAIT_SAMPLE_SIZE:
+            del self.samples[0]
+
+    def to_dict(self, queued: int):
+        samples = sorted(self.samples)
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))] if samples else 0.0
+        return {
+            "queued": queued,
+            "dispatched": self.dispatched,
+            "rejected": self.rejected,
+            "preempted": self.preempted,
+            "expired": self.expired,
+            "avg_wait_s": round(self.total_wait / self.dispatched, 4) if self.dispatched else 0.0,
+            "p95_wait_s": round(p95, 4),
+            "max_wait_s": round(self.max_wait, 4),
+        }
+
+
+class JobQueue:
+    """
+    线程安全的优先级 / 公平队列
+
+    Args:
+        max_size: 队列容量
+        client_weights: {client: weight}，权重越大分到的份额越多（默认 1）
+        on_drop: 回调 on_drop(job, reason)，任务被抢占或过期时调用
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, client_weights=None, on_drop=None):
+        self.max_size = max_size
+        self.client_weights = dict(client_weights or {})
+        self.on_drop = on_drop
+
+        self._heap = []
+        self._deadlines = []            # 带截止时间的任务: ((类别, 截止时间, seq), job)
+        self._size = 0
+        self._seq = itertools.count()
+        self._virtual_time = 0.0
+        self._client_finish = {}        # client -> 上一个任务的虚拟完成时间
+        self._prune_at = CLIENT_PRUNE_SIZE
+        self._service_estimate = DEFAULT_SERVICE_ESTIMATE
+        self._stats = {name: _WaitStats() for name in PRIORITY_CLASSES}
+        self._queued = {name: 0 for name in PRIORITY_CLASSES}
+        self._cond = threading.Condition()
+
+    def __len__(self):
+        with self._cond:
+            return self._size
+
+    def configure(self, max_size: int = None, client_weights=None):
+        """修改容量 / 客户端权重（已排队的任务保留，容量变小时只影响新提交）"""
+        with self._cond:
+            if max_size is not None:
+                self.max_size = max_size
+            if client_weights is not None:
+                self.client_weights = dict(client_weights)
+
+    def submit(self, task_id, payload=None, client="anonymous", priority=DEFAULT_PRIORITY,
+               deadline=None, cost: float = 1.0) -> Job:
+        """
+        提交任务
+
+        Raises:
+            QueueFullError: 队列已满且无法抢占
+        """
+        job = Job(task_id, payload, client, priority, deadline)
+        dropped = None
+
+        with self._cond:
+            if priority == "low" and self._size >= self.max_size * LOW_ADMIT_RATIO:
+                self._stats[priority].rejected += 1
+                raise QueueFullError("队列繁忙，low 优先级任务被拒绝")
+
+            if self._size >= self.max_size:
+                dropped = self._pop_victim(PRIORITY_CLASSES[priority])
+                if dropped is None:
+                    self._stats[priority].rejected += 1
+                    raise QueueFullError("队列已满")
+                self._stats[dropped.priority].preempted += 1
+
+            # WFQ: 虚拟完成时间 = max(当前虚拟时间, 该客户端上次完成时间) + cost / weight
+            weight = max(self.client_weights.get(client, 1.0), 1e-6)
+            start = max(self._virtual_time, self._client_finish.get(client, 0.0))
+            job.virtual_finish = start + cost / weight
+            self._client_finish[client] = job.virtual_finish
+            if len(self._client_finish) > self._prune_at:
+                self._prune_clients()
+            job.seq = next(self._seq)
+
+            heapq.heappush(self._heap, (job.sort_key(), job))
+            if deadline is not None:
+                heapq.heappush(self._deadlines, ((PRIORITY_CLASSES[priority], deadline, job.seq), job))
+                if len(self._deadlines) > 2 * self._size + CLIENT_PRUNE_SIZE:
+                    self._deadlines = [entry for entry in self._deadlines if not entry[1].removed]
+                    heapq.heapify(self._deadlines)
+            self._size += 1
+            self._queued[priority] += 1
+            self._cond.notify()
+
+        if dropped is not None and self.on_drop:
+            self.on_drop(dropped, "preempted")
+
+        return job
+
+    def _prune_clients(self):
+        """
+        删除空闲客户端（上次完成时间不晚于当前虚拟时间）
+
+        这些客户端的下一个任务本来就从当前虚拟时间开始计算，删除后调度结果不变
+        """
+        self._client_finish = {client: finish for client, finish in self._client_finish.items()
+                               if finish > self._virtual_time}
+        self._prune_at = max(CLIENT_PRUNE_SIZE, 2 * len(self._client_finish))
+
+    def _pop_victim(self, incoming_level: int):
+        """找出优先级低于 incoming_level 的任务中最该被抢占的一个（最低优先级、最晚入队）"""
+        victim = None
+        for _, job in self._heap:
+            if job.removed or PRIORITY_CLASSES[job.priority] <= incoming_level:
+                continue
+            if victim is None or (PRIORITY_CLASSES[job.priority], job.seq) > \
+                    (PRIORITY_CLASSES[victim.priority], victim.seq):
+                victim = job
+
+        if victim is not None:
+            # 懒删除：标记后在出队时跳过
+            victim.removed = True
+            self._size -= 1
+            self._queued[victim.priority] -= 1
+        return victim
+
+    def record_service(self, seconds: float):
+        """上报一个任务的执行耗时，用于判断截止时间是否有风险"""
+        with self._cond:
+            self._service_estimate += SERVICE_EMA_ALPHA * (seconds - self._service_estimate)
+
+    def _pop_next(self):
+        """
+        取出下一个任务（调用方持有锁且队列非空）
+
+        默认取 WFQ 顺序的第一个；同一类别中有截止时间来不及等公平排队的任务时，取截止时间最早的
+        """
+        while self._heap[0][1].removed:
+            heapq.heappop(self._heap)
+        while self._deadlines and self._deadlines[0][1].removed:
+            heapq.heappop(self._deadlines)
+
+        job = self._heap[0][1]
+        if self._deadlines:
+            (level, deadline, _), urgent = self._deadlines[0]
+            if level == PRIORITY_CLASSES[job.priority] and deadline - time.time() < self._service_estimate:
+                job = urgent
+        # 另一个堆中的条目懒删除
+        job.removed = True
+        return job
+
+    def get(self, timeout: float = None):
+        """
+        取出下一个任务（阻塞），超时返回 None
+
+        已过截止时间的任务会被丢弃并通过 on_drop(job, "expired") 通知
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            expired = None
+            with self._cond:
+                while self._size == 0:
+                    remaining = None if end is None else end - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+
+                job = self._pop_next()
+                self._size -= 1
+                self._queued[job.priority] -= 1
+                self._virtual_time = max(self._virtual_time, job.virtual_finish)
+
+                if job.deadline is not None and time.time() > job.deadline:
+                    self._stats[job.priority].expired += 1
+                    expired = job
+                else:
+                    self._stats[job.priority].record(time.monotonic() - job.enqueued_at)
+                    return job
+
+            if expired is not None and self.on_drop:
+                self.on_drop(expired, "expired")
+
+    def stats(self) -> dict:
+        """各优先级类别的排队情况和等待时间"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "max_size": self.max_size,
+                "service_estimate_s": round(self._service_estimate, 3),
+                "classes": {name: self._stats[name].to_dict(self._queued[name])
+                            for name in PRIORITY_CLASSES},
+            }
@@ -34,10 +34,13 @@ Windows 自动解锁测试脚本
 """
 
 
+import importlib.util
 import time
 import sys
 from datetime import datetime
 
+from probe_profiler import profiled
+
 # ============================================================================
 # 配置区域 - 请修改这里
 # ============================================================================
@@ -52,18 +55,9 @@ KEY_INTERVAL = 0.05     # 按键之间的间隔（秒）
 
 
 def check_dependencies():
-    """检查依赖"""
-    missing = []
-    
-    try:
-        import pyautogui
-    except ImportError:
-        missing.append("pyautogui")
-    
-    try:
-        import psutil
-    except ImportError:
-        missing.append("psutil")
+    """检查依赖（只查找模块，不导入；pyautogui 导入较慢，等到真正使用时再导入）"""
+    missing = [package for module, package in (("pyautogui", "pyautogui"), ("psutil", "psutil"))
+               if importlib.util.find_spec(module) is None]
     
     if missing:
         print(f"❌ 缺少依赖: {', '.join(missing)}")
@@ -73,6 +67,7 @@ def check_dependencies():
     return True
 
 
+@profiled("is_screen_locked")
 def is_screen_locked():
     """
     检测屏幕是否锁定
@@ -95,6 +90,7 @@ def is_screen_locked():
         return None
 
 
+@profiled("unlock_screen")
 def unlock_screen(password: str, verbose: bool = True):
     """
     自动解锁屏幕
@@ -0,0 +1,28 @@
+# test_live_config.py
+"""
+live_config.py 的校验测试（不需要 Windows）
+
+    python -m pytest -q test_live_config.py
+"""
+
+import pytest
+
+from live_config import SCHEMA_VERSION, ConfigError, validate
+
+
+def _document(**scheduler):
+    return {"schema": SCHEMA_VERSION, "scheduler": scheduler}
+
+
+def test_deadline_zero_rejected():
+    """后端拒绝 deadline <= 0，配置中的 0 会让每个调度任务都返回 400"""
+    with pytest.raises(ConfigError, match="task_deadline_seconds"):
+        validate(_document(task_deadline_seconds=0))
+
+
+def test_deadline_positive_accepted():
+    assert validate(_document(task_deadline_seconds=1))["scheduler"]["task_deadline_seconds"] == 1
+
+
+def test_interval_zero_accepted():
+    assert validate(_document(task_interval_seconds=0))["scheduler"]["task_interval_seconds"] == 0
@@ -0,0 +1,73 @@
+# test_lock_classifier.py
+"""
+lock_classifier.py 的最近邻判断测试（合成图像，不需要 Windows）
+
+    python -m pytest -q test_lock_classifier.py
+"""
+
+import pytest
+
+from lock_classifier import (DEFAULT_MAX_DISTANCE, HASH_SIZE, HIST_LEVELS, Fingerprint, SignatureIndex,
+                             fingerprint_image, selftest, synthetic_frame)
+
+pytest.importorskip("PIL")
+
+BINS = HIST_LEVELS ** 3
+ALL_BITS = (1 << (HASH_SIZE * HASH_SIZE)) - 1
+
+
+def _histogram(bin_index):
+    """全部集中在一格的直方图（千分比）"""
+    return [1000 if i == bin_index else 0 for i in range(BINS)]
+
+
+def test_distance_combines_hash_and_histogram():
+    a = Fingerprint(0, _histogram(0), "clock")
+    assert a.distance(Fingerprint(0, _histogram(0), "clock")) == 0
+    # 哈希全部不同、直方图完全不重叠时距离为 1
+    assert a.distance(Fingerprint(ALL_BITS, _histogram(1), "clock")) == pytest.approx(1.0)
+    assert a.distance(Fingerprint(ALL_BITS, _histogram(0), "clock")) == pytest.approx(0.5)
+
+
+def test_knn_weighted_vote():
+    index = SignatureIndex(k=3)
+    index.add(Fingerprint(0b0000, _histogram(0), "clock", label="locked"))
+    index.add(Fingerprint(0b0001, _histogram(0), "clock", label="locked"))
+    index.add(Fingerprint(0b1111, _histogram(0), "clock", label="desktop"))
+    verdict = index.classify(Fingerprint(0b0011, _histogram(0), "clock"))
+    assert verdict["label"] == "locked"
+    assert 0.5 < verdict["confidence"] < 1
+    assert [n["label"] for n in verdict["neighbours"]][0] == "locked"
+
+
+def test_unknown_beyond_max_distance():
+    index = SignatureIndex()
+    index.add(Fingerprint(0, _histogram(0), "clock", label="locked"))
+    far = Fingerprint(ALL_BITS, _histogram(1), "clock")
+    assert far.distance(index.nearest(far)[0][1]) > DEFAULT_MAX_DISTANCE
+    assert index.classify(far)["label"] == "unknown"
+
+
+def test_regions_are_separate():
+    """只与同一区域的指纹比较：没有该区域的参考指纹时返回 unknown"""
+    index = SignatureIndex()
+    index.add(Fingerprint(0, _histogram(0), "clock", label="locked"))
+    assert index.classify(Fingerprint(0, _histogram(0), "password"))["label"] == "unknown"
+    assert index.classify(Fingerprint(0, _histogram(0), "clock"))["label"] == "locked"
+
+
+def test_synthetic_frames(tmp_path):
+    index = SignatureIndex()
+    for i in range(5):
+        for kind in ("locked", "desktop"):
+            index.add(fingerprint_image(synthetic_frame(kind, seed=i), "monitor1", label=kind))
+    path = tmp_path / "signatures.json"
+    index.save(path)
+    loaded = SignatureIndex.load(path)
+    assert len(loaded) == 10
+    for kind in ("locked", "desktop"):
+        assert loaded.classify(fingerprint_image(synthetic_frame(kind, seed=100), "monitor1"))["label"] == kind
+
+
+def test_selftest_accuracy():
+    assert selftest()["accuracy"] >= 0.95
@@ -12,19 +12,46 @@
 2. 在倒计时期间按 Win+L 锁定屏幕
 3. 等待测试完成
 4. 解锁后查看结果
+
+每个测试的耗时记录在结果的 duration_ms 中；设置 PROBE_PROFILE=cprofile,tracemalloc
+可同时记录 cProfile / 内存剖析（见 probe_profiler.py，压测见 bench_probes.py）
 """
 
+import importlib.util
 import time
 import os
-import json
 from datetime import datetime
 from pathlib import Path
 
+from probe_profiler import profiled
+
 # 测试结果输出目录
 OUTPUT_DIR = Path("lockscreen_test_results")
 OUTPUT_DIR.mkdir(exist_ok=True)
 
+# 截图配置（见 capture_planner.py）
+# primary: 只截主显示器（全屏）  all: 一次截取所有显示器  roi: 只截锁屏关注区域（时钟 / 密码框）
+CAPTURE_MODE = "roi"
+CAPTURE_SCALE = 0.25        # 分析时的采样比例（0.25 = 每 4 行 / 4 列取一个像素）
+
+# 结果存储（见 result_store.py）：截图按内容去重，结果追加到 runs.ndjson，超出上限时淘汰最旧的运行
+RESULT_STORE_MAX_MB = 200
+RESULT_STORE_MAX_AGE_DAYS = 30
+
+_result_store = None
+
+
+def get_result_store():
+    """结果存储（首次使用时创建）"""
+    global _result_store
+    if _result_store is None:
+        from result_store import ProbeResultStore
+        _result_store = ProbeResultStore(OUTPUT_DIR, max_bytes=RESULT_STORE_MAX_MB * 1024 * 1024,
+                                         max_age_days=RESULT_STORE_MAX_AGE_DAYS)
+    return _result_store
+
 
+@profiled("screenshot")
 def test_1_screenshot():
     """
     测试 1: 锁屏状态下的截图
@@ -37,56 +64,70 @@ def test_1_screenshot():
     
     try:
         import mss
-        from PIL import Image
+        from capture_planner import CapturePlanner
+        
+        planner = CapturePlanner(mode=CAPTURE_MODE, scale=CAPTURE_SCALE)
         
         with mss.mss() as sct:
-            # 截取主显示器
-            monitor = sct.monitors[1]
-            screenshot = sct.grab(monitor)
-            
-            # 转换为 PIL Image
-            img = Image.frombytes("RGB", screenshot.size, screenshot.bgra, "raw", "BGRX")
-            
-            # 保存截图
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filepath = OUTPUT_DIR / f"screenshot_locked_{timestamp}.png"
-            img.save(filepath)
-            
-            # 分析截图
-            pixels = list(img.getdata())
-            total_pixels = len(pixels)
+            # 按规划截取（主显示器 / 所有显示器一次截取 / 关注区域）
+            captures = planner.capture(sct)
             
-            # 计算平均亮度
-            avg_brightness = sum(sum(p) for p in pixels) / (total_pixels * 3)
+            # 保存截图（每个区域一张，与已有截图相同或近似时复用已有文件）
+            store = get_result_store()
+            filepaths = []
+            screenshots = {}
+            images = {}
+            for cap in captures:
+                images[cap.region.name] = cap.to_image()
+                saved = store.put_image(images[cap.region.name])
+                screenshots[cap.region.name] = saved
+                filepaths.append(saved["path"])
             
-            # 计算颜色多样性（简单方法：统计不同颜色数量）
-            unique_colors = len(set(pixels[:10000]))  # 采样前 10000 个像素
+            # 只分析截取的区域，降采样统计亮度和颜色多样性
+            report = planner.analyze(captures)
+            first = next(iter(report["regions"].values()))
             
             result = {
                 "test": "screenshot",
                 "success": True,
-                "filepath": str(filepath),
-                "resolution": f"{img.width}x{img.height}",
-                "avg_brightness": round(avg_brightness, 2),
-                "color_diversity": unique_colors,
-                "analysis": ""
+                "filepath": filepaths[0],
+                "filepaths": filepaths,
+                "screenshots": {name: saved["id"] for name, saved in screenshots.items()},
+                "capture_mode": CAPTURE_MODE,
+                "resolution": ", ".join(f"{c.region.width}x{c.region.height}" for c in captures),
+                "avg_brightness": first["avg_brightness"],
+                "color_diversity": first["color_diversity"],
+                "regions": report["regions"],
+                "pixels_analyzed": report["pixels_analyzed"],
+                "analysis": report["analysis"],
+                "likely_locked": report["likely_locked"],
             }
+            if len(captures) == 1:
+                result["analysis"] = first["analysis"]
+            result["verdict_source"] = "thresholds"
             
-            # 分析结果
-            if avg_brightness < 30 and unique_colors < 100:
-                result["analysis"] = "可能是黑屏或锁屏界面（亮度低，颜色单一）"
-                result["likely_locked"] = True
-            elif unique_colors < 500:
-                result["analysis"] = "可能是锁屏界面（颜色较少）"
-                result["likely_locked"] = True
-            else:
-                result["analysis"] = "可能捕获到了桌面内容（颜色丰富）"
-                result["likely_locked"] = False
+            # 有参考指纹库（lock_classifier.py add ...）时，用最近邻分类代替阈值判断
+            from lock_classifier import SIGNATURE_FILE, SignatureIndex, fingerprint_image
+            if SIGNATURE_FILE.exists():
+                index = SignatureIndex.load(SIGNATURE_FILE)
+                verdicts = {name: index.classify(fingerprint_image(img, region=name))
+                            for name, img in images.items()}
+                known = [v["label"] for v in verdicts.values() if v["label"] != "unknown"]
+                result["signatures"] = verdicts
+                if known:
+                    locked_votes = known.count("locked")
+                    result["likely_locked"] = locked_votes * 2 >= len(known)
+                    result["analysis"] = f"参考指纹: {locked_votes}/{len(known)} 个区域最接近锁屏截图"
+                    result["verdict_source"] = "signatures"
             
-            print(f"  ✓ 截图已保存: {filepath}")
-            print(f"  ✓ 分辨率: {result['resolution']}")
-            print(f"  ✓ 平均亮度: {result['avg_brightness']}")
-            print(f"  ✓ 颜色多样性: {result['color_diversity']}")
+            print(f"  ✓ 截图已保存: {', '.join(filepaths)}")
+            reused = [name for name, saved in screenshots.items() if saved["dedup"]]
+            if reused:
+                print(f"  ✓ 与已有截图相同或近似，复用: {', '.join(reused)}")
+            print(f"  ✓ 截图模式: {CAPTURE_MODE}（采样比例 {CAPTURE_SCALE}）")
+            for name, region in report["regions"].items():
+                print(f"  ✓ [{name}] {region['width']}x{region['height']} "
+                      f"亮度 {region['avg_brightness']} 颜色多样性 {region['color_diversity']} → {region['analysis']}")
             print(f"  → 分析: {result['analysis']}")
             
             return result
@@ -96,6 +137,7 @@ def test_1_screenshot():
         return {"test": "screenshot", "success": False, "error": str(e)}
 
 
+@profiled("window_enumeration")
 def test_2_window_enumeration():
     """
     测试 2: 窗口枚举
@@ -159,6 +201,7 @@ def test_2_window_enumeration():
         return {"test": "window_enumeration", "success": False, "error": str(e)}
 
 
+@profiled("find_specific_window")
 def test_3_find_specific_window():
     """
     测试 3: 查找特定窗口
@@ -214,6 +257,7 @@ def test_3_find_specific_window():
         return {"test": "find_specific_window", "success": False, "error": str(e)}
 
 
+@profiled("mouse_position")
 def test_4_mouse_position():
     """
     测试 4: 鼠标位置
@@ -268,6 +312,7 @@ def test_4_mouse_position():
         return {"test": "mouse_position", "success": False, "error": str(e)}
 
 
+@profiled("keyboard")
 def test_5_keyboard():
     """
     测试 5: 键盘输入
@@ -309,6 +354,7 @@ def test_5_keyboard():
         return {"test": "keyboard", "success": False, "error": str(e)}
 
 
+@profiled("process_check")
 def test_6_process_check():
     """
     测试 6: 进程检查
@@ -415,12 +461,11 @@ def run_all_tests(delay_seconds=15):
     results["tests"].append(test_5_keyboard())
     results["tests"].append(test_6_process_check())
     
-    # 保存结果
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    result_file = OUTPUT_DIR / f"test_results_{timestamp}.json"
-    
-    with open(result_file, "w", encoding="utf-8") as f:
-        json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+    # 保存结果（追加到 runs.ndjson 并更新索引，超出大小 / 时间上限时淘汰最旧的运行）
+    store = get_result_store()
+    screenshot_ids = list(results["tests"][0].get("screenshots", {}).values())
+    run = store.append_run(results, screenshot_ids)
+    evicted = store.evict()
     
     # 打印总结
     print("\n")
@@ -432,13 +477,15 @@ def run_all_tests(delay_seconds=15):
     all_success = True
     for test in results["tests"]:
         status = "✓" if test.get("success") else "✗"
-        print(f"  {status} {test['test']}")
+        print(f"  {status} {test['test']} ({test.get('duration_ms')}ms)")
         if not test.get("success"):
             all_success = False
     
     print()
     print(f"  📁 结果保存至: {OUTPUT_DIR.absolute()}")
-    print(f"  📄 JSON 报告: {result_file.name}")
+    print(f"  📄 运行记录: {store.runs_file.name} ({run['run_id']})")
+    if evicted["runs_removed"]:
+        print(f"  🧹 已淘汰 {evicted['runs_removed']} 条旧运行、{evicted['objects_removed']} 张截图")
     print()
     
     # 最终结论
@@ -484,34 +531,12 @@ def run_all_tests(delay_seconds=15):
 if __name__ == "__main__":
     import sys
     
-    # 检查依赖
-    required_packages = ["mss", "Pillow", "pyautogui", "psutil", "pywin32"]
-    missing = []
-    
-    try:
-        import mss
-    except ImportError:
-        missing.append("mss")
-    
-    try:
-        from PIL import Image
-    except ImportError:
-        missing.append("Pillow")
-    
-    try:
-        import pyautogui
-    except ImportError:
-        missing.append("pyautogui")
-    
-    try:
-        import psutil
-    except ImportError:
-        missing.append("psutil")
-    
-    try:
-        import win32gui
-    except ImportError:
-        missing.append("pywin32")
+    # 检查依赖（find_spec 只查找模块，不执行导入，启动更快）
+    # 模块名 -> pip 包名
+    required_packages = {"mss": "mss", "PIL": "Pillow", "pyautogui": "pyautogui",
+                         "psutil": "psutil", "win32gui": "pywin32"}
+    missing = [package for module, package in required_packages.items()
+               if importlib.util.find_spec(module) is None]
     
     if missing:
         print("缺少依赖包，请先安装:")
@@ -0,0 +1,178 @@
+# tracing.py
+# 链路追踪 - W3C traceparent 传播 + 本地文件 span 收集
+"""
+链路追踪
+
+调度器（Pi）每次运行生成一个 trace_id，每个任务一个 span_id，通过 W3C
+traceparent 请求头传给后端：
+
+    traceparent: 00-<32 位 hex trace_id>-<16 位 hex span_id>-01
+
+后端记录以下 span，并和调度器上传的 span（wake / readiness 等）一起写入本地文件：
+
+    backend.submit   - /execute/ai 请求处理
+    queue.wait       - 任务在队列中的等待时间
+    task.execute     - 任务执行
+    status.poll      - /status/<id> 查询
+
+文件格式：traces/spans-YYYY-MM-DD.ndjson，每行一个 span：
+    {"trace_id", "span_id", "parent_span_id", "name", "service",
+     "start_time", "end_time", "duration_ms", "attributes"}
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_TRACE_DIR = Path("traces")
+TRACE_FILE_GLOB = "spans-*.ndjson"
+MAX_SPAN_TIMESTAMP = 253402300799.0       # 9999-12-31，超出时 datetime.fromtimestamp 无法处理
+
+_TRACEPARENT_RE = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+
+def new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def parse_traceparent(header):
+    """
+    解析 traceparent 请求头
+
+    Returns:
+        (trace_id, parent_span_id) 或 None
+    """
+    if not header:
+        return None
+    match = _TRACEPARENT_RE.match(header.strip().lower())
+    if not match:
+        return None
+    trace_id, span_id = match.groups()
+    if trace_id == "0" * 32 or span_id == "0" * 16:
+        return None
+    return trace_id, span_id
+
+
+def format_traceparent(trace_id: str, span_id: str) -> str:
+    return f"00-{trace_id}-{span_id}-01"
+
+
+def make_span(name, trace_id, start_time, end_time, parent_span_id=None, span_id=None,
+              service="backend", attributes=None) -> dict:
+    """构建 span 记录（时间为 time.time() 秒）"""
+    return {
+        "trace_id": trace_id,
+        "span_id": span_id or new_span_id(),
+        "parent_span_id": parent_span_id,
+        "name": name,
+        "service": service,
+        "start_time": round(start_time, 6),
+        "end_time": round(end_time, 6),
+        "duration_ms": round((end_time - start_time) * 1000, 3),
+        "attributes": attributes or {},
+    }
+
+
+def validate_span(span) -> bool:
+    """
+    检查外部上传的 span 是否有效
+
+    start_time / end_time 可以是数字或数字字符串，有效时写回为 float（后续按时间戳使用）
+    """
+    if not isinstance(span, dict):
+        return False
+    try:
+        if not (re.fullmatch(r"[0-9a-f]{32}", span["trace_id"]) is not None
+                and re.fullmatch(r"[0-9a-f]{16}", span["span_id"]) is not None
+                and isinstance(span["name"], str)):
+            return False
+        if isinstance(span["start_time"], bool) or isinstance(span["end_time"], bool):
+            return False
+        start, end = float(span["start_time"]), float(span["end_time"])
+    except (KeyError, TypeError, ValueError):
+        return False
+    if not (0 <= start <= end <= MAX_SPAN_TIMESTAMP):
+        return False
+    span["start_time"], span["end_time"] = start, end
+    return True
+
+
+class FileSpanCollector:
+    """
+    本地文件 span 收集器
+
+    按天写入 NDJSON 文件；写入加锁并逐行 flush，进程崩溃最多丢失一行
+    """
+
+    def __init__(self, trace_dir=DEFAULT_TRACE_DIR, service: str = "backend"):
+        self.trace_dir = Path(trace_dir)
+        self.service = service
+        self._lock = threading.Lock()
+
+    def _path_for(self, timestamp: float) -> Path:
+        day = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        return self.trace_dir / f"spans-{day}.ndjson"
+
+    def export(self, spans):
+        """写入一个或多个 span"""
+        if isinstance(spans, dict):
+            spans = [spans]
+        lines = {}
+        for span in spans:
+            path = self._path_for(span["start_time"])
+            lines.setdefault(path, []).append(json.dumps(span, ensure_ascii=False))
+
+        with self._lock:
+            self.trace_dir.mkdir(parents=True, exist_ok=True)
+            for path, rows in lines.items():
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write("\n".join(rows) + "\n")
+
+    def record(self, name, trace_id, start_time, end_time=None, parent_span_id=None,
+               span_id=None, attributes=None) -> dict:
+        span = make_span(name, trace_id, start_time, end_time or time.time(),
+                         parent_span_id=parent_span_id, span_id=span_id,
+                         service=self.service, attributes=attributes)
+        self.export(span)
+        return span
+
+    @contextmanager
+    def span(self, name, trace_id, parent_span_id=None, attributes=None):
+        """记录一段代码的执行时间；yield 出的 dict 可以在块内补充 attributes"""
+        attrs = dict(attributes or {})
+        start = time.time()
+        try:
+            yield attrs
+        except Exception as e:
+            attrs["error"] = str(e)
+            raise
+        finally:
+            self.record(name, trace_id, start, parent_span_id=parent_span_id, attributes=attrs)
+
+    def load_trace(self, trace_id: str, max_files: int = 7):
+        """读取某个 trace 的所有 span（只扫描最近 max_files 天的文件），按开始时间排序"""
+        if not self.trace_dir.exists():
+            return []
+        files = sorted(self.trace_dir.glob(TRACE_FILE_GLOB), reverse=True)[:max_files]
+        needle = f'"trace_id": "{trace_id}"'
+        spans = []
+        for path in files:
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    # 先做字符串匹配，避免解析所有行
+                    if needle in line:
+                        try:
+                            spans.append(json.loads(line))
+                        except ValueError:
+                            pass
+        spans.sort(key=lambda s: s["start_time"])
+        return spans